@@ -1,12 +1,25 @@
 import os
-import gradio as gr
 from dotenv import load_dotenv
-from agency_swarm import Agency
+from agency_swarm import Agency, set_openai_client
 from .agents.content_creation_agent.agent import ContentCreationAgent
 from .agents.webdesign_agent.agent import WebdesignAgent
+from .shared.openai_client import get_agency_client
+from .shared.llm import request_timeout
+from .shared.llm_usage import get_usage_tracker, usage_context
+from .shared.tracing import instrument_agency_swarm, instrument_tools
+from utils.agency_sessions import SessionSendMessage
+from utils.session_store import SessionBusyError, open_session_store
+import openai
 import logging
 import json
 import traceback
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # Logging-Konfiguration
 logging.basicConfig(
@@ -18,23 +31,192 @@ logger = logging.getLogger(__name__)
 # Lade die Umgebungsvariablen
 load_dotenv()
 
-# Instanziiere die Agenten
-webdesign_agent = WebdesignAgent()
-content_agent = ContentCreationAgent()
-
-# Erstelle die Agency
-agency = Agency(
-    [
-        webdesign_agent,  # Entry point agent
-        [webdesign_agent, content_agent],  # Kommunikationsfluss
-    ],
-    shared_instructions="agency_manifesto.md"
+# Alle Agenten und Tools teilen sich einen Connection-Pool
+set_openai_client(get_agency_client())
+
+# Spans für Agenten-Turns und Tool-Aufrufe (aktiv mit TRACING_EXPORTER)
+instrument_agency_swarm()
+instrument_tools()
+
+# Agenten und Agency entstehen erst bei der ersten Verwendung: Der Import bleibt
+# schnell und der Server beantwortet Health-Checks, bevor die Assistants mit
+# OpenAI synchronisiert sind (siehe get_agency und den Warm-up in main.py)
+_agents = {}
+_agency = None
+_agency_lock = threading.RLock()
+
+
+def _get_agent(agent_class):
+    agent = _agents.get(agent_class)
+    if agent is None:
+        with _agency_lock:
+            agent = _agents.get(agent_class)
+            if agent is None:
+                # Liest nur Instruktionen und Tool-Schemas, kein Netzwerkzugriff
+                agent = _agents[agent_class] = agent_class()
+    return agent
+
+
+def get_webdesign_agent():
+    return _get_agent(WebdesignAgent)
+
+
+def get_content_agent():
+    return _get_agent(ContentCreationAgent)
+
+
+@contextlib.contextmanager
+def _settings_file_lock():
+    """Sperrt settings.json prozessübergreifend, solange ein Worker seine Assistants synchronisiert.
+
+    Sonst legen mehrere gleichzeitig startende Worker doppelte Assistants an
+    oder überschreiben sich gegenseitig die Datei.
+    """
+    try:
+        import fcntl
+    except ImportError:  # Windows: nur ein Worker-Prozess
+        yield
+        return
+    os.makedirs(".cache", exist_ok=True)
+    with open(os.path.join(".cache", "settings.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_agency():
+    """Liefert die Agency; beim ersten Aufruf werden die Assistants mit OpenAI synchronisiert."""
+    global _agency
+    if _agency is None:
+        with _agency_lock:
+            if _agency is None:
+                started = time.perf_counter()
+                webdesign_agent = get_webdesign_agent()
+                with _settings_file_lock():
+                    _agency = Agency(
+                        [
+                            webdesign_agent,  # Entry point agent
+                            [webdesign_agent, get_content_agent()],  # Kommunikationsfluss
+                        ],
+                        shared_instructions="agency_manifesto.md",
+                        # Delegiert auf den Threads der jeweiligen Session (siehe utils.agency_sessions)
+                        send_message_tool_class=SessionSendMessage,
+                    )
+                logger.info(f"Agency erstellt in {time.perf_counter() - started:.2f}s")
+    return _agency
+
+
+def __getattr__(name):
+    # Kompatibilität für ``from agency_swarm_Webdesign.agency import agency`` u.ä.
+    if name == "agency":
+        return get_agency()
+    if name == "webdesign_agent":
+        return get_webdesign_agent()
+    if name == "content_agent":
+        return get_content_agent()
+    if name == "demo":
+        return build_demo()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Sitzungsbezogener Speicher für das finale Briefing und State-Variablen.
+# Jede Gradio-Session (bzw. API-Session-ID) erhält ihren eigenen Zustand,
+# damit parallele Nutzer sich nicht gegenseitig überschreiben. Standardmäßig
+# liegt er in SQLite und ist so für alle Worker-Prozesse sichtbar; Änderungen
+# werden mit save_session_state zurückgeschrieben.
+briefing_sessions = open_session_store(
+    "briefing",
+    ttl=float(os.getenv("BRIEFING_SESSION_TTL", "3600")),
+    max_sessions=int(os.getenv("BRIEFING_MAX_SESSIONS", "256")),
+    spill_dir=os.getenv("BRIEFING_SESSION_DIR") or None,
+    factory=lambda: {
+        'complete_briefing': {},
+        'initial_briefing': None,
+        'questions_asked': None,
+        'project_id': None,
+    }
 )
 
-# Globaler Speicher für das finale Briefing und State-Variablen
-complete_briefing = {}
-initial_briefing = None
-questions_asked = None
+def _session_id(request):
+    """Ermittelt die Session-ID aus dem Gradio-Request oder einer API-Session-ID"""
+    if isinstance(request, str):
+        return request
+    return getattr(request, "session_hash", None) or "default"
+
+def get_session_state(request=None):
+    """Liefert den Briefing-Zustand der aktuellen Session"""
+    return briefing_sessions.get(_session_id(request))
+
+def save_session_state(state, request=None):
+    """Schreibt den (geänderten) Briefing-Zustand der Session zurück"""
+    briefing_sessions.set(_session_id(request), state)
+
+# Sekunden, die ein Briefing-Schritt auf einen laufenden Schritt derselben Session wartet
+SESSION_LOCK_TIMEOUT = float(os.getenv("SESSION_LOCK_TIMEOUT", "30"))
+
+def locked_session(step):
+    """Führt einen Briefing-Schritt unter der Sperre seiner Session aus.
+
+    get_session_state liefert bei SQLite eine Kopie; ohne Sperre würden sich
+    parallele Schritte derselben Session (auch in anderen Worker-Prozessen)
+    gegenseitig die Änderungen überschreiben.
+    """
+    @functools.wraps(step)
+    def wrapper(value, request=None):
+        try:
+            with briefing_sessions.lock(_session_id(request), timeout=SESSION_LOCK_TIMEOUT):
+                return step(value, request)
+        except SessionBusyError:
+            return "⏳ Für diese Sitzung läuft noch ein anderer Schritt. Bitte versuchen Sie es gleich erneut."
+    return wrapper
+
+# Thread-Pool für die voneinander unabhängigen LLM-Aufrufe der Briefing-Analyse
+analysis_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BRIEFING_ANALYSIS_WORKERS", "6")),
+    thread_name_prefix="briefing-analysis"
+)
+# Timeout (Sekunden) pro OpenAI-Request der Briefing-Analyse
+BRIEFING_CALL_TIMEOUT = float(os.getenv("BRIEFING_CALL_TIMEOUT", "90"))
+# Maximale Anzahl gleichzeitig generierter Seiten pro Batch (Obergrenze auch für max_concurrency der API)
+CONTENT_BATCH_CONCURRENCY = int(os.getenv("CONTENT_BATCH_CONCURRENCY", "4"))
+# Gemeinsamer Thread-Pool für die Seiten aller Batches: begrenzt die parallelen LLM-Aufrufe prozessweit
+content_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CONTENT_PAGE_WORKERS", "8")),
+    thread_name_prefix="content-batch"
+)
+
+def run_parallel(calls, timeout=BRIEFING_CALL_TIMEOUT):
+    """Führt unabhängige Aufrufe parallel aus.
+
+    ``calls`` ist ein Dictionary ``name -> (funktion, argumente)``. Zurückgegeben
+    wird ``name -> (ergebnis, fehler)``; bei Fehler oder Timeout ist das Ergebnis
+    None, die übrigen Ergebnisse bleiben erhalten.
+
+    ``timeout`` gilt für jeden OpenAI-Request ab dessen Start, nicht ab dem
+    Einreihen in den Pool: Aufrufe, die bei mehreren gleichzeitigen Analysen
+    noch warten, laufen daher nicht vorzeitig ab, und ein hängender Request
+    gibt seinen Worker nach Ablauf wieder frei.
+    """
+    with request_timeout(timeout):
+        futures = {
+            name: analysis_executor.submit(contextvars.copy_context().run, fn, *args)
+            for name, (fn, args) in calls.items()
+        }
+    wait(futures.values())
+    
+    results = {}
+    for name, future in futures.items():
+        if isinstance(future.exception(), openai.APITimeoutError):
+            logger.warning(f"Timeout nach {timeout}s bei: {name}")
+            results[name] = (None, TimeoutError(f"Keine Antwort nach {timeout:.0f} Sekunden"))
+        elif future.exception() is not None:
+            logger.error(f"Fehler bei {name}: {future.exception()}")
+            results[name] = (None, future.exception())
+        else:
+            results[name] = (future.result(), None)
+    return results
 
 def debug_dict(d, prefix=""):
     """Hilfsfunktion zum Debuggen von Dictionaries"""
@@ -43,50 +225,76 @@ def debug_dict(d, prefix=""):
     except Exception as e:
         return f"Fehler beim Serialisieren: {str(e)}"
 
-def analyze_briefing(briefing):
+@locked_session
+def analyze_briefing(briefing, request=None):
     """Analysiert das Briefing und generiert relevante Verständnisfragen"""
     try:
         # Speichere das ursprüngliche Briefing
-        global initial_briefing
-        initial_briefing = briefing
+        state = get_session_state(request)
+        state['initial_briefing'] = briefing
+        save_session_state(state, request)
         
-        questions = webdesign_agent.generate_questions(briefing)
+        with usage_context(session_id=_session_id(request), project_id=state.get('project_id')):
+            questions = get_webdesign_agent().generate_questions(briefing)
         return questions if questions else "Keine offenen Fragen identifiziert."
     except Exception as e:
         return f"Fehler bei der Fragen-Generierung: {str(e)}"
 
-def start_briefing_analysis(briefing):
-    """Startet die Briefing-Analyse mit interaktivem Chat"""
+@locked_session
+def start_briefing_analysis(briefing, request=None):
+    """Startet die Briefing-Analyse mit interaktivem Chat.
+
+    ``request`` ist der Gradio-Request der Session oder eine API-Session-ID.
+    """
     try:
         # Speichere das ursprüngliche Briefing
-        global initial_briefing, questions_asked, complete_briefing
-        initial_briefing = briefing
+        state = get_session_state(request)
+        state['initial_briefing'] = briefing
+        # Jede neue Analyse beginnt ein Projekt; Tokens und Kosten werden ihm zugeordnet
+        project_id = state['project_id'] = uuid.uuid4().hex[:12]
         
         logger.debug(f"Starte Analyse mit Briefing: {briefing[:200]}...")
         
-        # Website-Analyse durchführen
-        result = webdesign_agent.analyze_briefing(briefing)
+        # Website-Analyse, SEO-Begriffe und Verständnisfragen sind unabhängig
+        # voneinander und laufen daher parallel
+        with usage_context(session_id=_session_id(request), project_id=project_id):
+            results = run_parallel({
+                'analysis': (get_webdesign_agent().analyze_briefing, (briefing,)),
+                'seo_terms': (get_webdesign_agent().suggest_seo_terms, (briefing,)),
+                'questions': (get_webdesign_agent().generate_questions, (briefing,)),
+            })
+        
+        result, error = results['analysis']
+        if error:
+            result = {
+                "analysis": f"Fehler bei der Analyse: {str(error)}",
+                "menu_items": ["Startseite", "Über uns", "Leistungen", "Kontakt"]
+            }
         analysis = result["analysis"]
         menu_items = result["menu_items"]
         
-        # SEO-Begriffe vorschlagen
-        seo_terms = webdesign_agent.suggest_seo_terms(briefing)
+        seo_terms, error = results['seo_terms']
+        if error:
+            seo_terms = f"Fehler bei der SEO-Analyse: {str(error)}"
         
-        # Verständnisfragen generieren
-        questions = webdesign_agent.generate_questions(briefing)
+        questions, error = results['questions']
+        if error:
+            questions = f"Fehler bei der Fragen-Generierung: {str(error)}"
         
         # Speichere die Fragen
-        questions_asked = questions
+        state['questions_asked'] = questions
         
         # Speichere ALLE Informationen im complete_briefing
-        complete_briefing = {
+        complete_briefing = state['complete_briefing'] = {
             'original_briefing': briefing,  # Das vollständige Original-Briefing
+            'project_id': project_id,
             'menu_items': menu_items,
             'analysis': analysis,
             'seo_terms': seo_terms,
             'final_analysis': analysis  # Initial gleich der ersten Analyse
         }
         
+        save_session_state(state, request)
         logger.debug(f"Gespeichertes Complete Briefing: {debug_dict(complete_briefing)}")
         
         return f"""📋 Briefing-Analyse
@@ -110,7 +318,8 @@ Bitte überprüfe die Analyse und beantworte die Rückfragen, damit wir den Cont
         logger.error(f"Stacktrace: {traceback.format_exc()}")
         return error_msg
 
-def process_answers(answers):
+@locked_session
+def process_answers(answers, request=None):
     """Verarbeitet die Antworten und aktualisiert die Analyse"""
     try:
         logger.debug(f"Verarbeite Antworten: {answers[:100]}...")
@@ -119,16 +328,25 @@ def process_answers(answers):
             logger.warning("Leere Antworten erhalten")
             return "Bitte beantworte die Rückfragen, um fortzufahren."
         
-        global initial_briefing, questions_asked, complete_briefing
+        state = get_session_state(request)
+        initial_briefing = state['initial_briefing']
+        questions_asked = state['questions_asked']
+        complete_briefing = state['complete_briefing']
+        
+        if not initial_briefing:
+            logger.warning("Kein Briefing in dieser Session gefunden")
+            return "Bitte führe zuerst eine Briefing-Analyse durch."
+        
         logger.debug(f"Initial Briefing: {initial_briefing[:100]}...")
         logger.debug(f"Gestellte Fragen: {questions_asked}")
         
         # Aktualisiere die Analyse mit den Antworten
-        result = webdesign_agent.update_analysis(
-            initial_briefing=initial_briefing,
-            questions=questions_asked,
-            answers=answers
-        )
+        with usage_context(session_id=_session_id(request), project_id=state.get('project_id')):
+            result = get_webdesign_agent().update_analysis(
+                initial_briefing=initial_briefing,
+                questions=questions_asked,
+                answers=answers
+            )
         
         updated_analysis = result["analysis"]
         menu_items = result["menu_items"]
@@ -147,6 +365,7 @@ def process_answers(answers):
             # Original-Briefing und SEO-Terms bleiben erhalten
         })
         
+        save_session_state(state, request)
         logger.debug(f"Aktualisiertes Complete Briefing: {debug_dict(complete_briefing)}")
         
         return f"""📋 Aktualisierte Briefing-Analyse
@@ -162,29 +381,34 @@ def process_answers(answers):
         logger.error(f"Stacktrace: {traceback.format_exc()}")
         return error_msg
 
-def create_content(analysis_result):
+def create_content(analysis_result, request=None):
     """Erstellt Content basierend auf der Analyse"""
     if not analysis_result.strip():
         return "Bitte führen Sie zuerst eine Analyse durch."
     
     try:
         # Hole das gespeicherte Briefing
-        global complete_briefing
+        complete_briefing = get_session_state(request)['complete_briefing']
         if not complete_briefing:
             return "Bitte führen Sie zuerst eine vollständige Briefing-Analyse durch."
         
         # Generiere Content basierend auf dem kompletten Briefing
-        content = content_agent.create_content(complete_briefing)
+        with usage_context(session_id=_session_id(request), project_id=complete_briefing.get('project_id')):
+            content = get_content_agent().create_content(complete_briefing)
         return content
     except Exception as e:
         return f"Fehler bei der Content-Erstellung: {str(e)}"
 
 def show_answer_fields(analysis):
     """Zeigt die Antwortfelder an"""
+    import gradio as gr
+
     return gr.update(visible=True), gr.update(visible=True), analysis
 
 def hide_answer_fields_show_next():
     """Blendet die Antwortfelder aus und zeigt den Weiter-Button"""
+    import gradio as gr
+
     return [
         gr.update(visible=False),  # answers_input
         gr.update(visible=False),  # submit_answers
@@ -193,6 +417,8 @@ def hide_answer_fields_show_next():
 
 def switch_to_content_tab(content):
     """Wechselt zum Content-Tab und zeigt den generierten Content"""
+    import gradio as gr
+
     return gr.Tabs(selected="content_tab"), content
 
 def extract_menu_items(analysis):
@@ -239,13 +465,15 @@ def extract_menu_items(analysis):
         logger.error(f"Stacktrace: {traceback.format_exc()}")
         return ["Startseite", "Über uns", "Leistungen", "Kontakt"]
 
-def create_content_and_switch_tab(analysis_result):
+def create_content_and_switch_tab(analysis_result, request=None):
     """Wechselt zum Content-Tab und lädt die Menüpunkte"""
+    import gradio as gr
+
     try:
         logger.debug("Starte Tab-Wechsel und Menüpunkt-Ladung")
         
         # Hole die Menüpunkte aus dem complete_briefing
-        global complete_briefing
+        complete_briefing = get_session_state(request)['complete_briefing']
         menu_items = complete_briefing.get('menu_items', ["Startseite", "Über uns", "Leistungen", "Kontakt"])
         
         # Entferne die Asteriske aus den Menüpunkten
@@ -273,17 +501,21 @@ def create_content_and_switch_tab(analysis_result):
 
 def update_menu_items(menu_items, new_item):
     """Fügt einen neuen Menüpunkt hinzu oder aktualisiert bestehende"""
+    import gradio as gr
+
     if new_item:
         menu_items = menu_items + [new_item] if menu_items else [new_item]
     return gr.Dropdown(choices=menu_items), menu_items
 
 def remove_menu_item(menu_items, item_to_remove):
     """Entfernt einen Menüpunkt"""
+    import gradio as gr
+
     if item_to_remove in menu_items:
         menu_items.remove(item_to_remove)
     return gr.Dropdown(choices=menu_items), menu_items
 
-def generate_content_for_page(menu_item, num_paragraphs, words_per_paragraph, briefing_data):
+def generate_content_for_page(menu_item, num_paragraphs, words_per_paragraph, briefing_data, request=None):
     """Generiert Content für einen spezifischen Menüpunkt"""
     try:
         logger.debug(f"Content-Generierung gestartet für Menüpunkt: {menu_item}")
@@ -311,7 +543,8 @@ def generate_content_for_page(menu_item, num_paragraphs, words_per_paragraph, br
         logger.debug(f"Vollständiges Briefing-Data vor Content-Generierung: {debug_dict(briefing_data)}")
         
         # Rufe die create_content Funktion des ContentCreationAgent auf
-        content = content_agent.create_content(briefing_data)
+        with usage_context(session_id=_session_id(request), project_id=briefing_data.get('project_id')):
+            content = get_content_agent().create_content(briefing_data)
         
         logger.debug(f"Generierter Content: {content[:100]}...")
         return content
@@ -322,162 +555,352 @@ def generate_content_for_page(menu_item, num_paragraphs, words_per_paragraph, br
         logger.error("Stack Trace:", exc_info=True)
         return error_msg
 
-# Erstelle das Gradio Interface
-with gr.Blocks(theme=gr.themes.Default()) as demo:
-    # State für das Briefing
-    briefing_state = gr.State({})
+def _generate_page(menu_item, num_paragraphs, words_per_paragraph, briefing_data, session_id=None):
+    """Generiert eine einzelne Seite für den Batch-Modus"""
+    started = time.perf_counter()
+    # Jede Seite bekommt eine eigene Kopie, da content_params pro Seite gesetzt wird
+    page_data = dict(briefing_data)
+    page_data['content_params'] = {
+        'menu_item': menu_item,
+        'num_paragraphs': num_paragraphs,
+        'words_per_paragraph': words_per_paragraph
+    }
+    with usage_context(session_id=session_id, project_id=briefing_data.get('project_id')):
+        content = get_content_agent().create_content(page_data)
+    result = {
+        'menu_item': menu_item,
+        'duration': round(time.perf_counter() - started, 2)
+    }
+    if content.startswith("Fehler"):
+        result.update(status='error', error=content)
+    else:
+        result.update(status='done', content=content)
+    return result
+
+def iter_generated_pages(briefing_data, menu_items, num_paragraphs, words_per_paragraph, max_workers=None, session_id=None):
+    """Generiert Content für alle Menüpunkte parallel.
+
+    Liefert pro Menüpunkt ein Dictionary (``menu_item``, ``status``, ``content``
+    bzw. ``error``, ``duration``), sobald die jeweilige Seite fertig ist.
+    Die LLM-Aufrufe werden ``session_id`` und ``briefing_data['project_id']``
+    zugeordnet.
+    """
+    menu_items = [item.strip('*') for item in menu_items if item]
+    if not menu_items:
+        return
+    
+    max_workers = max(1, min(max_workers or CONTENT_BATCH_CONCURRENCY, CONTENT_BATCH_CONCURRENCY, len(menu_items)))
+    logger.info(f"Batch-Generierung für {len(menu_items)} Seiten mit {max_workers} parallelen Aufrufen")
+    
+    # Höchstens max_workers Seiten des Batches gleichzeitig im gemeinsamen Pool;
+    # die nächste Seite wird erst eingereicht, wenn eine fertig ist
+    pending = iter(menu_items)
+    futures = {}
     
-    gr.Markdown("""# 🎨 Website Content Generator
+    def submit_next():
+        item = next(pending, None)
+        if item is not None:
+            future = content_executor.submit(
+                contextvars.copy_context().run,
+                _generate_page, item, num_paragraphs, words_per_paragraph, briefing_data, session_id
+            )
+            futures[future] = item
+    
+    try:
+        for _ in range(max_workers):
+            submit_next()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = futures.pop(future)
+                submit_next()
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.error(f"Fehler bei der Batch-Generierung für {item}: {str(e)}")
+                    yield {
+                        'menu_item': item,
+                        'status': 'error',
+                        'error': f"Fehler bei der Content-Generierung: {str(e)}"
+                    }
+    finally:
+        # Bei Abbruch (z.B. geschlossener Browser) keine weiteren Seiten starten
+        for future in futures:
+            future.cancel()
+
+def generate_all_pages(menu_items, num_paragraphs, words_per_paragraph, briefing_data, request=None):
+    """Generiert alle Seiten und aktualisiert Content und Fortschritt nach jeder fertigen Seite"""
+    if not briefing_data or 'original_briefing' not in briefing_data:
+        yield "Fehler: Bitte führen Sie zuerst eine vollständige Briefing-Analyse durch.", ""
+        return
+    if not menu_items:
+        yield "Bitte fügen Sie zuerst Menüpunkte hinzu.", ""
+        return
+    
+    menu_items = [item.strip('*') for item in menu_items]
+    results = {}
+    
+    def render():
+        progress = [f"**Fortschritt: {len(results)}/{len(menu_items)} Seiten**", ""]
+        pages = []
+        for item in menu_items:
+            result = results.get(item)
+            if result is None:
+                progress.append(f"- ⏳ {item}")
+            elif result['status'] == 'done':
+                progress.append(f"- ✅ {item} ({result['duration']}s)")
+                pages.append(result['content'])
+            else:
+                progress.append(f"- ❌ {item}: {result['error']}")
+        return "\n\n---\n\n".join(pages), "\n".join(progress)
+    
+    yield render()
+    for result in iter_generated_pages(briefing_data, menu_items, num_paragraphs, words_per_paragraph,
+                                       session_id=_session_id(request)):
+        results[result['menu_item']] = result
+        yield render()
+
+def render_usage_summary(request=None):
+    """Fasst Tokens, Latenz und Kosten der LLM-Aufrufe des aktuellen Projekts zusammen"""
+    state = get_session_state(request)
+    if state.get('project_id'):
+        summary = get_usage_tracker().summary(project_id=state['project_id'])
+    else:
+        summary = get_usage_tracker().summary(session_id=_session_id(request))
+    totals = summary['totals']
+    if not totals['calls']:
+        return "Noch keine LLM-Aufrufe in dieser Session."
+    
+    lines = [
+        f"**{totals['calls']} Aufrufe · {totals['prompt_tokens'] + totals['completion_tokens']} Tokens "
+        f"({totals['cached_tokens']} gecacht) · ca. ${totals['cost_usd']:.4f} · "
+        f"⌀ {totals['latency_avg']:.1f}s**",
+        "",
+        "| Tool | Aufrufe | Prompt | Completion | Gecacht | Kosten (USD) | ⌀ Latenz | Retries |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    # Teuerste Tools zuerst
+    for tool, values in sorted(summary['by_tool'].items(), key=lambda item: -item[1]['cost_usd']):
+        lines.append(
+            f"| {tool} | {values['calls']} | {values['prompt_tokens']} | {values['completion_tokens']} | "
+            f"{values['cached_tokens']} | {values['cost_usd']:.4f} | {values['latency_avg']:.1f}s | {values['retries']} |"
+        )
+    return "\n".join(lines)
+
+def build_demo():
+    """Erstellt das Gradio Interface; gradio wird erst hier importiert (SERVE_MODE=api kommt ohne aus)"""
+    import gradio as gr
+
+    # Gradio übergibt den Request nur an Parameter mit der Annotation gr.Request;
+    # die Handler selbst bleiben ohne gradio-Import aufrufbar (z.B. aus der API)
+    def on_analyze(briefing, request: gr.Request):
+        return start_briefing_analysis(briefing, request)
+
+    def on_submit_answers(answers, request: gr.Request):
+        return process_answers(answers, request)
+
+    def on_usage(request: gr.Request):
+        return render_usage_summary(request)
+
+    def on_next_step(analysis_result, request: gr.Request):
+        return create_content_and_switch_tab(analysis_result, request)
+
+    def on_generate(menu_item, num_paragraphs, words_per_paragraph, briefing_data, request: gr.Request):
+        return generate_content_for_page(menu_item, num_paragraphs, words_per_paragraph, briefing_data, request)
+
+    def on_generate_all(menu_items, num_paragraphs, words_per_paragraph, briefing_data, request: gr.Request):
+        yield from generate_all_pages(menu_items, num_paragraphs, words_per_paragraph, briefing_data, request)
+
+    # Erstelle das Gradio Interface
+    with gr.Blocks(theme=gr.themes.Default()) as demo:
+        # State für das Briefing
+        briefing_state = gr.State({})
+    
+        gr.Markdown("""# 🎨 Website Content Generator
 
 ### Dein KI-Assistent für professionelle Webinhalte""")
     
-    with gr.Tabs() as tabs:
-        # Briefing Analyse Tab
-        with gr.Tab("📋 Briefing Analyse", id="briefing_tab"):
-            briefing_input = gr.Textbox(
-                label="Gib hier dein Briefing ein",
-                placeholder="Beschreibe dein Projekt, deine Ziele und Anforderungen...",
-                lines=5
-            )
-            analyze_button = gr.Button("Briefing analysieren", variant="primary")
-            analysis_output = gr.Textbox(
-                label="Analyse-Ergebnis",
-                lines=10,
-                show_copy_button=True
-            )
+        with gr.Tabs() as tabs:
+            # Briefing Analyse Tab
+            with gr.Tab("📋 Briefing Analyse", id="briefing_tab"):
+                briefing_input = gr.Textbox(
+                    label="Gib hier dein Briefing ein",
+                    placeholder="Beschreibe dein Projekt, deine Ziele und Anforderungen...",
+                    lines=5
+                )
+                analyze_button = gr.Button("Briefing analysieren", variant="primary")
+                analysis_output = gr.Textbox(
+                    label="Analyse-Ergebnis",
+                    lines=10,
+                    show_copy_button=True
+                )
             
-            # Antwortbereich für Rückfragen
-            answers_input = gr.Textbox(
-                label="Beantworte hier die Rückfragen",
-                placeholder="Gib deine Antworten ein...",
-                lines=3,
-                visible=False
-            )
-            submit_answers = gr.Button(
-                "Antworten absenden",
-                variant="secondary",
-                visible=False
-            )
+                # Antwortbereich für Rückfragen
+                answers_input = gr.Textbox(
+                    label="Beantworte hier die Rückfragen",
+                    placeholder="Gib deine Antworten ein...",
+                    lines=3,
+                    visible=False
+                )
+                submit_answers = gr.Button(
+                    "Antworten absenden",
+                    variant="secondary",
+                    visible=False
+                )
             
-            # Button für den Übergang zur Content-Erstellung
-            next_step_button = gr.Button(
-                "→ Weiter zur Content-Erstellung",
-                variant="primary",
-                visible=False
-            )
-        
-        # Content Erstellung Tab
-        with gr.Tab("✍️ Content Erstellung", id="content_tab"):
-            with gr.Row():
-                with gr.Column(scale=2):
-                    # Menüpunkt-Verwaltung
-                    menu_items_state = gr.State([])  # Speichert die Menüpunkte
-                    menu_dropdown = gr.Dropdown(
-                        label="Menüpunkt auswählen",
-                        choices=[],
-                        interactive=True
-                    )
-                    with gr.Row():
-                        new_menu_item = gr.Textbox(
-                            label="Neuer Menüpunkt",
-                            placeholder="Namen eingeben..."
+                # Button für den Übergang zur Content-Erstellung
+                next_step_button = gr.Button(
+                    "→ Weiter zur Content-Erstellung",
+                    variant="primary",
+                    visible=False
+                )
+            
+                # Verbrauch (Tokens, Kosten, Latenz) des aktuellen Projekts
+                with gr.Accordion("📊 Verbrauch", open=False):
+                    usage_summary = gr.Markdown("Noch keine LLM-Aufrufe in dieser Session.")
+                    refresh_usage_button = gr.Button("Aktualisieren", size="sm")
+        
+            # Content Erstellung Tab
+            with gr.Tab("✍️ Content Erstellung", id="content_tab"):
+                with gr.Row():
+                    with gr.Column(scale=2):
+                        # Menüpunkt-Verwaltung
+                        menu_items_state = gr.State([])  # Speichert die Menüpunkte
+                        menu_dropdown = gr.Dropdown(
+                            label="Menüpunkt auswählen",
+                            choices=[],
+                            interactive=True
                         )
-                        add_menu_btn = gr.Button("Hinzufügen", size="sm")
-                        remove_menu_btn = gr.Button("Entfernen", size="sm", variant="stop")
+                        with gr.Row():
+                            new_menu_item = gr.Textbox(
+                                label="Neuer Menüpunkt",
+                                placeholder="Namen eingeben..."
+                            )
+                            add_menu_btn = gr.Button("Hinzufügen", size="sm")
+                            remove_menu_btn = gr.Button("Entfernen", size="sm", variant="stop")
+                    
+                        # Content-Parameter
+                        with gr.Group():
+                            gr.Markdown("### Content-Parameter")
+                            num_paragraphs = gr.Slider(
+                                minimum=1,
+                                maximum=10,
+                                value=3,
+                                step=1,
+                                label="Anzahl Absätze"
+                            )
+                            words_per_paragraph = gr.Slider(
+                                minimum=50,
+                                maximum=500,
+                                value=150,
+                                step=10,
+                                label="Wörter pro Absatz (EXAKT)"
+                            )
                     
-                    # Content-Parameter
-                    with gr.Group():
-                        gr.Markdown("### Content-Parameter")
-                        num_paragraphs = gr.Slider(
-                            minimum=1,
-                            maximum=10,
-                            value=3,
-                            step=1,
-                            label="Anzahl Absätze"
+                        # Generate Button
+                        generate_btn = gr.Button(
+                            "Content generieren",
+                            variant="primary"
                         )
-                        words_per_paragraph = gr.Slider(
-                            minimum=50,
-                            maximum=500,
-                            value=150,
-                            step=10,
-                            label="Wörter pro Absatz (EXAKT)"
+                        generate_all_btn = gr.Button(
+                            "Alle Seiten generieren",
+                            variant="secondary"
                         )
-                    
-                    # Generate Button
-                    generate_btn = gr.Button(
-                        "Content generieren",
-                        variant="primary"
-                    )
+                        batch_progress = gr.Markdown()
                 
-                with gr.Column(scale=3):
-                    # Content Output
-                    content_output = gr.TextArea(
-                        label="Generierter Content",
-                        lines=15,
-                        show_copy_button=True
-                    )
+                    with gr.Column(scale=3):
+                        # Content Output
+                        content_output = gr.TextArea(
+                            label="Generierter Content",
+                            lines=15,
+                            show_copy_button=True
+                        )
     
-    # Event Handler
-    analyze_button.click(
-        fn=start_briefing_analysis,
-        inputs=[briefing_input],
-        outputs=[analysis_output]
-    ).then(
-        fn=show_answer_fields,
-        inputs=[analysis_output],
-        outputs=[answers_input, submit_answers, next_step_button]
-    )
+        # Event Handler
+        analyze_button.click(
+            fn=on_analyze,
+            inputs=[briefing_input],
+            outputs=[analysis_output]
+        ).then(
+            fn=show_answer_fields,
+            inputs=[analysis_output],
+            outputs=[answers_input, submit_answers, next_step_button]
+        ).then(
+            fn=on_usage,
+            outputs=[usage_summary]
+        )
     
-    submit_answers.click(
-        fn=process_answers,
-        inputs=[answers_input],
-        outputs=[analysis_output]
-    ).then(
-        fn=hide_answer_fields_show_next,
-        outputs=[answers_input, submit_answers, next_step_button]
-    )
+        submit_answers.click(
+            fn=on_submit_answers,
+            inputs=[answers_input],
+            outputs=[analysis_output]
+        ).then(
+            fn=hide_answer_fields_show_next,
+            outputs=[answers_input, submit_answers, next_step_button]
+        ).then(
+            fn=on_usage,
+            outputs=[usage_summary]
+        )
     
-    next_step_button.click(
-        fn=create_content_and_switch_tab,
-        inputs=[analysis_output],
-        outputs=[
-            content_output,
-            tabs,
-            menu_dropdown,
-            menu_items_state,
-            briefing_state
-        ]
-    )
-
-    # Content Tab Event Handler
-    add_menu_btn.click(
-        fn=update_menu_items,
-        inputs=[menu_items_state, new_menu_item],
-        outputs=[menu_dropdown, menu_items_state]
-    ).then(
-        fn=lambda x: "",  # Leere das Textfeld nach dem Hinzufügen
-        outputs=[new_menu_item]
-    )
+        refresh_usage_button.click(
+            fn=on_usage,
+            outputs=[usage_summary]
+        )
     
-    remove_menu_btn.click(
-        fn=remove_menu_item,
-        inputs=[menu_items_state, menu_dropdown],
-        outputs=[menu_dropdown, menu_items_state]
-    )
+        next_step_button.click(
+            fn=on_next_step,
+            inputs=[analysis_output],
+            outputs=[
+                content_output,
+                tabs,
+                menu_dropdown,
+                menu_items_state,
+                briefing_state
+            ]
+        )
+
+        # Content Tab Event Handler
+        add_menu_btn.click(
+            fn=update_menu_items,
+            inputs=[menu_items_state, new_menu_item],
+            outputs=[menu_dropdown, menu_items_state]
+        ).then(
+            fn=lambda x: "",  # Leere das Textfeld nach dem Hinzufügen
+            outputs=[new_menu_item]
+        )
     
-    generate_btn.click(
-        fn=generate_content_for_page,
-        inputs=[
-            menu_dropdown,
-            num_paragraphs,
-            words_per_paragraph,
-            briefing_state  # Verwende den briefing_state anstelle von complete_briefing
-        ],
-        outputs=[content_output]
-    )
+        remove_menu_btn.click(
+            fn=remove_menu_item,
+            inputs=[menu_items_state, menu_dropdown],
+            outputs=[menu_dropdown, menu_items_state]
+        )
+    
+        generate_btn.click(
+            fn=on_generate,
+            inputs=[
+                menu_dropdown,
+                num_paragraphs,
+                words_per_paragraph,
+                briefing_state  # Verwende den briefing_state anstelle von complete_briefing
+            ],
+            outputs=[content_output]
+        )
+    
+        generate_all_btn.click(
+            fn=on_generate_all,
+            inputs=[
+                menu_items_state,
+                num_paragraphs,
+                words_per_paragraph,
+                briefing_state
+            ],
+            outputs=[content_output, batch_progress]
+        )
+
+    return demo
 
 if __name__ == "__main__":
-    demo.launch(
+    build_demo().launch(
         share=False,
         server_name="127.0.0.1",
         server_port=7861
@@ -1,19 +1,62 @@
 from agency_swarm import Agent
 from agency_swarm.tools import BaseTool
 from pydantic import Field, BaseModel
-from openai import OpenAI
-import os
 from dotenv import load_dotenv
-import json
 import logging
+from ...shared.llm import cache_completion, chat_completion
+from ...shared.prompts import PromptTemplate
+from .paragraphs import generate_within_tolerance, paragraph_repair_messages, repaired_paragraph_text
 
 # Logging-Konfiguration
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-# OpenAI Client initialisieren
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Reihenfolge für Prompt-Caching: statischer Text, dann Briefing und Analyse,
+# zuletzt die Parameter der einzelnen Seite
+PAGE_CONTENT_PROMPT = PromptTemplate(
+    name="ContentGeneratorTool",
+    system="""Du bist ein erfahrener Website-Texter und Content-Stratege.
+- Du erstellst hochwertige, SEO-optimierte Texte
+- Du achtest besonders auf Zielgruppenansprache und Conversion
+- Du verstehst es, komplexe Themen verständlich zu vermitteln
+- Du kreierst überzeugende Überschriften und Textstrukturen
+
+Allgemeine Anforderungen an jede Seite:
+- Der Content muss perfekt auf die Zielgruppe und den Zweck der Website abgestimmt sein
+- Verwende einen professionellen, aber zugänglichen Schreibstil
+- Integriere wichtige Keywords und Themen aus dem Briefing
+- Strukturiere den Text mit passenden Zwischenüberschriften
+- Achte auf SEO-Optimierung und gute Lesbarkeit
+- Stelle sicher, dass der Content zur Gesamtstruktur der Website passt
+
+WICHTIG:
+1. Der Content muss sich perfekt in das Gesamtkonzept der Website einfügen
+2. Jeder Absatz muss einen klaren Mehrwert für den Leser bieten
+3. Die Überschriften müssen SEO-optimiert und ansprechend sein
+4. Der Text muss die Zielgruppe direkt ansprechen und überzeugen
+5. Berücksichtige alle Informationen aus dem Briefing und der Analyse""",
+    context="""Briefing:
+{briefing}
+
+Analyse:
+{analysis}""",
+    request="""Erstelle professionellen Website-Content für den Menüpunkt '{menu_item}' basierend auf dem Briefing und der Analyse oben.
+
+Anforderungen:
+- Erstelle genau {num_paragraphs} Absätze
+- Jeder Absatz soll ca. {words_per_paragraph} Wörter enthalten
+
+Formatierung:
+# [Menüpunkt: {menu_item}]
+[SEO-optimierte Hauptüberschrift]
+
+## [Erste Zwischenüberschrift]
+[Erster Absatz]
+
+## [Weitere Zwischenüberschriften]
+[Weitere Absätze]"""
+)
 
 class ContentParams(BaseModel):
     """Parameter für die Content-Generierung"""
@@ -36,58 +79,38 @@ class ContentGeneratorTool(BaseTool):
         try:
             logger.debug(f"Content-Generierung gestartet für: {self.params.menu_item}")
             
-            # Prompt für ChatGPT erstellen
-            prompt = f"""
-            Erstelle professionellen Website-Content für den Menüpunkt '{self.params.menu_item}' basierend auf dem folgenden Briefing und der Analyse.
-            
-            Briefing:
-            {self.params.briefing}
-            
-            Analyse:
-            {self.params.analysis}
-            
-            Anforderungen:
-            - Erstelle genau {self.params.num_paragraphs} Absätze
-            - Jeder Absatz soll ca. {self.params.words_per_paragraph} Wörter enthalten
-            - Der Content muss perfekt auf die Zielgruppe und den Zweck der Website abgestimmt sein
-            - Verwende einen professionellen, aber zugänglichen Schreibstil
-            - Integriere wichtige Keywords und Themen aus dem Briefing
-            - Strukturiere den Text mit passenden Zwischenüberschriften
-            - Achte auf SEO-Optimierung und gute Lesbarkeit
-            - Stelle sicher, dass der Content zur Gesamtstruktur der Website passt
-            
-            Formatierung:
-            # [Menüpunkt: {self.params.menu_item}]
-            [SEO-optimierte Hauptüberschrift]
-            
-            ## [Erste Zwischenüberschrift]
-            [Erster Absatz]
-            
-            ## [Weitere Zwischenüberschriften]
-            [Weitere Absätze]
-            
-            WICHTIG:
-            1. Der Content muss sich perfekt in das Gesamtkonzept der Website einfügen
-            2. Jeder Absatz muss einen klaren Mehrwert für den Leser bieten
-            3. Die Überschriften müssen SEO-optimiert und ansprechend sein
-            4. Der Text muss die Zielgruppe direkt ansprechen und überzeugen
-            5. Berücksichtige alle Informationen aus dem Briefing und der Analyse"""
+            # System-Text, Briefing und Analyse bilden ein für alle Seiten identisches
+            # Präfix; nur die Seiten-Parameter am Ende unterscheiden sich
+            context = {"briefing": self.params.briefing, "analysis": self.params.analysis}
+            messages = PAGE_CONTENT_PROMPT.render(
+                context,
+                menu_item=self.params.menu_item,
+                num_paragraphs=self.params.num_paragraphs,
+                words_per_paragraph=self.params.words_per_paragraph
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Prompt-Präfix {PAGE_CONTENT_PROMPT.prefix_hash(**context)} für: {self.params.menu_item}")
             
-            # OpenAI API für die Generierung nutzen
-            response = client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": """Du bist ein erfahrener Website-Texter und Content-Stratege.
-                    - Du erstellst hochwertige, SEO-optimierte Texte
-                    - Du achtest besonders auf Zielgruppenansprache und Conversion
-                    - Du verstehst es, komplexe Themen verständlich zu vermitteln
-                    - Du kreierst überzeugende Überschriften und Textstrukturen"""},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
+            # Abweichende Absätze werden einzeln gekürzt oder neu geschrieben,
+            # nur bei falscher Absatzanzahl wird die Seite erneut generiert
+            request = {"model": "gpt-4-turbo-preview", "messages": messages, "temperature": 0.7}
+            responses = []
+            content, stats = generate_within_tolerance(
+                lambda stats: self._generate(request, stats, responses),
+                lambda paragraph, stats: self._repair_paragraph(paragraph, stats),
+                self.params.num_paragraphs,
+                self.params.words_per_paragraph
             )
+            logger.info(f"Content-Generierung für {self.params.menu_item} abgeschlossen: {stats}")
+            
+            # Im LLM-Cache liegt sonst die unreparierte erste Antwort, und jeder
+            # Treffer würde die Reparaturen wiederholen
+            first = responses[0]
+            if stats['within_tolerance'] and content != first.choices[0].message.content:
+                repaired = first.model_copy(deep=True)
+                repaired.choices[0].message.content = content
+                cache_completion(type(self).__name__, repaired, **request)
             
-            content = response.choices[0].message.content
             logger.debug(f"Generierter Content: {content[:100]}...")
             return content
             
@@ -96,6 +119,34 @@ class ContentGeneratorTool(BaseTool):
             logger.error(error_msg)
             return error_msg
 
+    def _generate(self, request, stats, responses):
+        """Generiert den Content der ganzen Seite"""
+        # Nur die erste Generierung darf aus dem LLM-Cache kommen; eine erneute
+        # Generierung braucht eine neue Antwort
+        response = chat_completion(type(self).__name__, cache=stats['full_generations'] == 1, **request)
+        responses.append(response)
+        PAGE_CONTENT_PROMPT.record_usage(response)
+        _count_tokens(response, stats)
+        return response.choices[0].message.content
+
+    def _repair_paragraph(self, paragraph, stats):
+        """Schreibt einen einzelnen Absatz auf die Ziel-Wortanzahl um"""
+        words_per_paragraph = self.params.words_per_paragraph
+        response = chat_completion(type(self).__name__,
+            cache=False,
+            model="gpt-4-turbo-preview",
+            messages=paragraph_repair_messages(paragraph, words_per_paragraph),
+            temperature=0.7,
+            max_tokens=max(500, words_per_paragraph * 4)
+        )
+        _count_tokens(response, stats)
+        return repaired_paragraph_text(response.choices[0].message.content.strip(), paragraph)
+
+def _count_tokens(response, stats):
+    if response.usage:
+        stats['prompt_tokens'] += response.usage.prompt_tokens
+        stats['completion_tokens'] += response.usage.completion_tokens
+
 def create_content(menu_item: str, num_paragraphs: int, words_per_paragraph: int, briefing: str, analysis: str) -> str:
     """
     Hilfsfunktion zur Erstellung von Inhalten
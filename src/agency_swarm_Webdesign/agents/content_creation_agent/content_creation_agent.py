@@ -1,5 +1,11 @@
 import logging
-import openai
+from ...shared.llm import chat_completion
+from .paragraphs import (
+    MAX_REPAIR_ATTEMPTS,
+    generate_within_tolerance,
+    paragraph_repair_messages,
+    repaired_paragraph_text,
+)
 
 class ContentCreationAgent:
     def __init__(self):
@@ -21,7 +27,7 @@ class ContentCreationAgent:
             original_briefing = briefing_data.get('original_briefing', '')
             final_analysis = briefing_data.get('final_analysis', '')
             
-            self.logger.debug(f"Parameter für Content-Generierung:")
+            self.logger.debug("Parameter für Content-Generierung:")
             self.logger.debug(f"Menüpunkt: {menu_item}")
             self.logger.debug(f"Anzahl Absätze: {num_paragraphs}")
             self.logger.debug(f"Wörter pro Absatz: {words_per_paragraph}")
@@ -41,7 +47,7 @@ class ContentCreationAgent:
             )
             
             # Generiere den Content mit OpenAI
-            content = self._generate_with_openai(prompt)
+            content = self._generate_with_openai(prompt, num_paragraphs, words_per_paragraph)
             
             self.logger.debug(f"Generierter Content: {content[:200]}...")
             return content
@@ -102,72 +108,67 @@ class ContentCreationAgent:
         """
         return prompt
         
-    def _generate_with_openai(self, prompt):
-        """Generiert Content mit OpenAI API"""
+    def _generate_with_openai(self, prompt, num_paragraphs, words_per_paragraph, max_attempts=MAX_REPAIR_ATTEMPTS):
+        """Generiert Content mit OpenAI API.
+
+        Absätze außerhalb der Toleranz werden gezielt gekürzt oder einzeln neu
+        geschrieben, statt die ganze Seite neu zu generieren. Die Anzahl der
+        Versuche ist begrenzt; Versuche und Token-Verbrauch stehen danach in
+        ``self.last_generation_stats``.
+        """
         try:
             # Berechne die benötigten Tokens basierend auf der Wortanzahl
-            total_words = int(self.params.num_paragraphs * self.params.words_per_paragraph * 1.5)  # 1.5 für Overhead
+            total_words = int(num_paragraphs * words_per_paragraph * 1.5)  # 1.5 für Overhead
             max_tokens = max(4000, min(total_words * 4, 8000))  # Erhöhte Token-Limits
             
-            self.logger.debug(f"Content-Generierung mit {self.params.num_paragraphs} Absätzen und {self.params.words_per_paragraph} Wörtern pro Absatz (±5% Toleranz)")
-            self.logger.debug(f"Erwartete Gesamtwortanzahl: {self.params.num_paragraphs * self.params.words_per_paragraph} (±5% Toleranz)")
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": f"""Du bist ein professioneller Content-Ersteller für Webseiten.
-                    WICHTIG: 
-                    - Jeder Absatz soll MÖGLICHST GENAU {self.params.words_per_paragraph} Wörter enthalten (±5% Toleranz)
-                    - Erstelle GENAU {self.params.num_paragraphs} Absätze
-                    - Die Gesamtwortanzahl soll MÖGLICHST GENAU {self.params.num_paragraphs * self.params.words_per_paragraph} Wörter sein
-                    - Zähle die Wörter in jedem Absatz mehrfach nach
-                    - Ein Wort ist durch Leerzeichen getrennt
-                    - Überschriften zählen NICHT zu den Wörtern"""},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=max_tokens
+            self.logger.debug(f"Content-Generierung mit {num_paragraphs} Absätzen und {words_per_paragraph} Wörtern pro Absatz (±5% Toleranz)")
+            self.logger.debug(f"Erwartete Gesamtwortanzahl: {num_paragraphs * words_per_paragraph} (±5% Toleranz)")
+            
+            messages = [
+                {"role": "system", "content": f"""Du bist ein professioneller Content-Ersteller für Webseiten.
+                WICHTIG: 
+                - Jeder Absatz soll MÖGLICHST GENAU {words_per_paragraph} Wörter enthalten (±5% Toleranz)
+                - Erstelle GENAU {num_paragraphs} Absätze
+                - Die Gesamtwortanzahl soll MÖGLICHST GENAU {num_paragraphs * words_per_paragraph} Wörter sein
+                - Zähle die Wörter in jedem Absatz mehrfach nach
+                - Ein Wort ist durch Leerzeichen getrennt
+                - Überschriften zählen NICHT zu den Wörtern"""},
+                {"role": "user", "content": prompt}
+            ]
+            
+            content, self.last_generation_stats = generate_within_tolerance(
+                lambda stats: self._complete(messages, max_tokens, stats),
+                lambda paragraph, stats: self._repair_paragraph(paragraph, words_per_paragraph, stats),
+                num_paragraphs,
+                words_per_paragraph,
+                max_attempts=max_attempts
             )
-            
-            content = response.choices[0].message.content.strip()
-            
-            # Validiere die Anzahl der Absätze und Wörter
-            paragraphs = [p.strip() for p in content.split('\n\n') if p.strip() and not p.strip().startswith('#')]
-            
-            self.logger.debug(f"Anzahl generierter Absätze: {len(paragraphs)} (Soll: {self.params.num_paragraphs})")
-            
-            if len(paragraphs) != self.params.num_paragraphs:
-                self.logger.warning(f"Falsche Anzahl Absätze: {len(paragraphs)} (Soll: {self.params.num_paragraphs})")
-                return self._generate_with_openai(prompt)
-            
-            # Überprüfe die Wortanzahl in jedem Absatz
-            total_words = 0
-            allowed_deviation = self.params.words_per_paragraph * 0.05  # 5% Toleranz
-            
-            for i, para in enumerate(paragraphs, 1):
-                words = para.split()
-                word_count = len(words)
-                total_words += word_count
-                
-                self.logger.debug(f"Absatz {i}: {word_count} Wörter (Soll: {self.params.words_per_paragraph} ±{int(allowed_deviation)})")
-                
-                # Überprüfe ob die Wortanzahl innerhalb der Toleranz liegt
-                if abs(word_count - self.params.words_per_paragraph) > allowed_deviation:
-                    self.logger.warning(f"Absatz {i} weicht zu stark ab: {word_count} Wörter (Toleranzbereich: {self.params.words_per_paragraph - int(allowed_deviation)} bis {self.params.words_per_paragraph + int(allowed_deviation)})")
-                    return self._generate_with_openai(prompt)
-            
-            # Überprüfe die Gesamtwortanzahl
-            expected_total = self.params.num_paragraphs * self.params.words_per_paragraph
-            total_allowed_deviation = expected_total * 0.05  # 5% Toleranz für Gesamtwortanzahl
-            
-            self.logger.debug(f"Gesamtwortanzahl: {total_words} (Soll: {expected_total} ±{int(total_allowed_deviation)})")
-            
-            if abs(total_words - expected_total) > total_allowed_deviation:
-                self.logger.warning(f"Gesamtwortanzahl weicht zu stark ab: {total_words} (Toleranzbereich: {expected_total - int(total_allowed_deviation)} bis {expected_total + int(total_allowed_deviation)})")
-                return self._generate_with_openai(prompt)
+            self.logger.info(f"Content-Generierung abgeschlossen: {self.last_generation_stats}")
             
             return content
             
         except Exception as e:
             self.logger.error(f"Fehler bei der Content-Generierung: {str(e)}")
-            return f"Fehler bei der Content-Generierung: {str(e)}" 
\ No newline at end of file
+            return f"Fehler bei der Content-Generierung: {str(e)}"
+    
+    def _complete(self, messages, max_tokens, stats):
+        """Führt einen ungecachten Chat-Completion-Aufruf aus und zählt die Tokens"""
+        # Kein Cache: nach einer fehlgeschlagenen Prüfung wird eine neue Antwort benötigt
+        response = chat_completion(
+            "ContentCreationAgent",
+            cache=False,
+            model="gpt-4",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=max_tokens
+        )
+        if response.usage:
+            stats['prompt_tokens'] += response.usage.prompt_tokens
+            stats['completion_tokens'] += response.usage.completion_tokens
+        return response.choices[0].message.content.strip()
+    
+    def _repair_paragraph(self, paragraph, words_per_paragraph, stats):
+        """Schreibt einen einzelnen Absatz auf die Ziel-Wortanzahl um"""
+        messages = paragraph_repair_messages(paragraph, words_per_paragraph)
+        repaired = self._complete(messages, max(500, words_per_paragraph * 4), stats)
+        return repaired_paragraph_text(repaired, paragraph)
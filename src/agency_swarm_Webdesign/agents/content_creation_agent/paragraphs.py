@@ -0,0 +1,216 @@
+"""
+Prüfung und gezielte Reparatur der Absatzlängen von generiertem Content.
+
+Absätze außerhalb der Toleranz werden lokal gekürzt oder einzeln neu
+geschrieben, statt die ganze Seite neu zu generieren; nur bei falscher
+Absatzanzahl wird die Seite erneut erzeugt. Die Anzahl der Durchläufe ist
+begrenzt.
+"""
+
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Maximale Anzahl an Prüf- und Reparaturdurchläufen pro Seite
+MAX_REPAIR_ATTEMPTS = 3
+# Erlaubte Abweichung der Wortanzahl pro Absatz (±5%)
+WORD_TOLERANCE = 0.05
+# Einzelne Zeilen bis zu dieser Länge ohne Satzzeichen gelten als Überschrift
+MAX_HEADLINE_WORDS = 15
+
+# Satzende samt folgendem Leerraum; der Leerraum bleibt beim Kürzen erhalten
+_SENTENCE_END = re.compile(r"(?<=[.!?])(\s+)")
+
+
+def split_content_blocks(content):
+    """Zerlegt generierten Content in Blöcke aus Überschrift und Absatztext.
+
+    Blöcke sind durch Leerzeilen getrennt. Zeilen, die mit ``#`` beginnen,
+    gelten als Überschrift und zählen nicht zum Absatz. Ebenso eine kurze Zeile
+    direkt nach einer H1-Überschrift (die SEO-Hauptüberschrift im Format des
+    Seiten-Prompts) und eine einzelne kurze Zeile ohne Satzzeichen am Ende.
+    Zeilenumbrüche innerhalb eines Absatzes (z.B. Listen) bleiben erhalten.
+    """
+    blocks = []
+    for raw_block in content.split("\n\n"):
+        lines = [line.strip() for line in raw_block.strip().split("\n") if line.strip()]
+        if not lines:
+            continue
+        headings, text = [], []
+        for i, line in enumerate(lines):
+            if line.startswith("#") or (
+                i > 0
+                and _is_h1(lines[i - 1])
+                and len(line.split()) <= MAX_HEADLINE_WORDS
+            ):
+                headings.append(line)
+            else:
+                text.append(line)
+        if not headings and len(text) == 1 and _is_headline(text[0]):
+            headings, text = text, []
+        blocks.append(
+            {"heading": "\n".join(headings) or None, "text": "\n".join(text) or None}
+        )
+    return blocks
+
+
+def _is_h1(line):
+    return line.startswith("#") and not line.startswith("##")
+
+
+def _is_headline(line):
+    return len(line.split()) <= MAX_HEADLINE_WORDS and not line.rstrip("*_ ").endswith(
+        (".", "!", "?", ":")
+    )
+
+
+def join_content_blocks(blocks):
+    """Setzt Blöcke wieder zu Markdown-Content zusammen"""
+    return "\n\n".join(
+        "\n".join(part for part in (block["heading"], block["text"]) if part)
+        for block in blocks
+    )
+
+
+def paragraph_deviations(paragraphs, words_per_paragraph, tolerance=WORD_TOLERANCE):
+    """Liefert die Indizes der Absätze, deren Wortanzahl außerhalb der Toleranz liegt"""
+    allowed_deviation = words_per_paragraph * tolerance
+    return [
+        i
+        for i, paragraph in enumerate(paragraphs)
+        if abs(len(paragraph.split()) - words_per_paragraph) > allowed_deviation
+    ]
+
+
+def trim_paragraph(paragraph, words_per_paragraph, tolerance=WORD_TOLERANCE):
+    """Kürzt einen zu langen Absatz lokal um ganze Sätze.
+
+    Gibt None zurück, wenn der Absatz zu kurz ist oder sich nicht an einer
+    Satzgrenze in den Toleranzbereich kürzen lässt.
+    """
+    allowed_deviation = words_per_paragraph * tolerance
+    if len(paragraph.split()) <= words_per_paragraph + allowed_deviation:
+        return None
+
+    # Abwechselnd Satz und Leerraum: [Satz, Leerraum, Satz, ...]
+    parts = _SENTENCE_END.split(paragraph.strip())
+    while len(parts) > 1:
+        del parts[-2:]
+        trimmed = "".join(parts)
+        word_count = len(trimmed.split())
+        if word_count < words_per_paragraph - allowed_deviation:
+            return None
+        if word_count <= words_per_paragraph + allowed_deviation:
+            return trimmed
+    return None
+
+
+def paragraph_repair_messages(paragraph, words_per_paragraph):
+    """Nachrichten, um einen einzelnen Absatz auf die Ziel-Wortanzahl umzuschreiben"""
+    return [
+        {
+            "role": "system",
+            "content": "Du bist ein professioneller Lektor für Webseiten-Texte. Du gibst ausschließlich den überarbeiteten Absatz zurück, ohne Überschrift und ohne Kommentar.",
+        },
+        {
+            "role": "user",
+            "content": f"""Überarbeite den folgenden Absatz so, dass er EXAKT {words_per_paragraph} Wörter enthält (aktuell: {len(paragraph.split())} Wörter).
+Inhalt, Tonalität und Keywords müssen erhalten bleiben.
+
+ABSATZ:
+{paragraph}""",
+        },
+    ]
+
+
+def repaired_paragraph_text(repaired, paragraph):
+    """Fließtext einer Reparatur-Antwort; liefert das Modell nichts Brauchbares, bleibt ``paragraph``"""
+    # Falls das Modell doch eine Überschrift mitliefert, nur den Fließtext übernehmen
+    texts = [block["text"] for block in split_content_blocks(repaired) if block["text"]]
+    return "\n".join(texts) if texts else paragraph
+
+
+def generate_within_tolerance(
+    generate,
+    rewrite,
+    num_paragraphs,
+    words_per_paragraph,
+    max_attempts=MAX_REPAIR_ATTEMPTS,
+):
+    """Erzeugt Content und repariert abweichende Absätze in höchstens ``max_attempts`` Durchläufen.
+
+    ``generate(stats)`` liefert den Content einer ganzen Seite,
+    ``rewrite(paragraph, stats)`` einen einzeln umgeschriebenen Absatz; beide
+    zählen ihre Tokens in ``stats``. Zurückgegeben wird ``(content, stats)``
+    mit Versuchen, Reparaturen, Tokens und ``within_tolerance``.
+    """
+    stats = {
+        "attempts": 0,
+        "full_generations": 0,
+        "repaired_paragraphs": 0,
+        "trimmed_paragraphs": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "within_tolerance": False,
+    }
+    allowed_deviation = words_per_paragraph * WORD_TOLERANCE
+
+    blocks = last_blocks = None
+    while stats["attempts"] < max_attempts:
+        stats["attempts"] += 1
+
+        if blocks is None:
+            stats["full_generations"] += 1
+            blocks = split_content_blocks(generate(stats))
+
+        paragraphs = [block["text"] for block in blocks if block["text"]]
+        logger.debug(
+            f"Anzahl generierter Absätze: {len(paragraphs)} (Soll: {num_paragraphs})"
+        )
+
+        # Bei falscher Absatzanzahl lässt sich die Struktur nicht gezielt reparieren
+        if len(paragraphs) != num_paragraphs:
+            logger.warning(
+                f"Falsche Anzahl Absätze: {len(paragraphs)} (Soll: {num_paragraphs})"
+            )
+            last_blocks, blocks = blocks, None
+            continue
+
+        deviating = paragraph_deviations(paragraphs, words_per_paragraph)
+        if not deviating:
+            break
+
+        # Nur die abweichenden Absätze werden überarbeitet, die übrigen bleiben erhalten
+        text_blocks = [block for block in blocks if block["text"]]
+        for i in deviating:
+            block = text_blocks[i]
+            word_count = len(block["text"].split())
+            logger.warning(
+                f"Absatz {i + 1} weicht zu stark ab: {word_count} Wörter (Toleranzbereich: {words_per_paragraph - int(allowed_deviation)} bis {words_per_paragraph + int(allowed_deviation)})"
+            )
+
+            trimmed = trim_paragraph(block["text"], words_per_paragraph)
+            if trimmed is not None:
+                block["text"] = trimmed
+                stats["trimmed_paragraphs"] += 1
+            else:
+                block["text"] = rewrite(block["text"], stats)
+                stats["repaired_paragraphs"] += 1
+
+    if blocks is None:
+        # Letzte Generierung trotz falscher Absatzanzahl zurückgeben
+        blocks = last_blocks
+
+    paragraphs = [block["text"] for block in blocks if block["text"]]
+    stats["within_tolerance"] = len(
+        paragraphs
+    ) == num_paragraphs and not paragraph_deviations(paragraphs, words_per_paragraph)
+    logger.debug(
+        f"Gesamtwortanzahl: {sum(len(p.split()) for p in paragraphs)} (Soll: {num_paragraphs * words_per_paragraph})"
+    )
+    if not stats["within_tolerance"]:
+        logger.warning(
+            f"Wortanzahl nach {stats['attempts']} Versuchen weiterhin außerhalb der Toleranz"
+        )
+    return join_content_blocks(blocks), stats
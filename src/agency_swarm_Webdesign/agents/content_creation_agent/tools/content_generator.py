@@ -1,8 +1,7 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
-import openai
-import os
 from dotenv import load_dotenv
+from ....shared.llm import chat_completion
 
 load_dotenv()
 
@@ -19,7 +18,7 @@ class ContentGenerator(BaseTool):
         Generiert Content basierend auf dem gegebenen Prompt.
         """
         try:
-            response = openai.chat.completions.create(
+            response = chat_completion(type(self).__name__,
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "system", "content": "Du bist ein professioneller Content Creator, der SEO-optimierte und ansprechende Texte erstellt."},
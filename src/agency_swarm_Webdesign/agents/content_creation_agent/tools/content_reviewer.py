@@ -1,8 +1,7 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
-import openai
-import os
 from dotenv import load_dotenv
+from ....shared.llm import chat_completion
 
 load_dotenv()
 
@@ -23,7 +22,7 @@ class ContentReviewer(BaseTool):
         Überprüft den Content basierend auf den angegebenen Kriterien.
         """
         try:
-            response = openai.chat.completions.create(
+            response = chat_completion(type(self).__name__,
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "system", "content": "Du bist ein Content-Reviewer mit Expertise in SEO, Lesbarkeit und Textqualität."},
@@ -1,8 +1,7 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
-import openai
-import os
 from dotenv import load_dotenv
+from ....shared.llm import chat_completion
 
 load_dotenv()
 
@@ -19,7 +18,7 @@ class SEOResearcher(BaseTool):
         Schlägt SEO-relevante Begriffe für eine bestimmte Branche vor.
         """
         try:
-            response = openai.chat.completions.create(
+            response = chat_completion(type(self).__name__,
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "system", "content": "Du bist ein SEO-Experte. Analysiere den Text und schlage relevante Keywords vor."},
@@ -0,0 +1,185 @@
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from ...shared.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+
+
+@dataclass
+class FetchResult:
+    """Ergebnis eines einzelnen Seitenabrufs"""
+    url: str
+    status: Optional[int] = None
+    text: Optional[str] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    headers: Dict[str, str] = field(default_factory=dict)
+    data: Optional[dict] = None
+    from_cache: bool = False
+
+
+class CompetitorCrawler:
+    """
+    Asynchroner Crawler für Mitbewerber-Seiten.
+
+    Alle Abrufe eines Laufs teilen sich einen Connection-Pool. Die Anzahl
+    gleichzeitiger Abrufe ist global und pro Host begrenzt, und der gesamte
+    Lauf hat eine feste Deadline: langsame Hosts werden mit einem Fehler
+    übersprungen, statt den Lauf zu blockieren.
+
+    Mit ``cache`` (siehe ``http_cache.HttpCache``) werden frische Antworten
+    ohne Netzwerkzugriff geliefert und abgelaufene per If-None-Match bzw.
+    If-Modified-Since revalidiert. ``extract(url, html)`` wird nur für neue
+    Inhalte aufgerufen; bei 304 werden die gespeicherten Daten wiederverwendet.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = None,
+        per_host: int = None,
+        timeout: float = None,
+        deadline: float = None,
+        max_bytes: int = 2 * 1024 * 1024,
+        headers: Dict[str, str] = None,
+        transport: httpx.AsyncBaseTransport = None,
+        cache=None,
+        extract: Callable[[str, str], dict] = None,
+    ):
+        self.concurrency = concurrency or int(os.getenv("CRAWLER_CONCURRENCY", "8"))
+        self.per_host = per_host or int(os.getenv("CRAWLER_PER_HOST", "2"))
+        self.timeout = timeout or float(os.getenv("CRAWLER_TIMEOUT", "10"))
+        self.deadline = deadline or float(os.getenv("CRAWLER_DEADLINE", "30"))
+        self.max_bytes = max_bytes
+        self.headers = headers or DEFAULT_HEADERS
+        self.transport = transport
+        self.cache = cache
+        self.extract = extract
+
+    async def fetch_all(self, urls: List[str]) -> List[FetchResult]:
+        """Ruft alle URLs parallel ab; die Reihenfolge der Ergebnisse entspricht ``urls``."""
+        if not urls:
+            return []
+
+        global_limit = asyncio.Semaphore(self.concurrency)
+        host_limits = {}
+
+        async with httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrency),
+            transport=self.transport,
+        ) as client:
+
+            async def fetch(url):
+                host = urlsplit(url).netloc
+                host_limit = host_limits.setdefault(host, asyncio.Semaphore(self.per_host))
+                async with global_limit, host_limit:
+                    return await self._fetch(client, url)
+
+            tasks = [asyncio.create_task(fetch(url)) for url in urls]
+            done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        results = []
+        for url, task in zip(urls, tasks):
+            if task in done:
+                results.append(task.result())
+            else:
+                logger.warning(f"Abruf von {url} nach {self.deadline}s abgebrochen")
+                results.append(FetchResult(url=url, error=f"Deadline von {self.deadline:.0f}s überschritten"))
+        return results
+
+    async def _fetch(self, client, url):
+        with start_span("crawler.fetch", {"http.url": url}, kind="client") as span:
+            result = await self._fetch_page(client, url)
+            span.set_attributes({
+                "http.status_code": result.status,
+                "http.response_bytes": len(result.text) if result.text is not None else None,
+                "crawler.from_cache": result.from_cache,
+                "crawler.error": result.error,
+            })
+            return result
+
+    async def _fetch_page(self, client, url):
+        started = time.perf_counter()
+        try:
+            cached = self.cache.lookup(url) if self.cache else None
+            if cached and cached.is_fresh():
+                return await self._from_cache(cached, status=200, started=started)
+
+            request_headers = cached.conditional_headers() if cached else {}
+            async with client.stream("GET", url, headers=request_headers) as response:
+                if response.status_code == 304 and cached:
+                    self.cache.refresh(url, response.headers)
+                    return await self._from_cache(cached, status=304, started=started)
+
+                chunks = []
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= self.max_bytes:
+                        break
+                body = b"".join(chunks)
+                result = FetchResult(
+                    url=url,
+                    status=response.status_code,
+                    text=body.decode(response.encoding or "utf-8", errors="replace"),
+                    headers=dict(response.headers),
+                )
+
+            if self.extract:
+                # Parsen ist CPU-lastig und läuft daher außerhalb des Event-Loops
+                result.data = await asyncio.to_thread(self.extract, url, result.text)
+            if self.cache and result.status == 200:
+                self.cache.store(url, response.headers, result.text, result.data)
+            result.elapsed = time.perf_counter() - started
+            return result
+        except Exception as e:
+            logger.warning(f"Fehler beim Abrufen von {url}: {str(e) or e.__class__.__name__}")
+            return FetchResult(
+                url=url,
+                error=str(e) or e.__class__.__name__,
+                elapsed=time.perf_counter() - started,
+            )
+
+    async def _from_cache(self, cached, status, started):
+        data = cached.extracted
+        if data is None and self.extract:
+            data = await asyncio.to_thread(self.extract, cached.url, cached.body)
+            self.cache.store_extracted(cached.url, data)
+        return FetchResult(
+            url=cached.url,
+            status=status,
+            text=cached.body,
+            elapsed=time.perf_counter() - started,
+            data=data,
+            from_cache=True,
+        )
+
+    def crawl(self, urls: List[str]) -> List[FetchResult]:
+        """Synchroner Einstiegspunkt für Tools, die selbst nicht asynchron laufen."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.fetch_all(urls))
+
+        # Innerhalb eines laufenden Event-Loops in einem eigenen Thread ausführen
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(contextvars.copy_context().run, asyncio.run, self.fetch_all(urls)).result()
@@ -1,14 +1,120 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
-from typing import List, Dict
-import os
 from dotenv import load_dotenv
-from openai import OpenAI
 import json
 import re
+from ...shared.llm import chat_completion
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+SECTION_MARKERS = ["abschnitt:", "sektion:", "kapitel:", "teil:"]
+URL_MARKERS = ["http", "www", "https"]
+KEY_POINT_BULLETS = ("-", "•", "*", "→", ">")
+FEATURE_MARKERS = [
+    "besonderheit", "vorteil", "unique", "alleinstellungsmerkmal",
+    "unterschied", "stärke", "speziell", "besonders"
+]
+CTA_MARKERS = [
+    "call to action", "cta", "handlungsaufforderung",
+    "kontakt", "anfrage", "termin"
+]
+TONE_INDICATORS = {
+    "professionell": ["professionell", "seriös", "geschäftlich", "business"],
+    "freundlich": ["freundlich", "warm", "persönlich", "familiär"],
+    "informativ": ["informativ", "sachlich", "fachlich", "detailliert"],
+    "motivierend": ["motivierend", "inspirierend", "begeisternd"],
+    "locker": ["locker", "casual", "entspannt", "ungezwungen"]
+}
+TARGET_GROUP_PATTERNS = [
+    r"zielgruppe[:\s]+([^\.]+)",
+    r"(?:richtet sich an|für)[:\s]+([^\.]+)",
+    r"(?:kunden|kundenkreis)[:\s]+([^\.]+)"
+]
+
+
+def _marker_pattern(markers):
+    """Eine kompilierte Alternation statt einzelner ``in``-Prüfungen je Marker"""
+    return re.compile("|".join(re.escape(marker) for marker in markers))
+
+
+_SECTION_RE = _marker_pattern(SECTION_MARKERS)
+_URL_RE = _marker_pattern(URL_MARKERS)
+_FEATURE_RE = _marker_pattern(FEATURE_MARKERS)
+_CTA_RE = _marker_pattern(CTA_MARKERS)
+_TONE_RES = [(tone, _marker_pattern(indicators)) for tone, indicators in TONE_INDICATORS.items()]
+_TARGET_GROUP_RES = [re.compile(pattern) for pattern in TARGET_GROUP_PATTERNS]
+
+
+def extract_briefing_features(briefing, tone="", target_audience=""):
+    """
+    Extrahiert Sektionen, Kernbotschaften, Tonalität, Zielgruppe,
+    Alleinstellungsmerkmale und Call-to-Actions in einem Durchlauf.
+
+    Das Briefing wird nur einmal in Kleinbuchstaben umgewandelt und in Zeilen
+    zerlegt; alle Marker werden mit vorkompilierten Mustern gesucht.
+    """
+    briefing_lower = briefing.lower()
+    sections = []
+    key_points = []
+    unique_features = []
+    ctas = []
+    current_section = None
+
+    for raw_line, line in zip(briefing.split('\n'), briefing_lower.split('\n')):
+        line = line.strip()
+        if not line:
+            continue
+        has_colon = ":" in line
+
+        # Sektionen
+        if _SECTION_RE.search(line):
+            if current_section:
+                sections.append(current_section)
+            current_section = {"title": line.split(":", 1)[1].strip(), "content": []}
+        elif current_section:
+            current_section["content"].append(line)
+        elif has_colon and not _URL_RE.search(line):
+            sections.append({"title": line.split(":", 1)[0].strip(), "content": [line.split(":", 1)[1].strip()]})
+
+        # Kernbotschaften (in Originalschreibweise)
+        raw_line = raw_line.strip()
+        if raw_line.startswith(KEY_POINT_BULLETS):
+            key_points.append(raw_line[1:].strip())
+        elif has_colon:
+            point = raw_line.split(":")[1].strip()
+            if len(point) > 10:
+                key_points.append(point)
+
+        # Alleinstellungsmerkmale und Call-to-Actions
+        value = line.split(":", 1)[1].strip() if has_colon else line
+        if _FEATURE_RE.search(line):
+            unique_features.append(value)
+        if _CTA_RE.search(line):
+            ctas.append(value)
+
+    if current_section:
+        sections.append(current_section)
+
+    if not tone:
+        tone = next((name for name, pattern in _TONE_RES if pattern.search(briefing_lower)), "professionell")
+
+    target_group = target_audience or None
+    if not target_group:
+        for pattern in _TARGET_GROUP_RES:
+            match = pattern.search(briefing_lower)
+            if match:
+                target_group = match.group(1).strip()
+                break
+
+    return {
+        "sections": sections,
+        "key_points": key_points,
+        "tone": tone,
+        "target_group": target_group,
+        "unique_features": unique_features,
+        "call_to_actions": ctas
+    }
+
 
 class ContentGenerator(BaseTool):
     """
@@ -39,14 +145,9 @@ class ContentGenerator(BaseTool):
         """
         Analysiert das Briefing und extrahiert wichtige Informationen.
         """
-        briefing_info = {
-            "sections": self._extract_sections(),
-            "key_points": self._extract_key_points(),
-            "tone": self._extract_tone(),
-            "target_group": self._extract_target_group(),
-            "unique_features": self._extract_unique_features(),
-            "call_to_actions": self._extract_ctas()
-        }
+        briefing_info = extract_briefing_features(
+            self.briefing, tone=self.tone, target_audience=self.target_audience
+        )
         
         # Prüfe auf fehlende wichtige Informationen
         missing_info = []
@@ -59,132 +160,6 @@ class ContentGenerator(BaseTool):
             
         return briefing_info, missing_info
 
-    def _extract_sections(self):
-        """Extrahiert die gewünschten Sektionen aus dem Briefing."""
-        sections = []
-        lines = self.briefing.split('\n')
-        current_section = None
-        
-        for line in lines:
-            line = line.strip().lower()
-            if not line:
-                continue
-                
-            # Suche nach Sektionsmarkierungen
-            if any(marker in line for marker in ["abschnitt:", "sektion:", "kapitel:", "teil:"]):
-                if current_section:
-                    sections.append(current_section)
-                current_section = {"title": line.split(":", 1)[1].strip(), "content": []}
-            elif current_section:
-                current_section["content"].append(line)
-            elif ":" in line and not any(url_marker in line.lower() for url_marker in ["http", "www", "https"]):
-                sections.append({"title": line.split(":", 1)[0].strip(), "content": [line.split(":", 1)[1].strip()]})
-        
-        if current_section:
-            sections.append(current_section)
-            
-        return sections
-
-    def _extract_key_points(self):
-        """Extrahiert die Kernbotschaften aus dem Briefing."""
-        key_points = []
-        lines = self.briefing.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Suche nach Aufzählungen und wichtigen Punkten
-            if line.startswith(("-", "•", "*", "→", ">")):
-                key_points.append(line[1:].strip())
-            elif ":" in line and len(line.split(":")[1].strip()) > 10:
-                key_points.append(line.split(":")[1].strip())
-                
-        return key_points
-
-    def _extract_tone(self):
-        """Extrahiert den gewünschten Tonfall aus dem Briefing."""
-        if self.tone:
-            return self.tone
-            
-        tone_indicators = {
-            "professionell": ["professionell", "seriös", "geschäftlich", "business"],
-            "freundlich": ["freundlich", "warm", "persönlich", "familiär"],
-            "informativ": ["informativ", "sachlich", "fachlich", "detailliert"],
-            "motivierend": ["motivierend", "inspirierend", "begeisternd"],
-            "locker": ["locker", "casual", "entspannt", "ungezwungen"]
-        }
-        
-        briefing_lower = self.briefing.lower()
-        detected_tones = []
-        
-        for tone, indicators in tone_indicators.items():
-            if any(indicator in briefing_lower for indicator in indicators):
-                detected_tones.append(tone)
-                
-        return detected_tones[0] if detected_tones else "professionell"
-
-    def _extract_target_group(self):
-        """Extrahiert die Zielgruppe aus dem Briefing."""
-        if self.target_audience:
-            return self.target_audience
-            
-        target_group_patterns = [
-            r"zielgruppe[:\s]+([^\.]+)",
-            r"(?:richtet sich an|für)[:\s]+([^\.]+)",
-            r"(?:kunden|kundenkreis)[:\s]+([^\.]+)"
-        ]
-        
-        briefing_lower = self.briefing.lower()
-        
-        for pattern in target_group_patterns:
-            match = re.search(pattern, briefing_lower)
-            if match:
-                return match.group(1).strip()
-                
-        return None
-
-    def _extract_unique_features(self):
-        """Extrahiert Alleinstellungsmerkmale aus dem Briefing."""
-        features = []
-        feature_markers = [
-            "besonderheit", "vorteil", "unique", "alleinstellungsmerkmal",
-            "unterschied", "stärke", "speziell", "besonders"
-        ]
-        
-        lines = self.briefing.split('\n')
-        
-        for line in lines:
-            line = line.strip().lower()
-            if any(marker in line for marker in feature_markers):
-                if ":" in line:
-                    features.append(line.split(":", 1)[1].strip())
-                else:
-                    features.append(line)
-                    
-        return features
-
-    def _extract_ctas(self):
-        """Extrahiert gewünschte Call-to-Actions aus dem Briefing."""
-        ctas = []
-        cta_markers = [
-            "call to action", "cta", "handlungsaufforderung",
-            "kontakt", "anfrage", "termin"
-        ]
-        
-        lines = self.briefing.split('\n')
-        
-        for line in lines:
-            line = line.strip().lower()
-            if any(marker in line for marker in cta_markers):
-                if ":" in line:
-                    ctas.append(line.split(":", 1)[1].strip())
-                else:
-                    ctas.append(line)
-                    
-        return ctas
-
     def _create_generation_prompt(self, briefing_info):
         """Erstellt einen strukturierten Prompt für die Content-Generierung."""
         prompt_parts = []
@@ -261,7 +236,7 @@ class ContentGenerator(BaseTool):
             prompt = self._create_generation_prompt(briefing_info)
             
             # OpenAI API für die Generierung nutzen
-            response = client.chat.completions.create(
+            response = chat_completion(type(self).__name__,
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "system", "content": "Du bist ein professioneller Content-Creator mit Fokus auf SEO-optimierte Webtexte."},
@@ -1,13 +1,11 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 from typing import List, Dict
-import os
 from dotenv import load_dotenv
-from openai import OpenAI
 import json
+from ...shared.llm import chat_completion
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 class ContentReviewer(BaseTool):
     """
@@ -84,7 +82,7 @@ class ContentReviewer(BaseTool):
             """
             
             # OpenAI API für die Analyse nutzen
-            response = client.chat.completions.create(
+            response = chat_completion(type(self).__name__,
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "system", "content": "Du bist ein erfahrener Content-Editor und SEO-Experte. Führe eine gründliche Analyse durch und gib konkrete, umsetzbare Verbesserungsvorschläge. Formatiere die Ausgabe immer als korrektes JSON."},
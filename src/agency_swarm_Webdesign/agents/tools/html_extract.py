@@ -0,0 +1,240 @@
+"""
+Extraktion von Fließtext und Meta-Tags aus Mitbewerber-Seiten.
+
+Es gibt mehrere austauschbare Backends:
+
+- ``selectolax``: C-beschleunigter Parser (Lexbor), falls installiert
+- ``lxml``: C-beschleunigter Parser, falls installiert
+- ``streaming``: Tokenizer aus der Standardbibliothek, der das Parsen abbricht,
+  sobald das Zeichenbudget und die Meta-Tags gesammelt sind
+- ``bs4``: vollständiger BeautifulSoup-Baum (bisheriges Verhalten, Referenz)
+
+Alle Backends liefern dasselbe Format: ``text`` (Inhalt der p/h1/h2/h3-Elemente,
+mit Leerzeichen verbunden und auf ``budget`` Zeichen gekürzt),
+``meta_description`` und ``meta_keywords``.
+"""
+
+import logging
+import os
+from html.parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+TEXT_TAGS = ("p", "h1", "h2", "h3")
+DEFAULT_BUDGET = 5000
+_CHUNK_SIZE = 16 * 1024
+
+
+def _result(parts, meta, budget):
+    return {
+        "text": " ".join(parts)[:budget],
+        "meta_description": meta.get("description", ""),
+        "meta_keywords": meta.get("keywords", ""),
+    }
+
+
+def _collect_until_budget(texts, budget):
+    """Sammelt Texte, bis das Budget (inklusive Trennzeichen) erreicht ist"""
+    parts = []
+    length = 0
+    for text in texts:
+        parts.append(text)
+        length += len(text) + 1
+        if length > budget:
+            break
+    return parts
+
+
+def extract_bs4(html, budget=DEFAULT_BUDGET):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    parts = [node.get_text() for node in soup.find_all(list(TEXT_TAGS))]
+    meta = {}
+    for name in ("description", "keywords"):
+        tag = soup.find("meta", {"name": name})
+        if tag:
+            meta[name] = tag.get("content") or ""
+    return _result(parts, meta, budget)
+
+
+def extract_selectolax(html, budget=DEFAULT_BUDGET):
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(["script", "style"])
+    texts = (node.text(deep=True) for node in tree.css(", ".join(TEXT_TAGS)))
+    meta = {}
+    for name in ("description", "keywords"):
+        node = tree.css_first(f'meta[name="{name}"]')
+        if node is not None:
+            meta[name] = node.attributes.get("content") or ""
+    return _result(_collect_until_budget(texts, budget), meta, budget)
+
+
+def extract_lxml(html, budget=DEFAULT_BUDGET):
+    import lxml.etree
+    import lxml.html
+
+    if not html.strip():
+        return _result([], {}, budget)
+    root = lxml.html.fromstring(html)
+    lxml.etree.strip_elements(root, "script", "style", with_tail=False)
+    texts = (node.text_content() for node in root.iter(*TEXT_TAGS))
+    meta = {}
+    for name in ("description", "keywords"):
+        nodes = root.xpath(f'//meta[@name="{name}"]')
+        if nodes:
+            meta[name] = nodes[0].get("content") or ""
+    return _result(_collect_until_budget(texts, budget), meta, budget)
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _StreamingExtractor(HTMLParser):
+    """Tokenizer, der nur die benötigten Elemente mitschreibt und früh abbricht"""
+
+    def __init__(self, budget):
+        super().__init__(convert_charrefs=True)
+        self.budget = budget
+        self.parts = []
+        self.meta = {}
+        self.length = 0
+        self.in_body = False
+        self._current = None
+        self._depth = 0
+        self._skip = 0
+
+    @property
+    def done(self):
+        if self.length <= self.budget:
+            return False
+        # Meta-Tags stehen im <head>; im <body> wird nicht mehr nach ihnen gesucht
+        return self.in_body or len(self.meta) == 2
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            self.in_body = True
+        elif tag in ("script", "style"):
+            self._skip += 1
+        elif tag == "meta":
+            attrs = dict(attrs)
+            name = (attrs.get("name") or "").lower()
+            if name in ("description", "keywords") and name not in self.meta:
+                self.meta[name] = attrs.get("content") or ""
+        elif tag in TEXT_TAGS:
+            if tag == "p" and self._current is not None and self._depth == 1:
+                # Ein neues <p> schließt ein offenes <p> implizit
+                self._finish()
+            if self._current is None:
+                self._current = []
+            self._depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style") and self._skip:
+            self._skip -= 1
+        elif tag in TEXT_TAGS and self._depth:
+            self._depth -= 1
+            if not self._depth:
+                self._finish()
+
+    def handle_data(self, data):
+        if self._current is not None and not self._skip:
+            self._current.append(data)
+
+    def _finish(self):
+        text = "".join(self._current)
+        self._current = None
+        self._depth = 0
+        self.parts.append(text)
+        self.length += len(text) + 1
+        if self.done:
+            raise _StopParsing()
+
+    def close_partial(self):
+        if self._current is not None:
+            self.parts.append("".join(self._current))
+            self._current = None
+
+
+def extract_streaming(html, budget=DEFAULT_BUDGET):
+    parser = _StreamingExtractor(budget)
+    try:
+        for start in range(0, len(html), _CHUNK_SIZE):
+            parser.feed(html[start:start + _CHUNK_SIZE])
+        parser.close()
+        parser.close_partial()
+    except _StopParsing:
+        pass
+    return _result(parser.parts, parser.meta, budget)
+
+
+BACKENDS = {
+    "selectolax": extract_selectolax,
+    "lxml": extract_lxml,
+    "streaming": extract_streaming,
+    "bs4": extract_bs4,
+}
+
+
+def _is_available(name):
+    module = {"selectolax": "selectolax.lexbor", "lxml": "lxml.html", "bs4": "bs4"}.get(name)
+    if module is None:
+        return True
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def available_backends():
+    return [name for name in BACKENDS if _is_available(name)]
+
+
+_native = None
+
+
+def _native_backend():
+    global _native
+    if _native is None:
+        _native = next((name for name in ("selectolax", "lxml") if _is_available(name)), "")
+        logger.info(f"HTML-Extraktor (C-Parser): {_native or 'nicht installiert'}")
+    return _native
+
+
+def extract_auto(html, budget=DEFAULT_BUDGET):
+    """
+    Wählt das Backend nach Seitengröße: Kleine Seiten parst ein C-Parser
+    vollständig am schnellsten, bei großen Seiten gewinnt der Streaming-Tokenizer,
+    weil er nach dem Budget abbricht (siehe ``benchmarks/bench_html_extract.py``).
+    """
+    native = _native_backend()
+    if native and len(html) < int(os.getenv("HTML_STREAMING_THRESHOLD", str(64 * 1024))):
+        return BACKENDS[native](html, budget)
+    return extract_streaming(html, budget)
+
+
+BACKENDS["auto"] = extract_auto
+
+
+def get_extractor(name=None):
+    """
+    Liefert die Extraktionsfunktion.
+
+    ``name`` bzw. die Umgebungsvariable ``HTML_EXTRACTOR`` wählt ein Backend
+    (``auto``, ``selectolax``, ``lxml``, ``streaming``, ``bs4``; Standard ``auto``).
+    """
+    name = name or os.getenv("HTML_EXTRACTOR", "auto")
+    if name not in BACKENDS:
+        raise ValueError(f"Unbekannter HTML-Extraktor '{name}'")
+    if not _is_available(name):
+        raise ImportError(f"HTML-Extraktor '{name}' ist nicht installiert")
+    return BACKENDS[name]
+
+
+def extract_page_content(html, budget=DEFAULT_BUDGET, backend=None):
+    """Extrahiert Text und Meta-Tags mit dem konfigurierten Backend"""
+    return get_extractor(backend)(html, budget)
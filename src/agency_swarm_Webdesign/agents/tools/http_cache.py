@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedPage:
+    """Gespeicherte Antwort inklusive Validatoren und extrahierter Daten"""
+    url: str
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    max_age: Optional[float]
+    extracted: Optional[dict]
+
+    def is_fresh(self, now=None):
+        """True, solange die Antwort laut Cache-Control/Expires noch gültig ist"""
+        if not self.max_age:
+            return False
+        return (now or time.time()) - self.fetched_at < self.max_age
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def parse_freshness(headers, now=None):
+    """
+    Liefert ``(cacheable, max_age)`` aus den Response-Headern.
+
+    ``no-store`` verhindert das Speichern, ``no-cache`` erzwingt eine
+    Revalidierung bei jedem Abruf. ``max-age`` hat Vorrang vor ``Expires``.
+    """
+    cache_control = headers.get("cache-control", "").lower()
+    directives = {}
+    for part in cache_control.split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name] = value.strip('"')
+
+    if "no-store" in directives:
+        return False, None
+    if "no-cache" in directives:
+        return True, None
+    if "max-age" in directives:
+        try:
+            return True, max(float(directives["max-age"]), 0.0)
+        except ValueError:
+            return True, None
+
+    expires = headers.get("expires")
+    if expires:
+        try:
+            return True, max(parsedate_to_datetime(expires).timestamp() - (now or time.time()), 0.0)
+        except (TypeError, ValueError):
+            pass
+    return True, None
+
+
+class HttpCache:
+    """Persistenter HTTP-Cache (SQLite) für Mitbewerber-Seiten"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                max_age REAL,
+                extracted TEXT
+            )"""
+        )
+        self._db.commit()
+
+    def lookup(self, url) -> Optional[CachedPage]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, body, etag, last_modified, fetched_at, max_age, extracted FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if not row:
+            return None
+        return CachedPage(*row[:6], extracted=json.loads(row[6]) if row[6] else None)
+
+    def store(self, url, headers, body, extracted=None):
+        """Speichert eine 200-Antwort, sofern sie laut Cache-Control speicherbar ist"""
+        cacheable, max_age = parse_freshness(headers)
+        if not cacheable:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, body, etag, last_modified, fetched_at, max_age, extracted) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    body,
+                    headers.get("etag"),
+                    headers.get("last-modified"),
+                    time.time(),
+                    max_age,
+                    json.dumps(extracted, ensure_ascii=False) if extracted is not None else None,
+                ),
+            )
+            self._db.commit()
+
+    def refresh(self, url, headers):
+        """Aktualisiert Zeitstempel und Validatoren nach einer 304-Antwort"""
+        cacheable, max_age = parse_freshness(headers)
+        with self._lock:
+            if not cacheable:
+                self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+            else:
+                self._db.execute(
+                    "UPDATE pages SET fetched_at = ?, max_age = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                    (time.time(), max_age, headers.get("etag"), headers.get("last-modified"), url),
+                )
+            self._db.commit()
+
+    def store_extracted(self, url, extracted):
+        with self._lock:
+            self._db.execute(
+                "UPDATE pages SET extracted = ? WHERE url = ?",
+                (json.dumps(extracted, ensure_ascii=False), url),
+            )
+            self._db.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """
+    Liefert den prozessweiten HTTP-Cache oder None, wenn er deaktiviert ist.
+
+    - ``HTTP_CACHE_ENABLED``: ``0`` deaktiviert den Cache (Standard ``1``)
+    - ``HTTP_CACHE_PATH``: SQLite-Datei (Standard ``.cache/http_cache.sqlite3``)
+    """
+    global _cache
+    if os.getenv("HTTP_CACHE_ENABLED", "1") == "0":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HttpCache(os.getenv("HTTP_CACHE_PATH", os.path.join(".cache", "http_cache.sqlite3")))
+    return _cache
@@ -1,15 +1,14 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 from typing import List, Dict
-import os
 from dotenv import load_dotenv
-from openai import OpenAI
 import json
-import requests
-from bs4 import BeautifulSoup
+from ...shared.llm import chat_completion
+from .competitor_crawler import CompetitorCrawler
+from .http_cache import get_http_cache
+from .html_extract import extract_page_content
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 class SEOResearcher(BaseTool):
     """
@@ -30,45 +29,32 @@ class SEOResearcher(BaseTool):
         description="Liste der Mitbewerber-URLs"
     )
     
-    def _analyze_competitor_content(self, url: str) -> Dict:
+    def _analyze_competitor_content(self, url: str, html: str) -> Dict:
         """
-        Analysiert den Content eines Mitbewerbers
+        Analysiert den bereits abgerufenen Content eines Mitbewerbers.
+        Fehler werden vom Crawler pro URL erfasst und nicht gecacht.
         """
-        try:
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-            response = requests.get(url, headers=headers, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Text extrahieren
-            text = ' '.join([p.get_text() for p in soup.find_all(['p', 'h1', 'h2', 'h3'])])
-            
-            # Meta-Tags analysieren
-            meta_description = soup.find('meta', {'name': 'description'})
-            meta_keywords = soup.find('meta', {'name': 'keywords'})
-            
-            return {
-                'url': url,
-                'text': text[:5000],  # Begrenzen auf 5000 Zeichen
-                'meta_description': meta_description.get('content') if meta_description else '',
-                'meta_keywords': meta_keywords.get('content') if meta_keywords else ''
-            }
-        except Exception as e:
-            print(f"Fehler beim Analysieren von {url}: {str(e)}")
-            return {
-                'url': url,
-                'error': str(e)
-            }
+        # Text (p/h1/h2/h3, max. 5000 Zeichen) und Meta-Tags extrahieren;
+        # das Backend wird über HTML_EXTRACTOR gewählt (siehe html_extract.py)
+        return {'url': url, **extract_page_content(html, budget=5000)}
     
     def run(self) -> Dict:
         """
         Führt die SEO-Recherche durch
         """
         try:
-            # Mitbewerber-Analyse
+            # Mitbewerber-Seiten parallel abrufen; langsame Hosts werden übersprungen.
+            # Unveränderte Seiten (304) liefern die bereits extrahierten Daten aus dem Cache.
+            crawler = CompetitorCrawler(
+                cache=get_http_cache(),
+                extract=self._analyze_competitor_content
+            )
             competitor_data = []
-            for url in self.competitors:
-                data = self._analyze_competitor_content(url)
-                competitor_data.append(data)
+            for page in crawler.crawl(self.competitors):
+                if page.error:
+                    competitor_data.append({'url': page.url, 'error': page.error})
+                else:
+                    competitor_data.append(page.data)
             
             # Prompt für die Keyword-Analyse erstellen
             prompt = f"""
@@ -90,7 +76,7 @@ class SEOResearcher(BaseTool):
             """
             
             # OpenAI API für die Analyse nutzen
-            response = client.chat.completions.create(
+            response = chat_completion(type(self).__name__,
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "system", "content": "Du bist ein SEO-Experte mit Fokus auf Content-Strategie. Antworte immer in korrektem JSON-Format."},
@@ -1,15 +1,11 @@
 from agency_swarm import Agent
 from agency_swarm.tools import BaseTool
 from pydantic import Field
-from openai import OpenAI
-import os
 from dotenv import load_dotenv
+from ...shared.llm import chat_completion
 
 load_dotenv()
 
-# OpenAI Client initialisieren
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 class AnalyzeBriefingTool(BaseTool):
     """Analysiert ein Website-Briefing und erstellt eine strukturierte Analyse."""
     
@@ -45,7 +41,7 @@ class AnalyzeBriefingTool(BaseTool):
             
             return ["Startseite", "Über uns", "Leistungen", "Kontakt"]
             
-        except Exception as e:
+        except Exception:
             return ["Startseite", "Über uns", "Leistungen", "Kontakt"]
     
     def run(self):
@@ -94,7 +90,7 @@ class AnalyzeBriefingTool(BaseTool):
             3. Die Standardmenüpunkte (Homepage, Über Uns, Leistungen, Kontakt) MÜSSEN immer enthalten sein, außer es wird explizit anders gewünscht"""
 
             # ChatGPT API aufrufen
-            response = client.chat.completions.create(
+            response = chat_completion(type(self).__name__,
                 model="gpt-4-turbo-preview",  # Verwende GPT-4 für bessere Analyse
                 messages=[
                     {"role": "system", "content": "Du bist ein erfahrener Website-Analyst, der Briefings analysiert und strukturiert aufbereitet. Achte besonders darauf, ALLE relevanten Menüpunkte zu identifizieren und im korrekten Format aufzulisten."},
@@ -165,7 +161,7 @@ class SEOResearchTool(BaseTool):
             ..."""
 
             # ChatGPT API aufrufen
-            response = client.chat.completions.create(
+            response = chat_completion(type(self).__name__,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "Du bist ein erfahrener SEO-Experte, der Websites analysiert und relevante Keywords vorschlägt."},
@@ -202,7 +198,7 @@ class QuestionGeneratorTool(BaseTool):
             ..."""
 
             # ChatGPT API aufrufen
-            response = client.chat.completions.create(
+            response = chat_completion(type(self).__name__,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "Du bist ein erfahrener Website-Analyst, der wichtige Verständnisfragen generiert."},
@@ -256,7 +252,7 @@ class UpdateAnalysisTool(BaseTool):
             
             return ["Startseite", "Über uns", "Leistungen", "Kontakt"]
             
-        except Exception as e:
+        except Exception:
             return ["Startseite", "Über uns", "Leistungen", "Kontakt"]
     
     def run(self):
@@ -306,7 +302,7 @@ class UpdateAnalysisTool(BaseTool):
             3. Die Standardmenüpunkte (Homepage, Über Uns, Leistungen, Kontakt) MÜSSEN immer enthalten sein, außer es wird explizit anders gewünscht"""
 
             # ChatGPT API aufrufen
-            response = client.chat.completions.create(
+            response = chat_completion(type(self).__name__,
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "system", "content": "Du bist ein erfahrener Website-Analyst, der Analysen basierend auf neuen Informationen aktualisiert. Achte besonders darauf, ALLE relevanten Menüpunkte zu identifizieren und im korrekten Format aufzulisten."},
@@ -333,10 +329,13 @@ class UpdateAnalysisTool(BaseTool):
                 "menu_items": ["Startseite", "Über uns", "Leistungen", "Kontakt"]
             }
 
+# Name des Einstiegs-Agenten; ohne Instanz verfügbar, z.B. für die Gradio-Auswahl beim Start
+WEBDESIGN_AGENT_NAME = "WebdesignAgent"
+
 class WebdesignAgent(Agent):
     def __init__(self):
         super().__init__(
-            name="WebdesignAgent",
+            name=WEBDESIGN_AGENT_NAME,
             description="Ein Agent für die Analyse von Website-Briefings und SEO-Optimierung",
             instructions="./instructions.md",
             tools=[AnalyzeBriefingTool, SEOResearchTool, QuestionGeneratorTool, UpdateAnalysisTool]
@@ -0,0 +1,154 @@
+"""
+Gemeinsamer Einstiegspunkt für alle Chat-Completion-Aufrufe der Tools.
+
+Ein Timeout pro Request lässt sich mit ``request_timeout`` für einen Block
+setzen; wie ``usage_context`` gilt er auch in Threads, die mit
+``contextvars.copy_context().run`` gestartet werden.
+"""
+
+import contextvars
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletion
+
+from .llm_cache import get_llm_cache
+from .llm_usage import record_completion
+from .openai_client import get_client, with_retries
+from .tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+_timeout = contextvars.ContextVar("llm_request_timeout", default=None)
+
+
+@contextmanager
+def request_timeout(seconds):
+    """Begrenzt jeden OpenAI-Request innerhalb des Blocks auf ``seconds``; Timeouts werden nicht wiederholt"""
+    token = _timeout.set(seconds)
+    try:
+        yield
+    finally:
+        _timeout.reset(token)
+
+
+def _cache_disabled_for(tool):
+    disabled = os.getenv("LLM_CACHE_DISABLED_TOOLS", "")
+    return tool in {name.strip() for name in disabled.split(",") if name.strip()}
+
+
+def chat_completion(tool, cache=True, client=None, **request):
+    """
+    Führt ``chat.completions.create(**request)`` über den gemeinsamen Client aus
+    und nutzt dabei den LLM-Cache. Tokens, Latenz, Wiederholungen und Kosten
+    jedes Aufrufs werden an den ``UsageTracker`` gemeldet (siehe ``llm_usage``).
+
+    Parameters:
+        tool (str): Name des aufrufenden Tools, für Zähler und Opt-out
+        cache (bool): False für Aufrufe, bei denen unterschiedliche Antworten
+            gewünscht sind (z.B. erneute Generierung nach fehlgeschlagener Prüfung)
+        client: Optionaler OpenAI-Client, Standard ist ``get_client()``
+        **request: Parameter für ``chat.completions.create``
+
+    Bei einem Cache-Treffer enthält ``response.usage`` nur Nullen: Es wurden
+    keine Tokens verbraucht.
+    """
+    with start_span(
+        f"openai.chat {tool}", {"llm.tool": tool, "llm.model": request.get("model")}
+    ) as span:
+        response = _chat_completion(tool, cache, client, span, request)
+        usage = response.usage
+        if span.recording and usage is not None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            span.set_attributes(
+                {
+                    "llm.prompt_tokens": usage.prompt_tokens,
+                    "llm.completion_tokens": usage.completion_tokens,
+                    "llm.cached_tokens": getattr(details, "cached_tokens", None) or 0,
+                    "llm.response_bytes": len(response.choices[0].message.content or "")
+                    if response.choices
+                    else 0,
+                }
+            )
+        return response
+
+
+def cache_completion(tool, response, **request):
+    """
+    Legt ``response`` als Antwort auf ``request`` im LLM-Cache ab.
+
+    Für Aufrufer, die eine Antwort nachbearbeiten (z.B. reparierte Absätze):
+    spätere Treffer liefern dann das fertige Ergebnis statt der Rohantwort.
+    """
+    llm_cache = get_llm_cache() if not _cache_disabled_for(tool) else None
+    if llm_cache is not None:
+        llm_cache.put(llm_cache.make_key(request), response.model_dump_json())
+
+
+def _chat_completion(tool, cache, client, span, request):
+    llm_cache = get_llm_cache() if cache and not _cache_disabled_for(tool) else None
+    started = time.perf_counter()
+    if span.recording:
+        span.set_attribute(
+            "llm.request_bytes",
+            sum(len(str(m.get("content") or "")) for m in request.get("messages", [])),
+        )
+
+    if llm_cache is not None:
+        key = llm_cache.make_key(request)
+        cached = llm_cache.get(key, tool=tool)
+        span.set_attribute("llm.cache_hit", cached is not None)
+        if cached is not None:
+            logger.debug(f"LLM-Cache-Treffer für {tool}")
+            response = ChatCompletion.model_validate_json(cached)
+            record_completion(
+                tool,
+                request,
+                response,
+                latency=time.perf_counter() - started,
+                cache_hit=True,
+            )
+            # Gespeichert ist der Verbrauch des ursprünglichen Aufrufs, nicht dieses Treffers
+            response.usage = CompletionUsage(
+                prompt_tokens=0, completion_tokens=0, total_tokens=0
+            )
+            return response
+
+    client = client or get_client()
+    timeout = _timeout.get()
+    if timeout is not None:
+        # Nicht Teil von request, damit der Cache-Schlüssel unabhängig vom Timeout bleibt
+        client = client.with_options(timeout=timeout)
+    retries = []
+    try:
+        response = with_retries(
+            client.chat.completions.create,
+            on_retry=lambda attempt, error: retries.append(error),
+            retry_timeouts=timeout is None,
+            **request,
+        )
+    except Exception as e:
+        record_completion(
+            tool,
+            request,
+            latency=time.perf_counter() - started,
+            retries=len(retries),
+            error=e,
+        )
+        raise
+    finally:
+        span.set_attribute("llm.retries", len(retries))
+    record_completion(
+        tool,
+        request,
+        response,
+        latency=time.perf_counter() - started,
+        retries=len(retries),
+    )
+
+    if llm_cache is not None:
+        llm_cache.put(key, response.model_dump_json())
+    return response
@@ -0,0 +1,177 @@
+"""
+Content-addressed Cache für Chat-Completion-Antworten.
+
+Der Schlüssel ist ein SHA-256-Hash über die vollständigen Request-Parameter
+(Modell, Nachrichten, Temperatur, response_format, max_tokens, ...). Der Cache
+besteht aus zwei Stufen:
+
+- einem LRU-Speicher im Prozess für die zuletzt genutzten Antworten
+- einer SQLite-Datei auf der Festplatte mit größenbasierter Verdrängung
+
+Die SQLite-Datei kann von mehreren Worker-Prozessen geteilt werden; ihre Größe
+wird deshalb bei jedem Schreiben aus der Datei selbst bestimmt, nicht aus einem
+Zähler im Prozess.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """Zweistufiger Cache (Speicher + SQLite) für serialisierte LLM-Antworten."""
+
+    def __init__(self, path=None, memory_entries=256, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._db = None
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(request):
+        """Berechnet den Cache-Schlüssel aus den Request-Parametern."""
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key, tool="unknown"):
+        """Liefert die gespeicherte Antwort oder None."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    value = row[0]
+                    self._db.execute(
+                        "UPDATE responses SET last_access = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+                    self._db.commit()
+                    self._remember(key, value)
+
+            self._counters[tool]["hits" if value is not None else "misses"] += 1
+            return value
+
+    def put(self, key, value):
+        """Speichert eine Antwort in beiden Stufen."""
+        with self._lock:
+            self._remember(key, value)
+            if self._db is None:
+                return
+
+            # Schreibsperre für Einfügen und Verdrängung, damit kein anderer
+            # Prozess dazwischen schreibt und die Summe veraltet
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, value, len(value.encode("utf-8")), time.time()),
+                )
+                self._evict_disk()
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_bytes(self):
+        return self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def _evict_disk(self):
+        # Älteste Einträge entfernen, bis die Größenbegrenzung wieder eingehalten wird
+        disk_bytes = self._disk_bytes()
+        while disk_bytes > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                disk_bytes -= size
+                if disk_bytes <= self.max_bytes:
+                    break
+
+    def stats(self):
+        """Liefert Treffer/Fehlschläge pro Tool sowie die Cache-Größe."""
+        with self._lock:
+            tools = {tool: dict(counts) for tool, counts in self._counters.items()}
+            return {
+                "hits": sum(c["hits"] for c in tools.values()),
+                "misses": sum(c["misses"] for c in tools.values()),
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes() if self._db is not None else 0,
+                "tools": tools,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """
+    Liefert den prozessweiten Cache oder None, wenn er deaktiviert ist.
+
+    Konfiguration über Umgebungsvariablen:
+    - ``LLM_CACHE_ENABLED``: ``0`` deaktiviert den Cache (Standard ``1``)
+    - ``LLM_CACHE_PATH``: SQLite-Datei, leer für reinen Speicher-Cache
+    - ``LLM_CACHE_MEMORY_ENTRIES``: Einträge im Speicher (Standard 256)
+    - ``LLM_CACHE_MAX_MB``: Maximale Größe der SQLite-Datei (Standard 256)
+    """
+    global _cache
+    if os.getenv("LLM_CACHE_ENABLED", "1") == "0":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache(
+                    path=os.getenv(
+                        "LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite3")
+                    )
+                    or None,
+                    memory_entries=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256")),
+                    max_bytes=int(
+                        float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024
+                    ),
+                )
+    return _cache
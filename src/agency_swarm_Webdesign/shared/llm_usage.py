@@ -0,0 +1,274 @@
+"""
+Erfassung von Tokens, Latenz und Kosten aller LLM-Aufrufe der Tools.
+
+``chat_completion`` meldet jeden Aufruf an den ``UsageTracker``. Session und
+Projekt werden über ``usage_context`` gesetzt und per ``contextvars`` an
+Threads weitergegeben, die mit ``contextvars.copy_context().run`` gestartet
+werden (Briefing-Analyse, Batch-Generierung).
+
+Preise (USD pro 1 Mio. Tokens) lassen sich über ``LLM_PRICES`` als JSON
+überschreiben, z.B. ``{"gpt-4o": [2.5, 10, 1.25]}`` für Input, Output und
+gecachten Input.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# USD pro 1 Mio. Tokens: (Input, Output, gecachter Input)
+DEFAULT_PRICES = {
+    "gpt-4-turbo-preview": (10.0, 30.0, 10.0),
+    "gpt-4-turbo": (10.0, 30.0, 10.0),
+    "gpt-4": (30.0, 60.0, 30.0),
+    "gpt-4o": (2.5, 10.0, 1.25),
+    "gpt-4o-mini": (0.15, 0.6, 0.075),
+    "gpt-3.5-turbo": (0.5, 1.5, 0.5),
+}
+
+_scope = contextvars.ContextVar("llm_usage_scope", default={})
+
+
+@contextmanager
+def usage_context(session_id=None, project_id=None):
+    """Ordnet alle LLM-Aufrufe innerhalb des Blocks einer Session bzw. einem Projekt zu"""
+    scope = dict(_scope.get())
+    if session_id:
+        scope["session_id"] = session_id
+    if project_id:
+        scope["project_id"] = project_id
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def current_scope():
+    return _scope.get()
+
+
+def _prices():
+    prices = dict(DEFAULT_PRICES)
+    override = os.getenv("LLM_PRICES")
+    if override:
+        try:
+            prices.update({model: tuple(values) for model, values in json.loads(override).items()})
+        except (ValueError, TypeError) as e:
+            logger.warning(f"LLM_PRICES ist ungültig und wird ignoriert: {str(e)}")
+    return prices
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens=0, prices=None):
+    """Schätzt die Kosten eines Aufrufs in USD; unbekannte Modelle kosten 0"""
+    prices = prices or _prices()
+    price = prices.get(model)
+    if price is None:
+        # Versionierte Modellnamen (z.B. gpt-4o-2024-08-06) auf das Basismodell abbilden
+        matches = [name for name in prices if model and model.startswith(name + "-")]
+        price = prices[max(matches, key=len)] if matches else None
+    if price is None:
+        return 0.0
+    input_price, output_price, cached_price = price
+    uncached = prompt_tokens - cached_tokens
+    return (uncached * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+
+@dataclass
+class UsageRecord:
+    """Ein einzelner LLM-Aufruf"""
+    tool: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    latency: float = 0.0
+    retries: int = 0
+    cache_hit: bool = False
+    error: Optional[str] = None
+    cost: float = 0.0
+    session_id: Optional[str] = None
+    project_id: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+def _empty_totals():
+    return {
+        "calls": 0,
+        "errors": 0,
+        "cache_hits": 0,
+        "retries": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cached_tokens": 0,
+        "cost_usd": 0.0,
+        "latency_total": 0.0,
+        "latency_max": 0.0,
+    }
+
+
+class _Aggregate:
+    """Summen gesamt sowie je Tool und Modell"""
+
+    def __init__(self):
+        self.totals = _empty_totals()
+        self.by_tool = {}
+        self.by_model = {}
+
+    def add(self, record):
+        for totals in (
+            self.totals,
+            self.by_tool.setdefault(record.tool, _empty_totals()),
+            self.by_model.setdefault(record.model, _empty_totals()),
+        ):
+            totals["calls"] += 1
+            totals["errors"] += record.error is not None
+            totals["cache_hits"] += record.cache_hit
+            totals["retries"] += record.retries
+            totals["prompt_tokens"] += record.prompt_tokens
+            totals["completion_tokens"] += record.completion_tokens
+            totals["cached_tokens"] += record.cached_tokens
+            totals["cost_usd"] += record.cost
+            totals["latency_total"] += record.latency
+            totals["latency_max"] = max(totals["latency_max"], record.latency)
+
+    def summary(self):
+        def finish(totals):
+            result = dict(totals)
+            result["cost_usd"] = round(result["cost_usd"], 6)
+            result["latency_avg"] = round(result["latency_total"] / result["calls"], 3) if result["calls"] else 0.0
+            result["latency_total"] = round(result["latency_total"], 3)
+            result["latency_max"] = round(result["latency_max"], 3)
+            return result
+
+        return {
+            "totals": finish(self.totals),
+            "by_tool": {name: finish(totals) for name, totals in sorted(self.by_tool.items())},
+            "by_model": {name: finish(totals) for name, totals in sorted(self.by_model.items())},
+        }
+
+
+class UsageTracker:
+    """
+    Sammelt ``UsageRecord``s und aggregiert sie global, pro Session und pro Projekt.
+
+    Sessions und Projekte werden nach LRU verdrängt (``max_scopes``), die letzten
+    ``max_records`` Einzelaufrufe bleiben für Abfragen erhalten. Listener
+    (``add_listener``) erhalten jeden Record, z.B. für Metriken.
+    """
+
+    def __init__(self, max_scopes=1024, max_records=1000):
+        self.max_scopes = max_scopes
+        self._lock = threading.Lock()
+        self._global = _Aggregate()
+        self._sessions = OrderedDict()
+        self._projects = OrderedDict()
+        self._records = deque(maxlen=max_records)
+        self._listeners = []
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def _scope_aggregate(self, scopes, key):
+        aggregate = scopes.get(key)
+        if aggregate is None:
+            aggregate = scopes[key] = _Aggregate()
+            while len(scopes) > self.max_scopes:
+                scopes.popitem(last=False)
+        else:
+            scopes.move_to_end(key)
+        return aggregate
+
+    def record(self, record: UsageRecord):
+        with self._lock:
+            self._records.append(record)
+            self._global.add(record)
+            if record.session_id:
+                self._scope_aggregate(self._sessions, record.session_id).add(record)
+            if record.project_id:
+                self._scope_aggregate(self._projects, record.project_id).add(record)
+
+        for listener in self._listeners:
+            try:
+                listener(record)
+            except Exception as e:
+                logger.warning(f"Usage-Listener fehlgeschlagen: {str(e)}")
+
+    def summary(self, session_id=None, project_id=None):
+        """Aggregierte Werte; ohne Filter über alle Aufrufe des Prozesses"""
+        with self._lock:
+            if project_id:
+                aggregate = self._projects.get(project_id)
+            elif session_id:
+                aggregate = self._sessions.get(session_id)
+            else:
+                aggregate = self._global
+            summary = (aggregate or _Aggregate()).summary()
+        summary["session_id"] = session_id
+        summary["project_id"] = project_id
+        return summary
+
+    def recent(self, limit=50, session_id=None, project_id=None):
+        with self._lock:
+            records = list(self._records)
+        if session_id:
+            records = [r for r in records if r.session_id == session_id]
+        if project_id:
+            records = [r for r in records if r.project_id == project_id]
+        return [asdict(r) for r in records[-limit:]]
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_usage_tracker():
+    """Liefert den prozessweiten ``UsageTracker``"""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = UsageTracker(
+                    max_scopes=int(os.getenv("USAGE_MAX_SCOPES", "1024")),
+                    max_records=int(os.getenv("USAGE_MAX_RECORDS", "1000")),
+                )
+    return _tracker
+
+
+def record_completion(tool, request, response=None, latency=0.0, retries=0, cache_hit=False, error=None):
+    """Erzeugt aus Request und Antwort einen ``UsageRecord`` und meldet ihn an den Tracker"""
+    usage = getattr(response, "usage", None)
+    prompt_tokens = completion_tokens = cached_tokens = 0
+    if usage is not None and not cache_hit:
+        prompt_tokens = usage.prompt_tokens or 0
+        completion_tokens = usage.completion_tokens or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+
+    # Das angefragte Modell bestimmt den Preis (die Antwort nennt z.B. gpt-4-0125-preview)
+    model = request.get("model") or getattr(response, "model", None) or "unbekannt"
+    scope = current_scope()
+    record = UsageRecord(
+        tool=tool,
+        model=model,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cached_tokens=cached_tokens,
+        latency=latency,
+        retries=retries,
+        cache_hit=cache_hit,
+        error=f"{error.__class__.__name__}: {error}" if error is not None else None,
+        cost=estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens),
+        session_id=scope.get("session_id"),
+        project_id=scope.get("project_id"),
+    )
+    get_usage_tracker().record(record)
+    return record
@@ -0,0 +1,127 @@
+"""
+Zentraler Provider für OpenAI-Clients.
+
+Alle Tools teilen sich einen Client mit einem gemeinsamen HTTP-Connection-Pool,
+damit TLS-Verbindungen zwischen Aufrufen wiederverwendet werden. Timeouts und
+Pool-Größen sind über Umgebungsvariablen einstellbar:
+
+- ``OPENAI_CONNECT_TIMEOUT`` (Standard 5s), ``OPENAI_READ_TIMEOUT`` (Standard 120s)
+- ``OPENAI_MAX_CONNECTIONS`` (Standard 64), ``OPENAI_MAX_KEEPALIVE`` (Standard 16)
+- ``OPENAI_MAX_RETRIES`` (Standard 4): Wiederholungen bei 429, 5xx und Verbindungsfehlern
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+
+import httpx
+import openai
+from openai import OpenAI
+
+from .tracing import trace_http_client
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_client = None
+
+
+def _timeout():
+    return httpx.Timeout(
+        connect=float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5")),
+        read=float(os.getenv("OPENAI_READ_TIMEOUT", "120")),
+        write=30.0,
+        pool=10.0,
+    )
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "64")),
+        max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE", "16")),
+        keepalive_expiry=60.0,
+    )
+
+
+def max_retries():
+    return int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+
+
+def get_client():
+    """
+    Liefert den gemeinsamen synchronen Client.
+
+    Die eingebauten Wiederholungen des SDK sind deaktiviert; Wiederholungen
+    laufen über ``with_retries``, damit sie gezählt werden können.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    timeout=_timeout(),
+                    max_retries=0,
+                    http_client=trace_http_client(
+                        httpx.Client(timeout=_timeout(), limits=_limits())
+                    ),
+                )
+    return _client
+
+
+def get_agency_client():
+    """
+    Liefert einen Client für agency_swarm (Assistants, Threads, Runs).
+
+    Er nutzt denselben Connection-Pool, behält aber die Wiederholungen des SDK,
+    da agency_swarm seine Aufrufe nicht über ``with_retries`` führt.
+    """
+    return get_client().with_options(max_retries=max_retries())
+
+
+def _is_retryable(error, retry_timeouts=True):
+    if isinstance(error, openai.APITimeoutError):
+        return retry_timeouts
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _retry_delay(error, attempt, base=0.5, cap=30.0):
+    # Retry-After des Servers hat Vorrang, sonst exponentieller Backoff mit Full Jitter
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), cap)
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def with_retries(fn, *args, retries=None, on_retry=None, retry_timeouts=True, **kwargs):
+    """
+    Ruft ``fn(*args, **kwargs)`` auf und wiederholt bei 429, 5xx und
+    Verbindungsfehlern mit exponentiellem Backoff.
+
+    ``on_retry(attempt, error)`` wird vor jeder Wiederholung aufgerufen.
+    Mit ``retry_timeouts=False`` werden Timeouts nicht wiederholt.
+    """
+    retries = max_retries() if retries is None else retries
+    attempt = 0
+    while True:
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt >= retries or not _is_retryable(e, retry_timeouts):
+                raise
+            delay = _retry_delay(e, attempt)
+            attempt += 1
+            logger.warning(
+                f"OpenAI-Aufruf fehlgeschlagen ({e.__class__.__name__}), Versuch {attempt}/{retries} in {delay:.1f}s"
+            )
+            if on_retry:
+                on_retry(attempt, e)
+            time.sleep(delay)
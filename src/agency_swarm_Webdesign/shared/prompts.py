@@ -0,0 +1,106 @@
+"""
+Prompt-Templates mit stabilem, cachebarem Präfix.
+
+OpenAI cacht Prompts anhand ihres Anfangs: Nur wenn die ersten Tokens einer
+Anfrage byte-identisch mit einer vorherigen sind, werden sie aus dem Cache
+gelesen. Ein ``PromptTemplate`` ordnet die Nachrichten deshalb immer gleich an:
+
+1. statischer System-Text
+2. gemeinsamer Kontext eines Projekts (z.B. Briefing und Analyse)
+3. Parameter der einzelnen Anfrage (z.B. Menüpunkt, Absatzanzahl)
+
+Alles vor Teil 3 ist für alle Seiten eines Projekts identisch. Die Anzahl
+gecachter Prompt-Tokens wird aus ``usage.prompt_tokens_details`` gelesen und
+pro Template gezählt; ``prompt_stats()`` liefert die Zähler aller Templates.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_templates = []
+_templates_lock = threading.Lock()
+
+
+def prompt_cache_usage(usage):
+    """Liefert ``(prompt_tokens, cached_tokens)`` aus dem ``usage``-Feld einer Antwort"""
+    if usage is None:
+        return 0, 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    return usage.prompt_tokens or 0, cached
+
+
+class PromptTemplate:
+    """
+    Baut Chat-Nachrichten aus statischem System-Text, gemeinsamem Kontext und
+    Anfrage-Parametern.
+
+    ``context`` und ``request`` sind ``str.format``-Vorlagen. Der Kontext wird
+    unverändert übernommen (kein Strippen oder Umformatieren), damit derselbe
+    Briefing-Text immer dieselben Bytes ergibt.
+    """
+
+    def __init__(self, name, system, context, request):
+        self.name = name
+        self.system = system
+        self.context = context
+        self.request = request
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        with _templates_lock:
+            _templates.append(self)
+
+    def prefix_messages(self, **context):
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.context.format(**context)},
+        ]
+
+    def render(self, context, **params):
+        """Liefert die Nachrichtenliste: gemeinsames Präfix, dann die Anfrage-Parameter"""
+        return self.prefix_messages(**context) + [
+            {"role": "user", "content": self.request.format(**params)}
+        ]
+
+    def prefix_hash(self, **context):
+        """Fingerprint des Präfixes; gleich für alle Anfragen mit demselben Kontext"""
+        prefix = json.dumps(self.prefix_messages(**context), ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+
+    def record_usage(self, response):
+        """Zählt gecachte und ungecachte Prompt-Tokens einer Antwort und gibt sie zurück.
+
+        Antworten aus dem LLM-Cache zählen mit 0 Tokens.
+        """
+        prompt_tokens, cached_tokens = prompt_cache_usage(getattr(response, "usage", None))
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["prompt_tokens"] += prompt_tokens
+            self._stats["cached_tokens"] += cached_tokens
+        logger.info(
+            f"Prompt {self.name}: {prompt_tokens} Prompt-Tokens, davon {cached_tokens} gecacht, "
+            f"{prompt_tokens - cached_tokens} ungecacht"
+        )
+        return {
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "uncached_tokens": prompt_tokens - cached_tokens,
+        }
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["uncached_tokens"] = stats["prompt_tokens"] - stats["cached_tokens"]
+        stats["cached_ratio"] = stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+        return stats
+
+
+def prompt_stats():
+    """Zähler aller Templates nach Name (nur dieser Prozess)"""
+    with _templates_lock:
+        templates = list(_templates)
+    return {template.name: template.stats() for template in templates}
@@ -0,0 +1,659 @@
+"""
+Tracing mit verschachtelten Spans für Requests, Agenten-Turns, Tools,
+OpenAI-Aufrufe und Crawler-Abrufe.
+
+Der aktuelle Span liegt in einer ``contextvars``-Variable und wird damit an
+``contextvars.copy_context().run``-Threads und asyncio-Tasks weitergegeben.
+Abgeschlossene Spans sammelt ein Hintergrund-Thread und übergibt sie
+gebündelt an den konfigurierten Exporter.
+
+Konfiguration über Umgebungsvariablen:
+
+- ``TRACING_EXPORTER``: ``none`` (Standard), ``json`` oder ``otlp``
+- ``TRACING_FILE``: Zieldatei des JSON-Exporters (Standard ``.cache/traces.jsonl``)
+- ``OTEL_EXPORTER_OTLP_ENDPOINT``: OTLP/HTTP-Endpunkt (Standard ``http://localhost:4318``)
+- ``OTEL_EXPORTER_OTLP_HEADERS``: zusätzliche Header, z.B. ``api-key=abc,x-team=web``
+- ``OTEL_SERVICE_NAME``: Service-Name in den Spans (Standard ``agency-swarm-webdesign``)
+- ``TRACING_SAMPLE_RATE``: Anteil aufgezeichneter Traces zwischen 0 und 1 (Standard 1)
+"""
+
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """Ein aufgezeichneter Abschnitt mit Start, Ende und Attributen"""
+
+    recording = True
+
+    def __init__(
+        self, name, trace_id, parent_id=None, attributes=None, kind="internal"
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = "ok"
+        self.error = None
+
+    def set_attribute(self, key, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, error):
+        self.status = "error"
+        self.error = f"{error.__class__.__name__}: {error}"
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            get_tracer().on_end(self)
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+class NonRecordingSpan(Span):
+    """Span eines nicht gesampelten Traces: wird weitergereicht, aber nie exportiert"""
+
+    recording = False
+
+    def __init__(self, trace_id=None):
+        self.name = ""
+        self.trace_id = trace_id or ""
+        self.span_id = ""
+        self.parent_id = None
+        self.attributes = {}
+
+    def set_attribute(self, key, value):
+        pass
+
+    def record_exception(self, error):
+        pass
+
+    def end(self):
+        pass
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{'0' * 16}-00" if self.trace_id else None
+
+
+def current_span():
+    return _current_span.get()
+
+
+def parse_traceparent(header):
+    """Liefert ``(trace_id, parent_id, sampled)`` aus einem W3C-traceparent-Header"""
+    try:
+        version, trace_id, parent_id, flags = header.strip().split("-")
+        int(trace_id, 16), int(parent_id, 16)
+        if len(trace_id) != 32 or len(parent_id) != 16:
+            return None
+        return trace_id, parent_id, bool(int(flags, 16) & 1)
+    except (AttributeError, ValueError):
+        return None
+
+
+@contextmanager
+def use_span(span):
+    """Setzt ``span`` als aktuellen Span, ohne ihn am Ende zu beenden"""
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Generatoren können in einem anderen Kontext fortgesetzt werden
+            _current_span.set(None)
+
+
+@contextmanager
+def start_span(name, attributes=None, parent=None, kind="internal", traceparent=None):
+    """
+    Startet einen Span als Kind des aktuellen (oder ``parent``) Spans.
+
+    Ohne Eltern-Span wird ein neuer Trace begonnen und per ``TRACING_SAMPLE_RATE``
+    entschieden, ob er aufgezeichnet wird. ``traceparent`` setzt einen Trace
+    aus einem eingehenden W3C-Header fort.
+    """
+    tracer = get_tracer()
+    parent = parent if parent is not None else _current_span.get()
+
+    if not tracer.enabled:
+        span = NonRecordingSpan()
+    elif parent is not None:
+        span = (
+            Span(name, parent.trace_id, parent.span_id, attributes, kind)
+            if parent.recording
+            else parent
+        )
+    else:
+        incoming = parse_traceparent(traceparent) if traceparent else None
+        if incoming:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id, sampled = (
+                f"{random.getrandbits(128):032x}",
+                None,
+                tracer.should_sample(),
+            )
+        span = (
+            Span(name, trace_id, parent_id, attributes, kind)
+            if sampled
+            else NonRecordingSpan(trace_id)
+        )
+
+    with use_span(span):
+        try:
+            yield span
+        except BaseException as e:
+            if span.recording and not isinstance(e, GeneratorExit):
+                span.record_exception(e)
+            raise
+        finally:
+            if span is not parent:
+                span.end()
+
+
+def traced(name=None, **attributes):
+    """Decorator: führt die Funktion in einem eigenen Span aus"""
+
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name, attributes):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# Exporter
+
+
+class JsonFileExporter:
+    """Schreibt jeden Span als JSON-Zeile in eine Datei"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = "".join(
+            json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+            for span in spans
+        )
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def shutdown(self):
+        pass
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes):
+    return [
+        {"key": key, "value": _otlp_value(value)} for key, value in attributes.items()
+    ]
+
+
+_OTLP_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+class OtlpHttpExporter:
+    """Sendet Spans im OTLP/HTTP-JSON-Format an ``<endpoint>/v1/traces``"""
+
+    def __init__(
+        self,
+        endpoint,
+        headers=None,
+        service_name="agency-swarm-webdesign",
+        timeout=10.0,
+    ):
+        self.url = endpoint.rstrip("/") + (
+            "" if endpoint.rstrip("/").endswith("/v1/traces") else "/v1/traces"
+        )
+        self.service_name = service_name
+        self._client = httpx.Client(timeout=timeout, headers=headers or {})
+
+    def _payload(self, spans):
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": _OTLP_KINDS.get(span.kind, 1),
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": _otlp_attributes(span.attributes),
+                "status": {"code": 2, "message": span.error}
+                if span.status == "error"
+                else {"code": 1},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes(
+                            {"service.name": self.service_name}
+                        )
+                    },
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": otlp_spans}],
+                }
+            ]
+        }
+
+    def export(self, spans):
+        response = self._client.post(self.url, json=self._payload(spans))
+        if response.status_code >= 400:
+            logger.warning(f"OTLP-Export fehlgeschlagen: HTTP {response.status_code}")
+
+    def shutdown(self):
+        self._client.close()
+
+
+class Tracer:
+    """Nimmt beendete Spans entgegen und exportiert sie gebündelt im Hintergrund"""
+
+    def __init__(
+        self,
+        exporter=None,
+        sample_rate=1.0,
+        batch_size=256,
+        flush_interval=2.0,
+        max_queue=10000,
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    @property
+    def enabled(self):
+        return self.exporter is not None and self.sample_rate > 0
+
+    def should_sample(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def on_end(self, span):
+        if not self.enabled:
+            return
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="trace-exporter", daemon=True
+                    )
+                    self._thread.start()
+
+    def _drain(self, block):
+        batch = []
+        try:
+            batch.append(
+                self._queue.get(timeout=self.flush_interval)
+                if block
+                else self._queue.get_nowait()
+            )
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _export(self, batch):
+        if not batch:
+            return
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.warning(f"Export von {len(batch)} Spans fehlgeschlagen: {str(e)}")
+
+    def _run(self):
+        while True:
+            self._export(self._drain(block=True))
+
+    def flush(self):
+        while not self._queue.empty():
+            self._export(self._drain(block=False))
+
+    def shutdown(self):
+        if self.exporter is not None:
+            self.flush()
+            self.exporter.shutdown()
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def _parse_headers(value):
+    headers = {}
+    for part in (value or "").split(","):
+        key, _, val = part.partition("=")
+        if key.strip():
+            headers[key.strip()] = val.strip()
+    return headers
+
+
+def create_exporter(name=None):
+    name = (name or os.getenv("TRACING_EXPORTER", "none")).lower()
+    if name == "json":
+        return JsonFileExporter(
+            os.getenv("TRACING_FILE", os.path.join(".cache", "traces.jsonl"))
+        )
+    if name == "otlp":
+        return OtlpHttpExporter(
+            os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"),
+            headers=_parse_headers(os.getenv("OTEL_EXPORTER_OTLP_HEADERS")),
+            service_name=os.getenv("OTEL_SERVICE_NAME", "agency-swarm-webdesign"),
+        )
+    if name not in ("", "none"):
+        logger.warning(
+            f"Unbekannter TRACING_EXPORTER '{name}', Tracing ist deaktiviert"
+        )
+    return None
+
+
+def get_tracer():
+    """Liefert den prozessweiten Tracer (konfiguriert über Umgebungsvariablen)"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer(
+                    exporter=create_exporter(),
+                    sample_rate=min(
+                        max(float(os.getenv("TRACING_SAMPLE_RATE", "1")), 0.0), 1.0
+                    ),
+                )
+                atexit.register(_tracer.shutdown)
+    return _tracer
+
+
+def set_tracer(tracer):
+    """Ersetzt den Tracer, z.B. mit einem eigenen Exporter"""
+    global _tracer
+    _tracer = tracer
+
+
+# HTTP
+
+
+def _content_length(headers):
+    try:
+        return int(headers.get("content-length"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TracingTransport(httpx.BaseTransport):
+    """httpx-Transport, der jeden ausgehenden Request als Client-Span aufzeichnet"""
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    def handle_request(self, request):
+        with start_span(
+            f"HTTP {request.method} {request.url.host}{request.url.path}",
+            {
+                "http.method": request.method,
+                "http.url": str(request.url.copy_with(query=None)),
+                "http.request_bytes": _content_length(request.headers),
+            },
+            kind="client",
+        ) as span:
+            response = self._transport.handle_request(request)
+            span.set_attribute("http.status_code", response.status_code)
+            span.set_attribute("http.response_bytes", _content_length(response.headers))
+            return response
+
+    def close(self):
+        self._transport.close()
+
+
+def trace_http_client(client):
+    """
+    Zeichnet alle Requests eines ``httpx.Client`` auf, sofern Tracing aktiv ist.
+
+    Der Standard-Transport des Clients wird umhüllt statt ersetzt, damit Limits
+    und Proxy-Einstellungen aus der Umgebung erhalten bleiben.
+    """
+    if get_tracer().enabled and not isinstance(client._transport, TracingTransport):
+        client._transport = TracingTransport(client._transport)
+    return client
+
+
+class TracingMiddleware:
+    """
+    ASGI-Middleware: ein Server-Span pro HTTP-Request.
+
+    Ein eingehender ``traceparent``-Header setzt den Trace des Aufrufers fort.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not get_tracer().enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in scope.get("headers", [])
+        }
+        with start_span(
+            f"HTTP {scope['method']} {scope['path']}",
+            {
+                "http.method": scope["method"],
+                "http.target": scope["path"],
+                "http.request_bytes": _content_length(headers),
+            },
+            kind="server",
+            traceparent=headers.get("traceparent"),
+        ) as span:
+            sent = {"bytes": 0}
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                elif message["type"] == "http.response.body":
+                    sent["bytes"] += len(message.get("body", b""))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if (
+                    span.recording
+                    and route is not None
+                    and getattr(route, "path", None)
+                ):
+                    span.name = f"HTTP {scope['method']} {route.path}"
+                    span.set_attribute("http.route", route.path)
+                span.set_attribute("http.response_bytes", sent["bytes"])
+
+
+# agency_swarm
+
+
+def _payload_size(value):
+    try:
+        return len(value if isinstance(value, str) else json.dumps(value, default=str))
+    except Exception:
+        return None
+
+
+def instrument_tools(base_class=None):
+    """
+    Umhüllt ``run`` aller bereits definierten ``BaseTool``-Unterklassen mit einem Span.
+
+    Muss nach dem Import der Agenten aufgerufen werden; bereits umhüllte Klassen
+    werden übersprungen.
+    """
+    if base_class is None:
+        from agency_swarm.tools import BaseTool as base_class
+
+    pending = list(base_class.__subclasses__())
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        run = cls.__dict__.get("run")
+        if (
+            run is None
+            or getattr(run, "__traced__", False)
+            or inspect.iscoroutinefunction(run)
+        ):
+            continue
+
+        def make_wrapper(run, tool_name):
+            @functools.wraps(run)
+            def traced_run(self, *args, **kwargs):
+                with start_span(f"tool {tool_name}", {"tool.name": tool_name}) as span:
+                    if span.recording:
+                        try:
+                            span.set_attribute(
+                                "tool.input_bytes", len(self.model_dump_json())
+                            )
+                        except Exception:
+                            pass
+                    result = run(self, *args, **kwargs)
+                    if span.recording:
+                        span.set_attribute("tool.output_bytes", _payload_size(result))
+                    return result
+
+            traced_run.__traced__ = True
+            return traced_run
+
+        setattr(cls, "run", make_wrapper(run, cls.__name__))
+
+
+def instrument_agency_swarm():
+    """
+    Zeichnet jeden Agenten-Turn (``Thread.get_completion``) als Span auf.
+
+    agency_swarm führt parallele Tool-Aufrufe in eigenen Threads aus; der Span
+    des Turns wird deshalb am Thread-Objekt gemerkt und in ``execute_tool`` als
+    Eltern-Span gesetzt.
+    """
+    from agency_swarm.threads.thread import Thread
+
+    if getattr(Thread.get_completion, "__traced__", False):
+        return
+
+    original_get_completion = Thread.get_completion
+    original_execute_tool = Thread.execute_tool
+
+    @functools.wraps(original_get_completion)
+    def get_completion(self, message, *args, **kwargs):
+        recipient = (
+            kwargs.get("recipient_agent")
+            or (args[2] if len(args) > 2 else None)
+            or self.recipient_agent
+        )
+        sender = getattr(self.agent, "name", None) or "user"
+        with start_span(
+            f"agent {sender} -> {recipient.name}",
+            {
+                "agent.sender": sender,
+                "agent.recipient": recipient.name,
+                "agent.message_bytes": _payload_size(message) if message else 0,
+            },
+        ) as span:
+            previous, self._trace_span = getattr(self, "_trace_span", None), span
+            try:
+                result = yield from original_get_completion(
+                    self, message, *args, **kwargs
+                )
+                span.set_attribute("agent.thread_id", self.id)
+                span.set_attribute(
+                    "agent.response_bytes", _payload_size(result) if result else 0
+                )
+                return result
+            finally:
+                self._trace_span = previous
+
+    @functools.wraps(original_execute_tool)
+    def execute_tool(self, *args, **kwargs):
+        parent = getattr(self, "_trace_span", None)
+        if parent is None or current_span() is parent:
+            return original_execute_tool(self, *args, **kwargs)
+        with use_span(parent):
+            return original_execute_tool(self, *args, **kwargs)
+
+    get_completion.__traced__ = True
+    Thread.get_completion = get_completion
+    Thread.execute_tool = execute_tool
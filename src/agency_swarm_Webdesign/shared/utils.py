@@ -1,6 +1,4 @@
 import requests
-import json
-import os
 from typing import Dict, Any
 
 class AgentCommunicator:
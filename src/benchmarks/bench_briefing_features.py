@@ -0,0 +1,226 @@
+"""
+Micro-benchmark for the single-pass briefing feature extractor.
+
+Compares ``extract_briefing_features`` with the previous per-feature methods of
+ContentGenerator (kept below as ``LegacyBriefingAnalysis``), asserts that both
+produce identical output and prints the timings.
+
+Usage (from src/):
+    python -m benchmarks.bench_briefing_features --size-kb 50 --repeat 20
+"""
+
+import argparse
+import random
+import re
+import timeit
+
+from agency_swarm_Webdesign.agents.tools.content_generator import extract_briefing_features
+
+SAMPLE_BRIEFING = """
+Abschnitt: Einleitung
+Eine kurze Vorstellung unserer Webdesign-Agentur.
+
+Abschnitt: Leistungen
+- Responsive Webdesign
+- SEO-Optimierung
+- Content-Erstellung
+
+Zielgruppe: Kleine und mittlere Unternehmen in München
+Tonalität: Professionell und persönlich
+
+Besonderheiten:
+- 10 Jahre Erfahrung
+- Persönliche Betreuung
+- Faire Preise
+Kontakt: Termin vereinbaren unter https://www.example.de/kontakt
+"""
+
+WORDS = (
+    "wir sind eine agentur für webdesign in münchen und bieten unseren kunden eine persönliche "
+    "betreuung mit fairen preisen sowie seo beratung termin kontakt vorteil besonders stärke "
+    "warm sachlich https://www.example.de Unternehmen Projekt Qualität"
+).split()
+
+
+class LegacyBriefingAnalysis:
+    """The previous ContentGenerator implementation, one scan per feature."""
+
+    def __init__(self, briefing, tone="", target_audience=""):
+        self.briefing = briefing
+        self.tone = tone
+        self.target_audience = target_audience
+
+    def analyze(self):
+        return {
+            "sections": self._extract_sections(),
+            "key_points": self._extract_key_points(),
+            "tone": self._extract_tone(),
+            "target_group": self._extract_target_group(),
+            "unique_features": self._extract_unique_features(),
+            "call_to_actions": self._extract_ctas()
+        }
+
+    def _extract_sections(self):
+        """Extrahiert die gewünschten Sektionen aus dem Briefing."""
+        sections = []
+        lines = self.briefing.split('\n')
+        current_section = None
+        
+        for line in lines:
+            line = line.strip().lower()
+            if not line:
+                continue
+                
+            # Suche nach Sektionsmarkierungen
+            if any(marker in line for marker in ["abschnitt:", "sektion:", "kapitel:", "teil:"]):
+                if current_section:
+                    sections.append(current_section)
+                current_section = {"title": line.split(":", 1)[1].strip(), "content": []}
+            elif current_section:
+                current_section["content"].append(line)
+            elif ":" in line and not any(url_marker in line.lower() for url_marker in ["http", "www", "https"]):
+                sections.append({"title": line.split(":", 1)[0].strip(), "content": [line.split(":", 1)[1].strip()]})
+        
+        if current_section:
+            sections.append(current_section)
+            
+        return sections
+
+    def _extract_key_points(self):
+        """Extrahiert die Kernbotschaften aus dem Briefing."""
+        key_points = []
+        lines = self.briefing.split('\n')
+        
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+                
+            # Suche nach Aufzählungen und wichtigen Punkten
+            if line.startswith(("-", "•", "*", "→", ">")):
+                key_points.append(line[1:].strip())
+            elif ":" in line and len(line.split(":")[1].strip()) > 10:
+                key_points.append(line.split(":")[1].strip())
+                
+        return key_points
+
+    def _extract_tone(self):
+        """Extrahiert den gewünschten Tonfall aus dem Briefing."""
+        if self.tone:
+            return self.tone
+            
+        tone_indicators = {
+            "professionell": ["professionell", "seriös", "geschäftlich", "business"],
+            "freundlich": ["freundlich", "warm", "persönlich", "familiär"],
+            "informativ": ["informativ", "sachlich", "fachlich", "detailliert"],
+            "motivierend": ["motivierend", "inspirierend", "begeisternd"],
+            "locker": ["locker", "casual", "entspannt", "ungezwungen"]
+        }
+        
+        briefing_lower = self.briefing.lower()
+        detected_tones = []
+        
+        for tone, indicators in tone_indicators.items():
+            if any(indicator in briefing_lower for indicator in indicators):
+                detected_tones.append(tone)
+                
+        return detected_tones[0] if detected_tones else "professionell"
+
+    def _extract_target_group(self):
+        """Extrahiert die Zielgruppe aus dem Briefing."""
+        if self.target_audience:
+            return self.target_audience
+            
+        target_group_patterns = [
+            r"zielgruppe[:\s]+([^\.]+)",
+            r"(?:richtet sich an|für)[:\s]+([^\.]+)",
+            r"(?:kunden|kundenkreis)[:\s]+([^\.]+)"
+        ]
+        
+        briefing_lower = self.briefing.lower()
+        
+        for pattern in target_group_patterns:
+            match = re.search(pattern, briefing_lower)
+            if match:
+                return match.group(1).strip()
+                
+        return None
+
+    def _extract_unique_features(self):
+        """Extrahiert Alleinstellungsmerkmale aus dem Briefing."""
+        features = []
+        feature_markers = [
+            "besonderheit", "vorteil", "unique", "alleinstellungsmerkmal",
+            "unterschied", "stärke", "speziell", "besonders"
+        ]
+        
+        lines = self.briefing.split('\n')
+        
+        for line in lines:
+            line = line.strip().lower()
+            if any(marker in line for marker in feature_markers):
+                if ":" in line:
+                    features.append(line.split(":", 1)[1].strip())
+                else:
+                    features.append(line)
+                    
+        return features
+
+    def _extract_ctas(self):
+        """Extrahiert gewünschte Call-to-Actions aus dem Briefing."""
+        ctas = []
+        cta_markers = [
+            "call to action", "cta", "handlungsaufforderung",
+            "kontakt", "anfrage", "termin"
+        ]
+        
+        lines = self.briefing.split('\n')
+        
+        for line in lines:
+            line = line.strip().lower()
+            if any(marker in line for marker in cta_markers):
+                if ":" in line:
+                    ctas.append(line.split(":", 1)[1].strip())
+                else:
+                    ctas.append(line)
+                    
+        return ctas
+
+
+def synthetic_briefing(size_kb, seed=7):
+    """Pasted client documents: prose, bullet lists, key/value lines and URLs."""
+    rng = random.Random(seed)
+    prefixes = ["", "", "", "- ", "• ", "Abschnitt: ", "Hinweis: ", "Kapitel: ", "  * "]
+    lines = [SAMPLE_BRIEFING]
+    size = len(SAMPLE_BRIEFING)
+    while size < size_kb * 1024:
+        line = rng.choice(prefixes) + " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25)))
+        if rng.random() < 0.2:
+            line = line.capitalize() + "."
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-kb", type=int, action="append", help="briefing size (repeatable, default: 1, 10, 50)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    cases = [("sample", SAMPLE_BRIEFING)] + [
+        (f"{size} KB", synthetic_briefing(size)) for size in (args.size_kb or [1, 10, 50])
+    ]
+    for name, briefing in cases:
+        for tone, target_audience in (("", ""), ("professionell", "KMUs in München")):
+            legacy = LegacyBriefingAnalysis(briefing, tone, target_audience)
+            assert extract_briefing_features(briefing, tone, target_audience) == legacy.analyze(), name
+
+        legacy = LegacyBriefingAnalysis(briefing)
+        old = min(timeit.repeat(legacy.analyze, number=1, repeat=args.repeat))
+        new = min(timeit.repeat(lambda: extract_briefing_features(briefing), number=1, repeat=args.repeat))
+        print(f"{name:>8}: legacy {old * 1000:8.3f} ms  single-pass {new * 1000:8.3f} ms  speedup {old / new:5.2f}x  (identical)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+End-to-end throughput benchmark against a local fake OpenAI server.
+
+Starts benchmarks.fake_openai in a subprocess, points OPENAI_BASE_URL at it,
+imports the app (main.py) and serves it with uvicorn in a background thread.
+Every scenario then runs at increasing concurrency:
+
+    api        POST /api/agency (agency_swarm thread, run and polling)
+    briefing   start_briefing_analysis -> process_answers -> iter_generated_pages
+    chat       Gradio chat (user + bot) through the Gradio queue via gradio_client
+
+Per level it reports p50/p95/p99 latency, requests per second, errors, OpenAI
+requests per session and RSS growth per session, as JSON on stdout (and in
+--output). Agency output is redirected to stderr. The app runs in a temporary
+working directory, so settings.json and caches of the repo stay untouched.
+
+Usage (from src/):
+    python -m benchmarks.bench_e2e --levels 1,4,16 --rounds 2 --output e2e.json
+    python -m benchmarks.bench_e2e --scenario briefing --latency 1 --error-rate 0.05
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from benchmarks.fake_openai import add_arguments
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("api", "briefing", "chat")
+
+BRIEFING = """Wir sind eine Schreinerei in Freiburg mit 12 Mitarbeitern und fertigen
+Küchen, Einbauschränke und Möbel nach Maß. Die neue Website soll Privatkunden
+zwischen 30 und 60 Jahren ansprechen, unsere Referenzen zeigen und Anfragen
+für ein Beratungsgespräch erzeugen. Tonalität: persönlich, hochwertig, regional."""
+
+ANSWERS = """1. Schwerpunkt sind Küchen, danach Einbauschränke.
+2. Wir möchten eine Seite mit Referenzen und ein Kontaktformular.
+3. Budget und Zeitrahmen sind flexibel."""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+
+    # Fallback without /proc (macOS): peak RSS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, int(round(q / 100 * len(values) + 0.5)) - 1))
+    return round(values[index], 4)
+
+
+def start_fake_server(args):
+    port = free_port()
+    command = [
+        sys.executable, "-m", "benchmarks.fake_openai", "--port", str(port),
+        "--latency", str(args.latency),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--completion-tokens", str(args.completion_tokens),
+        "--error-rate", str(args.error_rate),
+        "--error-status", str(args.error_status),
+        "--retry-after", str(args.retry_after),
+        "--poll-after-ms", str(args.poll_after_ms),
+        "--seed", str(args.seed),
+        "--paragraph-overshoot", str(args.paragraph_overshoot),
+    ]
+    if args.delegate:
+        command.append("--delegate")
+    process = subprocess.Popen(command, cwd=SRC_DIR, stdout=subprocess.DEVNULL)
+    stats_url = f"http://127.0.0.1:{port}/_stats"
+    for _ in range(100):
+        try:
+            httpx.get(stats_url, timeout=1)
+            return process, f"http://127.0.0.1:{port}/v1", stats_url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("fake OpenAI server did not start")
+
+
+def start_app(workdir):
+    """Imports main.py with the benchmark environment and serves it with uvicorn."""
+    import uvicorn
+
+    os.chdir(workdir)
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    import main
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def api_scenario(base_url, token):
+    client = httpx.Client(
+        base_url=base_url,
+        timeout=600,
+        limits=httpx.Limits(max_connections=256),
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    def session(level, index):
+        response = client.post("/api/agency", json={"message": f"Wie lange dauert ein Relaunch? ({level}/{index})"})
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        return {}
+
+    return session
+
+
+def briefing_scenario(pages):
+    from agency_swarm_Webdesign import agency as agency_module
+
+    def session(level, index):
+        session_id = f"bench-{level}-{index}"
+        steps = {}
+        started = time.perf_counter()
+        analysis = agency_module.start_briefing_analysis(BRIEFING, session_id)
+        steps["analyze"] = time.perf_counter() - started
+        if analysis.startswith("Fehler"):
+            raise RuntimeError(analysis[:200])
+
+        started = time.perf_counter()
+        updated = agency_module.process_answers(ANSWERS, session_id)
+        steps["answers"] = time.perf_counter() - started
+        if updated.startswith("Fehler"):
+            raise RuntimeError(updated[:200])
+
+        started = time.perf_counter()
+        briefing_data = agency_module.get_session_state(session_id)["complete_briefing"]
+        menu_items = briefing_data["menu_items"][:pages]
+        results = list(agency_module.iter_generated_pages(briefing_data, menu_items, 3, 150, session_id=session_id))
+        steps["pages"] = time.perf_counter() - started
+        failed = [result for result in results if result["status"] != "done"]
+        if failed or len(results) != len(menu_items):
+            raise RuntimeError(f"{len(failed)} of {len(menu_items)} pages failed")
+        return steps
+
+    return session
+
+
+def chat_scenario(base_url, blocks):
+    from gradio_client import Client
+
+    fns = blocks.fns.items() if isinstance(blocks.fns, dict) else enumerate(blocks.fns)
+    names = {}
+    for fn_index, block_fn in fns:
+        names.setdefault(getattr(block_fn, "name", None) or block_fn.fn.__name__, fn_index)
+    user_index, bot_index = names["user"], names["bot"]
+
+    def session(level, index):
+        # A new client per session gets its own Gradio session hash
+        with contextlib.redirect_stdout(sys.stderr):
+            client = Client(f"{base_url}/demo-gradio/", verbose=False)
+        try:
+            started = time.perf_counter()
+            message, history = client.predict(f"Hallo ({level}/{index})", [], fn_index=user_index)
+            client.predict(message, history, fn_index=bot_index)
+            return {"chat": time.perf_counter() - started}
+        finally:
+            client.close()
+
+    return session
+
+
+def run_level(session, concurrency, rounds, stats_url, timeout):
+    """Runs ``concurrency * rounds`` sessions with ``concurrency`` workers."""
+    total = concurrency * rounds
+    latencies, steps, errors = [], {}, []
+    lock = threading.Lock()
+
+    def timed(index):
+        started = time.perf_counter()
+        try:
+            result = session(concurrency, index)
+        except Exception as e:
+            with lock:
+                errors.append(f"{e.__class__.__name__}: {e}")
+            return
+        # Sessions that time their own steps leave out setup such as client creation
+        elapsed = sum(result.values()) if result else time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            for name, value in (result or {}).items():
+                steps.setdefault(name, []).append(value)
+
+    gc.collect()
+    rss_before = rss_bytes()
+    openai_before = httpx.get(stats_url).json()["total_requests"]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench-session") as executor:
+        futures = [executor.submit(timed, index) for index in range(total)]
+        for future in futures:
+            future.result(timeout=timeout)
+    duration = time.perf_counter() - started
+    openai_requests = httpx.get(stats_url).json()["total_requests"] - openai_before - 1
+    gc.collect()
+    rss_after = rss_bytes()
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "sessions": total,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:3],
+        "duration_s": round(duration, 3),
+        "rps": round(len(latencies) / duration, 3) if duration else None,
+        "latency_s": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": round(sum(latencies) / len(latencies), 4) if latencies else None,
+            "max": round(latencies[-1], 4) if latencies else None,
+        },
+        "steps_p50_s": {name: percentile(sorted(values), 50) for name, values in steps.items()},
+        "openai_requests_per_session": round(openai_requests / total, 2),
+        "rss_mb": round(rss_after / 2**20, 1),
+        "rss_growth_kb_per_session": round((rss_after - rss_before) / 1024 / total, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=2, help="sessions per worker and level")
+    parser.add_argument("--pages", type=int, default=3, help="pages generated per briefing session")
+    parser.add_argument("--timeout", type=float, default=900, help="seconds per level before giving up")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    add_arguments(parser)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(",") if level]
+
+    fake, openai_base_url, stats_url = start_fake_server(args)
+    os.environ.update({
+        "OPENAI_BASE_URL": openai_base_url,
+        "OPENAI_API_KEY": "sk-fake",
+        "LLM_CACHE_ENABLED": "0",
+    })
+    os.environ.setdefault("APP_TOKEN", "bench")
+    workdir = tempfile.mkdtemp(prefix="bench-e2e-")
+    output = os.path.abspath(args.output) if args.output else None
+
+    report = {
+        "python": platform.python_version(),
+        "fake_openai": httpx.get(stats_url).json()["config"],
+        "levels": levels,
+        "rounds": args.rounds,
+        "results": {},
+    }
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            started = time.perf_counter()
+            server, base_url = start_app(workdir)
+            report["startup_s"] = round(time.perf_counter() - started, 3)
+            import main as app_module
+
+            logging.getLogger().setLevel(logging.WARNING)
+            sessions = {
+                "api": lambda: api_scenario(base_url, os.environ["APP_TOKEN"]),
+                "briefing": lambda: briefing_scenario(args.pages),
+                "chat": lambda: chat_scenario(base_url, app_module.gradio_interface),
+            }
+            for name in args.scenario or SCENARIOS:
+                session = sessions[name]()
+                report["results"][name] = []
+                for level in levels:
+                    result = run_level(session, level, args.rounds, stats_url, args.timeout)
+                    report["results"][name].append(result)
+                    print(f"{name} x{level}: p50 {result['latency_s']['p50']}s, "
+                          f"{result['rps']} rps, {result['errors']} errors", file=sys.stderr)
+            server.should_exit = True
+    finally:
+        fake.terminate()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
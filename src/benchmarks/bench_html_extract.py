@@ -0,0 +1,100 @@
+"""
+Benchmark for the competitor HTML extractors.
+
+Runs every installed backend over a corpus of saved HTML pages and reports the
+time per page and whether the extracted result matches the BeautifulSoup
+reference. Without --corpus a synthetic corpus of heavy pages is used.
+
+Usage (from src/):
+    python -m benchmarks.bench_html_extract --corpus path/to/pages --repeat 5
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import statistics
+import time
+
+from agency_swarm_Webdesign.agents.tools.html_extract import BACKENDS, available_backends
+
+
+def synthetic_corpus(count=20, paragraphs=2000, seed=42):
+    """Builds pages with a large head, inline scripts and thousands of paragraphs."""
+    rng = random.Random(seed)
+    words = "webdesign agentur münchen seo content kunden projekt service qualität &amp; beratung".split()
+    pages = []
+    for index in range(count):
+        body = []
+        for number in range(paragraphs):
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(8, 40)))
+            if number % 50 == 0:
+                body.append(f"<h2>Abschnitt {number}</h2>")
+            if number % 200 == 0:
+                body.append(f"<script>var data = '{'x' * 500}';</script>")
+            body.append(f'<div class="row"><p>{sentence} <a href="/p/{number}">mehr</a></p></div>')
+        pages.append(
+            "<!DOCTYPE html><html><head><title>Seite {0}</title>"
+            '<meta name="description" content="Beschreibung {0}">'
+            '<meta name="keywords" content="webdesign, seo, {0}">'
+            "<style>{1}</style></head><body><h1>Seite {0}</h1>{2}</body></html>".format(
+                index, "body{margin:0}" * 200, "".join(body)
+            )
+        )
+    return pages
+
+
+def load_corpus(directory):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "**", "*.htm*"), recursive=True)):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    return pages
+
+
+def run(pages, backends, repeat, budget):
+    reference = [BACKENDS["bs4"](html, budget) for html in pages] if "bs4" in backends else None
+    results = {}
+    for name in backends:
+        extract = BACKENDS[name]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            outputs = [extract(html, budget) for html in pages]
+            timings.append((time.perf_counter() - started) / len(pages))
+        entry = {"ms_per_page": round(statistics.median(timings) * 1000, 3)}
+        if reference is not None:
+            entry["identical_to_bs4"] = sum(out == ref for out, ref in zip(outputs, reference))
+            entry["meta_identical"] = sum(
+                (out["meta_description"], out["meta_keywords"]) == (ref["meta_description"], ref["meta_keywords"])
+                for out, ref in zip(outputs, reference)
+            )
+        results[name] = entry
+
+    if reference is not None:
+        base = results["bs4"]["ms_per_page"]
+        for entry in results.values():
+            entry["speedup_vs_bs4"] = round(base / entry["ms_per_page"], 2) if entry["ms_per_page"] else None
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="directory with saved .html pages (default: synthetic pages)")
+    parser.add_argument("--backend", action="append", help="backend to run (repeatable, default: all installed)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=int, default=5000)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not pages:
+        parser.error(f"no .html files found in {args.corpus}")
+    backends = args.backend or available_backends()
+
+    print(f"{len(pages)} pages, avg {sum(map(len, pages)) // len(pages) // 1024} KB")
+    print(json.dumps(run(pages, backends, args.repeat, args.budget), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Startup benchmark of the serving modes (SERVE_MODE=all vs. api).
+
+Starts ``uvicorn main:app`` in a subprocess per run, as the Docker image does,
+against a local fake OpenAI server and in a temporary working directory. For
+every mode it reports the median over --runs of:
+
+    listening_s   until GET /health answers (server accepts connections)
+    ready_s       until GET /health?ready=true answers 200 (warm-up done)
+    rss_mb        resident memory of the worker once it is ready
+
+Usage (from src/):
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --modes api --latency 0.5 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_e2e import SRC_DIR, free_port
+from benchmarks.fake_openai import FakeConfig, FakeOpenAIServer
+
+MODES = ("all", "api")
+
+
+def process_rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def wait_for(url, started, process, timeout):
+    """Seconds since ``started`` until ``url`` answers 200."""
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def start_once(mode, openai_base_url, timeout):
+    port = free_port()
+    env = dict(
+        os.environ,
+        SERVE_MODE=mode,
+        OPENAI_BASE_URL=openai_base_url,
+        OPENAI_API_KEY="sk-fake",
+        LLM_CACHE_ENABLED="0",
+        PYTHONPATH=SRC_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""),
+    )
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=tempfile.mkdtemp(prefix="bench-startup-"),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        listening = wait_for(f"{base_url}/health", started, process, timeout)
+        ready = wait_for(f"{base_url}/health?ready=true", started, process, timeout)
+        rss = process_rss_bytes(process.pid)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {"listening_s": listening, "ready_s": ready, "rss_mb": rss / 2**20 if rss else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated SERVE_MODE values")
+    parser.add_argument("--runs", type=int, default=3, help="server starts per mode")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake OpenAI request")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds per start before giving up")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(config=FakeConfig(latency=args.latency)).start()
+    report = {"python": platform.python_version(), "runs": args.runs, "modes": {}}
+    try:
+        for mode in [mode for mode in args.modes.split(",") if mode]:
+            runs = [start_once(mode, server.base_url, args.timeout) for _ in range(args.runs)]
+            report["modes"][mode] = {
+                key: round(statistics.median(run[key] for run in runs), 3)
+                for key in ("listening_s", "ready_s", "rss_mb")
+                if all(run[key] is not None for run in runs)
+            }
+            print(f"{mode}: {report['modes'][mode]}", file=sys.stderr)
+    finally:
+        server.shutdown()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
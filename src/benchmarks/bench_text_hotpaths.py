@@ -0,0 +1,277 @@
+"""
+Micro-benchmarks for the pure-Python text helpers that run on every request.
+
+Covers the three copies of extract_menu_items (agency.py, AnalyzeBriefingTool,
+UpdateAnalysisTool), the briefing feature extraction (single pass and the
+legacy per-feature methods), debug_dict and the paragraph/word-count
+helpers of content_creation_agent/paragraphs.py, over a generated corpus from
+small to very large briefings, analyses and pages.
+
+For every function and size it records the best time per call and, in a separate
+run under tracemalloc, the peak and retained allocations. Results can be saved
+as a baseline and later runs are compared against it.
+
+agency.py creates its agents lazily (get_agency()), but importing it still
+builds the shared OpenAI client and opens the session store. It is therefore
+imported against an in-process fake OpenAI server in a temporary working
+directory. Logging is raised to WARNING so log handlers do not distort the
+timings.
+
+Usage (from src/):
+    python -m benchmarks.bench_text_hotpaths --save-baseline
+    python -m benchmarks.bench_text_hotpaths --sizes 1,64 --fail-on-regression
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from agency_swarm_Webdesign.agents.content_creation_agent.paragraphs import (
+    WORD_TOLERANCE,
+    join_content_blocks,
+    paragraph_deviations,
+    split_content_blocks,
+    trim_paragraph,
+)
+from agency_swarm_Webdesign.agents.tools.content_generator import extract_briefing_features
+from agency_swarm_Webdesign.agents.webdesign_agent.agent import AnalyzeBriefingTool, UpdateAnalysisTool
+from benchmarks.bench_briefing_features import LegacyBriefingAnalysis, synthetic_briefing
+from benchmarks.fake_openai import FakeOpenAIServer
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "text_hotpaths.json")
+DEFAULT_SIZES = (1, 16, 256, 2048)
+WORDS_PER_PARAGRAPH = 150
+
+WORDS = (
+    "Wir gestalten moderne Websites für Handwerk Handel und Dienstleister in der Region mit klarer "
+    "Struktur persönlicher Beratung fairen Preisen messbarer Sichtbarkeit und nachhaltigem Erfolg "
+    "unserer Kunden Zielgruppe Angebot Qualität Vertrauen Erfahrung Team"
+).split()
+
+
+def _sentence(rng, min_words=6, max_words=18):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))).capitalize() + "."
+
+
+def _paragraph(rng, words):
+    sentences, count = [], 0
+    while count < words:
+        sentence = _sentence(rng)
+        sentences.append(sentence)
+        count += len(sentence.split())
+    return " ".join(sentences)
+
+
+def synthetic_analysis(size_kb, seed=11):
+    """An analysis as written by AnalyzeBriefingTool, padded with target group prose."""
+    rng = random.Random(seed)
+    menu = [f"- Seite {index}: {_sentence(rng, 3, 8)}" for index in range(5 + size_kb // 4)]
+    parts = ["📋 Briefing-Analyse\n" + _paragraph(rng, 60), "📑 Seitenstruktur\n" + "\n".join(menu),
+             "🎯 Zielgruppen-Analyse"]
+    size = sum(len(part) for part in parts)
+    while size < size_kb * 1024:
+        paragraph = _paragraph(rng, 80)
+        parts.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(parts)
+
+
+def synthetic_page(size_kb, seed=13):
+    """Generated page content: headings and paragraphs within and outside the word tolerance."""
+    rng = random.Random(seed)
+    blocks = ["# Leistungen", "Moderne Websites für Ihr Unternehmen"]
+    size = sum(len(block) for block in blocks)
+    index = 0
+    while size < size_kb * 1024:
+        words = int(WORDS_PER_PARAGRAPH * rng.choice((1.0, 1.0, 0.97, 1.12, 1.3, 0.8)))
+        block = f"## Abschnitt {index}\n" + _paragraph(rng, words)
+        blocks.append(block)
+        size += len(block) + 2
+        index += 1
+    return "\n\n".join(blocks)
+
+
+def synthetic_briefing_data(size_kb):
+    return {
+        "original_briefing": synthetic_briefing(size_kb),
+        "project_id": "0123456789ab",
+        "menu_items": AnalyzeBriefingTool.extract_menu_items(None, synthetic_analysis(size_kb)),
+        "analysis": synthetic_analysis(size_kb),
+        "seo_terms": _paragraph(random.Random(size_kb), 80),
+        "final_analysis": synthetic_analysis(size_kb, seed=12),
+        "content_params": {"menu_item": "Leistungen", "num_paragraphs": 3, "words_per_paragraph": WORDS_PER_PARAGRAPH},
+    }
+
+
+def validate_page(content, words_per_paragraph=WORDS_PER_PARAGRAPH):
+    """The local part of one _generate_with_openai iteration: split, check, trim, join."""
+    blocks = split_content_blocks(content)
+    paragraphs = [block["text"] for block in blocks if block["text"]]
+    text_blocks = [block for block in blocks if block["text"]]
+    for index in paragraph_deviations(paragraphs, words_per_paragraph):
+        trimmed = trim_paragraph(text_blocks[index]["text"], words_per_paragraph)
+        if trimmed is not None:
+            text_blocks[index]["text"] = trimmed
+    return join_content_blocks(blocks)
+
+
+def import_agency():
+    """Imports agency.py against an in-process fake OpenAI server."""
+    server = FakeOpenAIServer().start()
+    os.environ.update({"OPENAI_BASE_URL": server.base_url, "OPENAI_API_KEY": "sk-fake", "LLM_CACHE_ENABLED": "0"})
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="bench-hotpaths-"))
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            from agency_swarm_Webdesign import agency
+    finally:
+        os.chdir(cwd)
+        logging.getLogger().setLevel(logging.WARNING)
+    return agency
+
+
+def build_cases(sizes, with_agency=True):
+    """Returns ``name -> (function, {size label -> argument})``."""
+    analyses = {f"{size}kb": synthetic_analysis(size) for size in sizes}
+    briefings = {f"{size}kb": synthetic_briefing(size) for size in sizes}
+    pages = {f"{size}kb": synthetic_page(size) for size in sizes}
+    page_blocks = {label: split_content_blocks(page) for label, page in pages.items()}
+    paragraphs = {label: [block["text"] for block in blocks if block["text"]] for label, blocks in page_blocks.items()}
+
+    cases = {
+        "AnalyzeBriefingTool.extract_menu_items": (lambda text: AnalyzeBriefingTool.extract_menu_items(None, text), analyses),
+        "UpdateAnalysisTool.extract_menu_items": (lambda text: UpdateAnalysisTool.extract_menu_items(None, text), analyses),
+        "extract_briefing_features": (extract_briefing_features, briefings),
+        "LegacyBriefingAnalysis.analyze": (lambda text: LegacyBriefingAnalysis(text).analyze(), briefings),
+        "split_content_blocks": (split_content_blocks, pages),
+        "paragraph_deviations": (lambda items: paragraph_deviations(items, WORDS_PER_PARAGRAPH, WORD_TOLERANCE), paragraphs),
+        "trim_paragraph": (lambda items: [trim_paragraph(item, WORDS_PER_PARAGRAPH) for item in items], paragraphs),
+        "join_content_blocks": (join_content_blocks, page_blocks),
+        "validate_page": (validate_page, pages),
+    }
+    if with_agency:
+        agency = import_agency()
+        data = {f"{size}kb": synthetic_briefing_data(size) for size in sizes}
+        cases["agency.extract_menu_items"] = (agency.extract_menu_items, analyses)
+        cases["agency.debug_dict"] = (agency.debug_dict, data)
+    return cases
+
+
+def measure(function, argument, min_time, repeat):
+    """Best-of-``repeat`` seconds per call, plus peak and retained bytes of one call under tracemalloc."""
+    function(argument)
+    number, elapsed = 1, 0.0
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            function(argument)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / repeat or number >= 1_000_000:
+            break
+        number *= 10
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            function(argument)
+        timings.append((time.perf_counter() - started) / number)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = function(argument)
+        current, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    return {
+        "us_per_call": round(min(timings) * 1e6, 2),
+        "peak_kb": round((peak - before) / 1024, 1),
+        "retained_kb": round((current - before) / 1024, 1),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Prints time and peak memory ratios against the baseline; returns the regressions."""
+    regressions = []
+    for name, sizes in results.items():
+        for label, entry in sizes.items():
+            reference = baseline.get("results", {}).get(name, {}).get(label)
+            if not reference:
+                print(f"{name:42} {label:>7} {entry['us_per_call']:>12.1f} us  (no baseline)")
+                continue
+            time_ratio = entry["us_per_call"] / reference["us_per_call"] if reference["us_per_call"] else 1.0
+            memory_ratio = entry["peak_kb"] / reference["peak_kb"] if reference["peak_kb"] else 1.0
+            flag = ""
+            if time_ratio > threshold or memory_ratio > threshold:
+                flag = "  REGRESSION"
+                regressions.append((name, label, round(time_ratio, 2), round(memory_ratio, 2)))
+            print(f"{name:42} {label:>7} {entry['us_per_call']:>12.1f} us  x{time_ratio:5.2f} time  "
+                  f"x{memory_ratio:5.2f} peak{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated input sizes in KB")
+    parser.add_argument("--function", action="append", help="only run functions containing this text (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds of timing per function and size")
+    parser.add_argument("--no-agency", action="store_true", help="skip the helpers that need agency.py")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.3, help="ratio above the baseline reported as regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+
+    cases = build_cases(sizes, with_agency=not args.no_agency)
+    results = {}
+    for name, (function, arguments) in cases.items():
+        if args.function and not any(part in name for part in args.function):
+            continue
+        results[name] = {label: measure(function, argument, args.min_time, args.repeat) for label, argument in arguments.items()}
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "sizes_kb": sizes,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(json.dumps(report, indent=2))
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return
+
+    if not os.path.exists(args.baseline):
+        print(json.dumps(report, indent=2))
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regressions above x{args.threshold}: {regressions}", file=sys.stderr)
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
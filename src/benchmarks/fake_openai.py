@@ -0,0 +1,821 @@
+"""
+Local OpenAI-compatible stand-in server for benchmarks.
+
+Serves the endpoints used by the tools and by agency_swarm: chat completions
+(plain and streamed), assistants, threads, messages, runs (polled and streamed)
+and file uploads. Everything is kept in memory; responses are canned German
+text that contains a "Seitenstruktur" section so the menu extraction works.
+
+Latency, token rate and error injection are configurable, so the app can be
+load-tested without an API key and without cost:
+
+    latency             seconds before the first byte of every model call
+    tokens_per_second   generation speed; a run completes after latency + tokens / rate
+    completion_tokens   words per generated answer
+    error_rate          share of model calls answered with error_status
+    error_status        429 or 500 (both carry a Retry-After header)
+    paragraph_overshoot share by which the first paragraph of a generated page
+                        is too long (0 = every paragraph has the requested length)
+    delegate            runs of assistants with a SendMessage tool first pass the
+                        last user message on to their first recipient agent
+
+Chat completions that ask for page content (the content tool's prompt) are
+answered in the requested format: H1, headline and the requested number of
+paragraphs. Requests to rewrite a single paragraph get the requested length.
+
+Usage (from src/):
+    python -m benchmarks.fake_openai --port 8765 --latency 0.3 --tokens-per-second 80
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=sk-fake python main.py
+
+GET /_stats returns the number of requests per endpoint and injected errors.
+"""
+
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+WORDS = (
+    "Webdesign Agentur Kunden Projekt Service Qualität Beratung Zielgruppe Angebot "
+    "Erfahrung Lösung Unternehmen Website Inhalte Vertrauen Region Team individuell "
+    "modern professionell zuverlässig nachhaltig persönlich"
+).split()
+
+REPLY_HEAD = """📑 Seitenstruktur
+- Startseite: Überblick und Einstieg
+- Über uns: Team und Geschichte
+- Leistungen: Angebot im Detail
+- Referenzen: Ausgewählte Projekte
+- Kontakt: Anfahrt und Formular
+
+🎯 Zielgruppen-Analyse
+"""
+
+
+@dataclass
+class FakeConfig:
+    latency: float = 0.2
+    tokens_per_second: float = 200.0
+    completion_tokens: int = 120
+    error_rate: float = 0.0
+    error_status: int = 429
+    retry_after: float = 0.1
+    poll_after_ms: int = 100
+    seed: int = 0
+    paragraph_overshoot: float = 0.0
+    delegate: bool = False
+
+
+def _now():
+    return int(time.time())
+
+
+def _prompt_tokens(payload):
+    # Roughly 4 characters per token, like the OpenAI tokenizer on German text
+    return max(1, len(json.dumps(payload, ensure_ascii=False)) // 4)
+
+
+def _text_content(value):
+    return {"type": "text", "text": {"value": value, "annotations": []}}
+
+
+def _send_message_recipient(assistant):
+    """First recipient of the assistant's SendMessage tool, None without one."""
+    for tool in assistant.get("tools", []):
+        function = tool.get("function") or {}
+        if function.get("name") == "SendMessage":
+            recipient = function.get("parameters", {}).get("$defs", {}).get("recipient", {})
+            return (recipient.get("enum") or [None])[0]
+    return None
+
+
+class FakeOpenAIState:
+    """In-memory objects and counters shared by all request threads."""
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.rng = random.Random(config.seed)
+        self.ids = itertools.count(1)
+        self.assistants = {}
+        self.threads = {}
+        self.messages = {}
+        self.runs = {}
+        self.thread_runs = {}
+        self.files = {}
+        self.requests = Counter()
+        self.errors = Counter()
+
+    def new_id(self, prefix):
+        with self.lock:
+            return f"{prefix}_fake{next(self.ids):08d}"
+
+    def should_fail(self):
+        if not self.config.error_rate:
+            return False
+        with self.lock:
+            return self.rng.random() < self.config.error_rate
+
+    def reply_words(self, count=None):
+        count = max(1, count or self.config.completion_tokens)
+        with self.lock:
+            body = [self.rng.choice(WORDS) for _ in range(count)]
+        return body
+
+    def reply_text(self):
+        words = self.reply_words()
+        paragraphs = [" ".join(words[i:i + 40]) + "." for i in range(0, len(words), 40)]
+        return REPLY_HEAD + "\n\n".join(paragraphs)
+
+    def chat_reply(self, messages):
+        """Page content and paragraph rewrites in the requested format, otherwise reply_text()."""
+        prompt = str(messages[-1].get("content") or "") if messages else ""
+        rewrite = re.search(r"EXAKT (\d+) Wörter", prompt)
+        if rewrite and "ABSATZ:" in prompt:
+            return " ".join(self.reply_words(int(rewrite.group(1)))) + "."
+        paragraphs = re.search(r"genau (\d+) Absätze", prompt)
+        words = re.search(r"ca\. (\d+) Wörter", prompt)
+        if not (paragraphs and words):
+            return self.reply_text()
+        menu_item = re.search(r"Menüpunkt '([^']*)'", prompt)
+        menu_item = menu_item.group(1) if menu_item else "Seite"
+        blocks = [f"# {menu_item}\n{menu_item} – {' '.join(self.reply_words(4))}"]
+        for index in range(int(paragraphs.group(1))):
+            count = int(words.group(1))
+            if index == 0:
+                count = round(count * (1 + self.config.paragraph_overshoot))
+            blocks.append(f"## {' '.join(self.reply_words(3))}\n{' '.join(self.reply_words(count))}.")
+        return "\n\n".join(blocks)
+
+    def generation_time(self, tokens):
+        rate = self.config.tokens_per_second
+        return self.config.latency + (tokens / rate if rate > 0 else 0)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "config": asdict(self.config),
+                "requests": dict(self.requests),
+                "errors": dict(self.errors),
+                "total_requests": sum(self.requests.values()),
+                "threads": len(self.threads),
+                "runs": len(self.runs),
+            }
+
+    # Objects
+
+    def message(self, thread_id, role, content, run_id=None, assistant_id=None, attachments=None):
+        if isinstance(content, str):
+            content = [_text_content(content)]
+        else:
+            content = [
+                _text_content(part["text"]) if part.get("type") == "text" and isinstance(part.get("text"), str) else part
+                for part in content
+            ]
+        message = {
+            "id": self.new_id("msg"),
+            "object": "thread.message",
+            "created_at": _now(),
+            "thread_id": thread_id,
+            "role": role,
+            "content": content,
+            "assistant_id": assistant_id,
+            "run_id": run_id,
+            "attachments": attachments or [],
+            "metadata": {},
+            "status": "completed",
+            "completed_at": _now(),
+            "incomplete_at": None,
+            "incomplete_details": None,
+        }
+        with self.lock:
+            self.messages.setdefault(thread_id, []).append(message)
+        return message
+
+    def create_run(self, thread_id, body):
+        assistant = self.assistants.get(body.get("assistant_id"), {})
+        text = self.reply_text()
+        tokens = len(text.split())
+        run = {
+            "id": self.new_id("run"),
+            "object": "thread.run",
+            "created_at": _now(),
+            "thread_id": thread_id,
+            "assistant_id": body.get("assistant_id"),
+            "status": "queued",
+            "required_action": None,
+            "last_error": None,
+            "expires_at": _now() + 600,
+            "started_at": _now(),
+            "cancelled_at": None,
+            "failed_at": None,
+            "completed_at": None,
+            "incomplete_details": None,
+            "model": assistant.get("model", "gpt-4-turbo-preview"),
+            "instructions": assistant.get("instructions", ""),
+            "tools": assistant.get("tools", []),
+            "metadata": {},
+            "usage": None,
+            "temperature": body.get("temperature"),
+            "top_p": None,
+            "max_prompt_tokens": body.get("max_prompt_tokens"),
+            "max_completion_tokens": body.get("max_completion_tokens"),
+            "truncation_strategy": body.get("truncation_strategy") or {"type": "auto", "last_messages": None},
+            "response_format": body.get("response_format") or "auto",
+            "tool_choice": body.get("tool_choice") or "auto",
+            "parallel_tool_calls": body.get("parallel_tool_calls", True),
+        }
+        prompt_tokens = _prompt_tokens(self.messages.get(thread_id, [])) + _prompt_tokens(run["instructions"])
+        recipient = _send_message_recipient(assistant) if self.config.delegate else None
+        tool_call = self.send_message_call(thread_id, recipient) if recipient else None
+        with self.lock:
+            self.runs[run["id"]] = {
+                "run": run,
+                "text": text,
+                "done_at": time.monotonic() + self.generation_time(tokens),
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": tokens,
+                          "total_tokens": prompt_tokens + tokens},
+                "tool_call": tool_call,
+            }
+            self.thread_runs.setdefault(thread_id, []).append(run["id"])
+        return run
+
+    def send_message_call(self, thread_id, recipient):
+        """SendMessage call that passes the last user message of the thread on to ``recipient``."""
+        with self.lock:
+            messages = list(self.messages.get(thread_id, []))
+        message = next((m for m in reversed(messages) if m["role"] == "user"), None)
+        texts = [part["text"]["value"] for part in message["content"] if part.get("type") == "text"] if message else []
+        arguments = {
+            "recipient": recipient,
+            "my_primary_instructions": "Anfrage an den zuständigen Agenten weitergeben.",
+            "message": " ".join(texts) or "Bitte bearbeiten.",
+        }
+        return {
+            "id": self.new_id("call"),
+            "type": "function",
+            "function": {"name": "SendMessage", "arguments": json.dumps(arguments, ensure_ascii=False)},
+        }
+
+    def require_action(self, entry):
+        """Stops the run at its tool call until the outputs are submitted."""
+        run = entry["run"]
+        with self.lock:
+            if run["status"] in ("queued", "in_progress"):
+                run.update(status="requires_action", required_action={
+                    "type": "submit_tool_outputs",
+                    "submit_tool_outputs": {"tool_calls": [entry["tool_call"]]},
+                })
+        return run
+
+    def submit_tool_outputs(self, entry):
+        """Continues a run after its tool call; it completes after another generation time."""
+        run = entry["run"]
+        with self.lock:
+            run.update(status="queued", required_action=None)
+            entry["tool_call"] = None
+            entry["done_at"] = time.monotonic() + self.generation_time(len(entry["text"].split()))
+        return run
+
+    def complete_run(self, entry):
+        """Adds the assistant message and marks the run completed (once)."""
+        run = entry["run"]
+        with self.lock:
+            if run["status"] in ("completed", "cancelled"):
+                return run
+            run.update(status="completed", completed_at=_now(), usage=entry["usage"])
+        entry["message"] = self.message(
+            run["thread_id"], "assistant", entry["text"], run_id=run["id"], assistant_id=run["assistant_id"]
+        )
+        return run
+
+    def refresh_run(self, run_id):
+        entry = self.runs.get(run_id)
+        if entry is None:
+            return None
+        run = entry["run"]
+        if run["status"] in ("queued", "in_progress"):
+            if time.monotonic() < entry["done_at"]:
+                run["status"] = "in_progress"
+            elif entry.get("tool_call"):
+                self.require_action(entry)
+            else:
+                self.complete_run(entry)
+        return run
+
+    def refresh_thread(self, thread_id):
+        """Finishes runs whose generation time is over; returns the still active run, if any."""
+        active = None
+        for run_id in list(self.thread_runs.get(thread_id, ())):
+            run = self.refresh_run(run_id)
+            if run["status"] in ("queued", "in_progress", "requires_action"):
+                active = run_id
+        return active
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeOpenAI/1.0"
+
+    routes = [
+        ("GET", r"/_stats", "stats"),
+        ("POST", r"/chat/completions", "chat_completion"),
+        ("POST", r"/assistants", "create_assistant"),
+        ("GET", r"/assistants", "list_assistants"),
+        ("GET", r"/assistants/(?P<assistant_id>[^/]+)", "retrieve_assistant"),
+        ("POST", r"/assistants/(?P<assistant_id>[^/]+)", "update_assistant"),
+        ("POST", r"/threads", "create_thread"),
+        ("GET", r"/threads/(?P<thread_id>[^/]+)", "retrieve_thread"),
+        ("POST", r"/threads/(?P<thread_id>[^/]+)/messages", "create_message"),
+        ("GET", r"/threads/(?P<thread_id>[^/]+)/messages", "list_messages"),
+        ("POST", r"/threads/(?P<thread_id>[^/]+)/runs", "create_run"),
+        ("GET", r"/threads/(?P<thread_id>[^/]+)/runs/(?P<run_id>[^/]+)", "retrieve_run"),
+        ("POST", r"/threads/(?P<thread_id>[^/]+)/runs/(?P<run_id>[^/]+)/cancel", "cancel_run"),
+        ("POST", r"/threads/(?P<thread_id>[^/]+)/runs/(?P<run_id>[^/]+)/submit_tool_outputs", "submit_tool_outputs"),
+        ("POST", r"/files", "create_file"),
+        ("GET", r"/files/(?P<file_id>[^/]+)", "retrieve_file"),
+    ]
+    compiled_routes = [(method, re.compile(pattern + "$"), name) for method, pattern, name in routes]
+
+    @property
+    def state(self) -> FakeOpenAIState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        # Accept both http://host/v1/... and http://host/... as base URL
+        path = url.path[3:] if url.path.startswith("/v1/") else url.path
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self.body = self._read_body()
+        for route_method, pattern, name in self.compiled_routes:
+            match = pattern.match(path)
+            if route_method == method and match:
+                with self.state.lock:
+                    self.state.requests[name] += 1
+                getattr(self, name)(**match.groupdict())
+                return
+        self._error(404, f"Unknown route {method} {path}", "invalid_request_error")
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if not raw or not self.headers.get("Content-Type", "").startswith("application/json"):
+            return raw
+        return json.loads(raw)
+
+    # Responses
+
+    def _json(self, payload, status=200, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("openai-poll-after-ms", str(self.state.config.poll_after_ms))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message, error_type, headers=None):
+        self._json({"error": {"message": message, "type": error_type, "param": None, "code": None}},
+                   status=status, headers=headers)
+
+    def _inject_error(self, name):
+        """Answers with the configured error status if this call was drawn to fail."""
+        if not self.state.should_fail():
+            return False
+        config = self.state.config
+        with self.state.lock:
+            self.state.errors[f"{name}:{config.error_status}"] += 1
+        if config.error_status == 429:
+            message, error_type = "Rate limit reached for requests", "requests"
+        else:
+            message, error_type = "The server had an error processing your request.", "server_error"
+        self._error(config.error_status, message, error_type, headers={"Retry-After": str(config.retry_after)})
+        return True
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+    def _send_event(self, data, event=None):
+        frame = (f"event: {event}\n" if event else "") + "data: " + (
+            data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+        ) + "\n\n"
+        try:
+            self.wfile.write(frame.encode("utf-8"))
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, e.g. a cancelled benchmark request
+            return False
+        return True
+
+    def _token_delay(self):
+        rate = self.state.config.tokens_per_second
+        return 1 / rate if rate > 0 else 0
+
+    # Endpoints
+
+    def stats(self):
+        self._json(self.state.stats())
+
+    def chat_completion(self):
+        if self._inject_error("chat_completion"):
+            return
+        words = self.state.chat_reply(self.body.get("messages", [])).split(" ")
+        usage = {
+            "prompt_tokens": _prompt_tokens(self.body.get("messages", [])),
+            "completion_tokens": len(words),
+            "total_tokens": 0,
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion = {
+            "id": self.state.new_id("chatcmpl"),
+            "object": "chat.completion",
+            "created": _now(),
+            "model": self.body.get("model", "gpt-4-turbo-preview"),
+            "system_fingerprint": None,
+        }
+
+        time.sleep(self.state.config.latency)
+        if not self.body.get("stream"):
+            time.sleep(len(words) * self._token_delay())
+            self._json({
+                **completion,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }],
+                "usage": usage,
+            })
+            return
+
+        self._start_stream()
+        completion["object"] = "chat.completion.chunk"
+        first = {"role": "assistant", "content": ""}
+        if not self._send_event({**completion, "choices": [{"index": 0, "delta": first, "finish_reason": None}]}):
+            return
+        for index, word in enumerate(words):
+            time.sleep(self._token_delay())
+            delta = {"content": word if index == 0 else " " + word}
+            if not self._send_event({**completion, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}):
+                return
+        self._send_event({**completion, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (self.body.get("stream_options") or {}).get("include_usage"):
+            self._send_event({**completion, "choices": [], "usage": usage})
+        self._send_event("[DONE]")
+
+    def _assistant_from_body(self, assistant):
+        for key in ("model", "name", "description", "instructions", "tools", "metadata",
+                    "temperature", "top_p", "response_format", "tool_resources"):
+            if key in self.body:
+                assistant[key] = self.body[key]
+        return assistant
+
+    def create_assistant(self):
+        assistant = self._assistant_from_body({
+            "id": self.state.new_id("asst"),
+            "object": "assistant",
+            "created_at": _now(),
+            "name": None,
+            "description": None,
+            "model": "gpt-4-turbo-preview",
+            "instructions": None,
+            "tools": [],
+            "metadata": {},
+            "temperature": 1.0,
+            "top_p": 1.0,
+            "response_format": "auto",
+            "tool_resources": None,
+        })
+        self.state.assistants[assistant["id"]] = assistant
+        self._json(assistant)
+
+    def list_assistants(self):
+        data = list(self.state.assistants.values())
+        self._json({
+            "object": "list",
+            "data": data,
+            "first_id": data[0]["id"] if data else None,
+            "last_id": data[-1]["id"] if data else None,
+            "has_more": False,
+        })
+
+    def retrieve_assistant(self, assistant_id):
+        assistant = self.state.assistants.get(assistant_id)
+        if assistant is None:
+            self._error(404, f"No assistant found with id '{assistant_id}'.", "invalid_request_error")
+            return
+        self._json(assistant)
+
+    def update_assistant(self, assistant_id):
+        assistant = self.state.assistants.get(assistant_id)
+        if assistant is None:
+            self._error(404, f"No assistant found with id '{assistant_id}'.", "invalid_request_error")
+            return
+        self._json(self._assistant_from_body(assistant))
+
+    def create_thread(self):
+        thread = {
+            "id": self.state.new_id("thread"),
+            "object": "thread",
+            "created_at": _now(),
+            "metadata": {},
+            "tool_resources": None,
+        }
+        self.state.threads[thread["id"]] = thread
+        messages = self.body.get("messages", []) if isinstance(self.body, dict) else []
+        for message in messages:
+            self.state.message(thread["id"], message.get("role", "user"), message.get("content", ""))
+        self._json(thread)
+
+    def retrieve_thread(self, thread_id):
+        thread = self.state.threads.get(thread_id)
+        if thread is None:
+            self._error(404, f"No thread found with id '{thread_id}'.", "invalid_request_error")
+            return
+        self._json(thread)
+
+    def create_message(self, thread_id):
+        if thread_id not in self.state.threads:
+            self._error(404, f"No thread found with id '{thread_id}'.", "invalid_request_error")
+            return
+        self._json(self.state.message(
+            thread_id, self.body.get("role", "user"), self.body.get("content", ""),
+            attachments=self.body.get("attachments"),
+        ))
+
+    def list_messages(self, thread_id):
+        self.state.refresh_thread(thread_id)
+        with self.state.lock:
+            messages = list(self.state.messages.get(thread_id, []))
+        if self.query.get("order", "desc") == "desc":
+            messages.reverse()
+        after = self.query.get("after")
+        if after:
+            ids = [message["id"] for message in messages]
+            messages = messages[ids.index(after) + 1:] if after in ids else []
+        limit = int(self.query.get("limit", 20))
+        data = messages[:limit]
+        self._json({
+            "object": "list",
+            "data": data,
+            "first_id": data[0]["id"] if data else None,
+            "last_id": data[-1]["id"] if data else None,
+            "has_more": len(messages) > limit,
+        })
+
+    def create_run(self, thread_id):
+        if thread_id not in self.state.threads:
+            self._error(404, f"No thread found with id '{thread_id}'.", "invalid_request_error")
+            return
+        # Like the real API: one active run per thread
+        active = self.state.refresh_thread(thread_id)
+        if active:
+            self._error(400, f"Thread {thread_id} already has an active run {active}.", "invalid_request_error")
+            return
+        if self._inject_error("create_run"):
+            return
+        run = self.state.create_run(thread_id, self.body)
+        if not self.body.get("stream"):
+            self._json(run)
+            return
+        self._stream_run(self.state.runs[run["id"]])
+
+    def _stream_run(self, entry):
+        run = entry["run"]
+        self._start_stream()
+        for event, status in (("thread.run.created", "queued"), ("thread.run.queued", "queued"),
+                              ("thread.run.in_progress", "in_progress")):
+            run["status"] = status
+            self._send_event(run, event)
+
+        time.sleep(self.state.config.latency)
+        if entry.get("tool_call"):
+            self._stream_tool_call(entry)
+            return
+        message = {
+            "id": self.state.new_id("msg"),
+            "object": "thread.message",
+            "created_at": _now(),
+            "thread_id": run["thread_id"],
+            "role": "assistant",
+            "content": [],
+            "assistant_id": run["assistant_id"],
+            "run_id": run["id"],
+            "attachments": [],
+            "metadata": {},
+            "status": "in_progress",
+            "completed_at": None,
+            "incomplete_at": None,
+            "incomplete_details": None,
+        }
+        self._send_event(message, "thread.message.created")
+        self._send_event(message, "thread.message.in_progress")
+        words = entry["text"].split(" ")
+        for index, word in enumerate(words):
+            time.sleep(self._token_delay())
+            delta = {
+                "id": message["id"],
+                "object": "thread.message.delta",
+                "delta": {"content": [{"index": 0, "type": "text", "text": {
+                    "value": word if index == 0 else " " + word, "annotations": []}}]},
+            }
+            if not self._send_event(delta, "thread.message.delta"):
+                break
+
+        run = self.state.complete_run(entry)
+        self._send_event({**entry.get("message", message), "id": message["id"]}, "thread.message.completed")
+        self._send_event(run, "thread.run.completed")
+        self._send_event("[DONE]", "done")
+
+    def _stream_tool_call(self, entry):
+        # Like the real API, the step stays in progress until the outputs are submitted
+        run = entry["run"]
+        tool_call = entry["tool_call"]
+        step = {
+            "id": self.state.new_id("step"),
+            "object": "thread.run.step",
+            "created_at": _now(),
+            "assistant_id": run["assistant_id"],
+            "thread_id": run["thread_id"],
+            "run_id": run["id"],
+            "type": "tool_calls",
+            "status": "in_progress",
+            "step_details": {"type": "tool_calls", "tool_calls": []},
+            "last_error": None,
+            "expired_at": None,
+            "cancelled_at": None,
+            "failed_at": None,
+            "completed_at": None,
+            "metadata": {},
+            "usage": None,
+        }
+        self._send_event(step, "thread.run.step.created")
+        self._send_event({
+            "id": step["id"],
+            "object": "thread.run.step.delta",
+            "delta": {"step_details": {"type": "tool_calls", "tool_calls": [{"index": 0, **tool_call}]}},
+        }, "thread.run.step.delta")
+        self._send_event(self.state.require_action(entry), "thread.run.requires_action")
+        self._send_event("[DONE]", "done")
+
+    def retrieve_run(self, thread_id, run_id):
+        run = self.state.refresh_run(run_id)
+        if run is None:
+            self._error(404, f"No run found with id '{run_id}'.", "invalid_request_error")
+            return
+        self._json(run)
+
+    def cancel_run(self, thread_id, run_id):
+        entry = self.state.runs.get(run_id)
+        if entry is None:
+            self._error(404, f"No run found with id '{run_id}'.", "invalid_request_error")
+            return
+        run = entry["run"]
+        if run["status"] in ("completed", "cancelled", "failed", "expired"):
+            self._error(400, f"Cannot cancel run with status '{run['status']}'.", "invalid_request_error")
+            return
+        run.update(status="cancelled", cancelled_at=_now())
+        self._json(run)
+
+    def submit_tool_outputs(self, thread_id, run_id):
+        entry = self.state.runs.get(run_id)
+        if entry is None:
+            self._error(404, f"No run found with id '{run_id}'.", "invalid_request_error")
+            return
+        if entry["run"]["status"] == "requires_action":
+            self.state.submit_tool_outputs(entry)
+        if self.body.get("stream"):
+            self._stream_run(entry)
+            return
+        self._json(self.state.refresh_run(run_id))
+
+    def create_file(self):
+        body = self.body if isinstance(self.body, bytes) else b""
+        boundary = self.headers.get("Content-Type", "").partition("boundary=")[2].encode()
+        filename, purpose, size = "upload", "assistants", len(body)
+        for part in body.split(b"--" + boundary) if boundary else []:
+            head, _, content = part.partition(b"\r\n\r\n")
+            name = re.search(rb'filename="([^"]*)"', head)
+            if name:
+                filename, size = name.group(1).decode("utf-8", "replace"), len(content) - 2
+            elif b'name="purpose"' in head:
+                purpose = content.strip().decode()
+        file = {
+            "id": self.state.new_id("file"),
+            "object": "file",
+            "bytes": size,
+            "created_at": _now(),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        self.state.files[file["id"]] = file
+        self._json(file)
+
+    def retrieve_file(self, file_id):
+        file = self.state.files.get(file_id)
+        if file is None:
+            self._error(404, f"No such File object: {file_id}", "invalid_request_error")
+            return
+        self._json(file)
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address=("127.0.0.1", 0), config=None):
+        super().__init__(address, FakeOpenAIHandler)
+        self.state = FakeOpenAIState(config or FakeConfig())
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """Serves in a daemon thread and returns the server."""
+        threading.Thread(target=self.serve_forever, name="fake-openai", daemon=True).start()
+        return self
+
+
+def add_arguments(parser):
+    defaults = FakeConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency,
+                        help="seconds before the first byte of each model call")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate,
+                        help="share of chat completions and run creations that fail")
+    parser.add_argument("--error-status", type=int, choices=(429, 500), default=defaults.error_status)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--poll-after-ms", type=int, default=defaults.poll_after_ms)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--paragraph-overshoot", type=float, default=defaults.paragraph_overshoot,
+                        help="share by which the first paragraph of a generated page is too long")
+    parser.add_argument("--delegate", action="store_true",
+                        help="agents with SendMessage pass every message on to their first recipient")
+
+
+def config_from_args(args):
+    return FakeConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+        poll_after_ms=args.poll_after_ms,
+        seed=args.seed,
+        paragraph_overshoot=args.paragraph_overshoot,
+        delegate=args.delegate,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer((args.host, args.port), config_from_args(args))
+    print(f"Fake OpenAI server on {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
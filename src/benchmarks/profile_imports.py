@@ -0,0 +1,114 @@
+"""
+Import-time profile of the app startup.
+
+Imports a module (main.py by default) in a fresh interpreter with
+``python -X importtime`` against an in-process fake OpenAI server, in a
+temporary working directory. Reports the wall time of the import and of
+creating the agency afterwards (the part the warm-up runs in the background),
+plus the packages and modules with the largest import times.
+
+Usage (from src/):
+    python -m benchmarks.profile_imports
+    python -m benchmarks.profile_imports --module agency_swarm_Webdesign.agency --top 40 --latency 0.5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.fake_openai import FakeConfig, FakeOpenAIServer
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_PREFIX = "PROFILE_RESULT "
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+from agency_swarm_Webdesign.agency import get_agency
+get_agency()
+built = time.perf_counter()
+print({prefix!r} + json.dumps({{"import_s": imported - started, "agency_s": built - imported}}), file=sys.__stdout__)
+"""
+
+
+def parse_importtime(text):
+    """Returns ``[(name, self_us, cumulative_us)]`` from ``-X importtime`` output."""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def profile(module, latency):
+    server = FakeOpenAIServer(config=FakeConfig(latency=latency)).start()
+    env = dict(
+        os.environ,
+        OPENAI_BASE_URL=server.base_url,
+        OPENAI_API_KEY="sk-fake",
+        LLM_CACHE_ENABLED="0",
+        PYTHONPATH=SRC_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""),
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD.format(module=module, prefix=RESULT_PREFIX)],
+        cwd=tempfile.mkdtemp(prefix="profile-imports-"),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    server.shutdown()
+    result = next((line for line in completed.stdout.splitlines() if line.startswith(RESULT_PREFIX)), None)
+    if completed.returncode or result is None:
+        sys.stderr.write(completed.stderr[-4000:])
+        raise SystemExit(f"import of {module} failed")
+    return json.loads(result[len(RESULT_PREFIX):]), parse_importtime(completed.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=25, help="modules listed per table")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake OpenAI request")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    timings, rows = profile(args.module, args.latency)
+    # Self time summed per top-level package shows which dependencies dominate
+    packages = {}
+    for name, self_us, _ in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    report = {
+        "module": args.module,
+        "import_s": round(timings["import_s"], 3),
+        "agency_s": round(timings["agency_s"], 3),
+        "packages_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]
+        },
+        "cumulative_ms": {
+            name: round(us / 1000, 1)
+            for name, _, us in sorted(rows, key=lambda row: -row[2])[:args.top]
+        },
+        "self_ms": {
+            name: round(us / 1000, 1)
+            for name, us, _ in sorted(rows, key=lambda row: -row[1])[:args.top]
+        },
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,35 @@
+import asyncio
+import json
 import logging
 import os
-from typing import List
+import threading
+import time
+import uuid
+from typing import List, Optional
 
 import uvicorn
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-import gradio as gr
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-from agency_swarm_Webdesign.agency import agency
-from utils.demo_gradio_override import demo_gradio_override
+from agency_swarm_Webdesign.agency import get_agency, iter_generated_pages
+from agency_swarm_Webdesign.agents.webdesign_agent.agent import WEBDESIGN_AGENT_NAME
+from agency_swarm_Webdesign.shared.llm_usage import get_usage_tracker
+from agency_swarm_Webdesign.shared.prompts import prompt_stats
+from agency_swarm_Webdesign.shared.tracing import TracingMiddleware
+from utils.agency_sessions import open_session_threads
+from utils.completion_pool import PoolUnavailableError, get_completion_pool
+from utils.metrics import setup_metrics
+from utils.session_store import SessionBusyError
+from utils.streaming import stream_completion
+from utils.warmup import Warmup
 
 APP_TOKEN = os.getenv("APP_TOKEN")
+# "api" serves only the HTTP API and never imports Gradio (smaller, faster-starting workers)
+SERVE_MODE = os.getenv("SERVE_MODE", "all")
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -41,14 +56,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Override the demo_gradio function
-agency.demo_gradio = demo_gradio_override
-# Mount the gradio interface
-gradio_interface = agency.demo_gradio(agency)
-app = gr.mount_gradio_app(app, gradio_interface, path="/demo-gradio", root_path="/demo-gradio")
+gradio_interface = None
+if SERVE_MODE != "api":
+    import gradio as gr
+    from utils.demo_gradio_override import demo_gradio_override
+
+    # Mount the gradio interface; the agency itself is created on first use or by the warm-up
+    gradio_interface = demo_gradio_override(get_agency, recipient_agents=[WEBDESIGN_AGENT_NAME])
+    app = gr.mount_gradio_app(app, gradio_interface, path="/demo-gradio", root_path="/demo-gradio")
 
 security = HTTPBearer()
 
+completion_pool = get_completion_pool()
+
+# One conversation per API session id; thread ids are shared by all workers (SESSION_DB_PATH)
+api_threads = open_session_threads(get_agency, "api_threads")
+
+# Prometheus metrics at /metrics (multi-worker: set PROMETHEUS_MULTIPROC_DIR)
+metrics = setup_metrics(app, mounts=["/demo-gradio"], usage_tracker=get_usage_tracker())
+metrics.track_pool(completion_pool)
+if gradio_interface is not None:
+    metrics.track_gradio(gradio_interface)
+
+# Tracing spans per request (enabled with TRACING_EXPORTER=json|otlp)
+app.add_middleware(TracingMiddleware)
+
+# Creates the agency (assistant sync with OpenAI) in the background after startup
+warmup = Warmup()
+warmup.add("agency", get_agency)
+
 
 # Models
 
@@ -64,6 +100,20 @@ class Attachment(BaseModel):
 class AgencyRequest(BaseModel):
     message: str
     attachments: List[Attachment] = []
+    # Continues the conversation of an earlier response; a new one is started if omitted
+    session_id: Optional[str] = None
+
+
+class PagesBatchRequest(BaseModel):
+    briefing: str
+    analysis: str
+    menu_items: List[str]
+    num_paragraphs: int = 3
+    words_per_paragraph: int = 150
+    # Capped at CONTENT_BATCH_CONCURRENCY
+    max_concurrency: Optional[int] = Field(None, ge=1)
+    project_id: Optional[str] = None
+    session_id: Optional[str] = None
 
 
 # Token verification
@@ -78,13 +128,167 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
 # API endpoint
 
 
+def run_completion(session_id, message, attachments):
+    # Runs on a pool worker, so creating the agency on first use does not block the event loop
+    return api_threads.agency(session_id).get_completion(message, attachments=attachments)
+
+
+@app.get("/health")
+async def health(ready: bool = False):
+    # Always 200 for liveness checks; with ?ready=true 503 until the warm-up is done
+    content = {"status": "ok", "ready": warmup.ready, "warmup": warmup.state()}
+    if ready and not content["ready"]:
+        return JSONResponse(status_code=503, content=content)
+    return content
+
+
 @app.post("/api/agency")
 async def get_completion(request: AgencyRequest, token: str = Depends(verify_token)):
-    response = agency.get_completion(
-        request.message,
-        attachments=request.attachments,
+    session_id = request.session_id or uuid.uuid4().hex
+    # Run the blocking completion on the bounded pool so the event loop stays free
+    try:
+        response = await completion_pool.run(
+            run_completion,
+            session_id,
+            request.message,
+            request.attachments,
+        )
+    except PoolUnavailableError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except SessionBusyError as e:
+        # Another request of this session is still running, possibly on another worker
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"response": response, "session_id": session_id}
+
+
+@app.post("/api/agency/stream")
+async def get_completion_stream(request: AgencyRequest, token: str = Depends(verify_token)):
+    session_id = request.session_id or uuid.uuid4().hex
+    try:
+        frames = stream_completion(
+            api_threads.agency(session_id),
+            completion_pool,
+            request.message,
+            attachments=request.attachments,
+        )
+    except PoolUnavailableError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    return StreamingResponse(
+        frames,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Session-Id": session_id},
     )
-    return {"response": response}
+
+
+@app.post("/api/pages/batch")
+async def generate_pages(request: PagesBatchRequest, token: str = Depends(verify_token)):
+    briefing_data = {
+        "original_briefing": request.briefing,
+        "final_analysis": request.analysis,
+        "project_id": request.project_id,
+    }
+
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def put(line):
+        loop.call_soon_threadsafe(lines.put_nowait, line)
+
+    def run():
+        started = time.perf_counter()
+        done = failed = 0
+        pages = iter_generated_pages(
+            briefing_data,
+            request.menu_items,
+            request.num_paragraphs,
+            request.words_per_paragraph,
+            max_workers=request.max_concurrency,
+            session_id=request.session_id,
+        )
+        try:
+            for result in pages:
+                if cancelled.is_set():
+                    # Client gone: closing the generator cancels the pages not started yet
+                    return
+                if result["status"] == "done":
+                    done += 1
+                else:
+                    failed += 1
+                put(json.dumps({"type": "page", **result}, ensure_ascii=False) + "\n")
+
+            summary = {
+                "type": "summary",
+                "total": done + failed,
+                "done": done,
+                "failed": failed,
+                "duration": round(time.perf_counter() - started, 2),
+            }
+            put(json.dumps(summary) + "\n")
+        finally:
+            pages.close()
+            put(None)
+
+    # The batch holds one completion slot while it runs, so batches share the
+    # admission control of /api/agency; its pages run on the shared content pool
+    try:
+        future = completion_pool.submit(run)
+    except PoolUnavailableError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    async def body():
+        try:
+            while (line := await lines.get()) is not None:
+                yield line
+        finally:
+            cancelled.set()
+            future.cancel()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@app.get("/api/usage")
+async def get_usage(
+    session_id: Optional[str] = None,
+    project_id: Optional[str] = None,
+    recent: int = 0,
+    token: str = Depends(verify_token),
+):
+    # Token, latency and cost totals of all tool LLM calls, optionally per session/project.
+    # The tracker lives in this worker process only; with several workers the
+    # totals are partial (/metrics aggregates across workers)
+    tracker = get_usage_tracker()
+    summary = tracker.summary(session_id=session_id, project_id=project_id)
+    summary["scope"] = {"process": "worker", "pid": os.getpid()}
+    # Prompt-cache counters per template; not filtered by session or project
+    summary["prompts"] = prompt_stats()
+    if recent:
+        summary["recent"] = tracker.recent(min(recent, 1000), session_id=session_id, project_id=project_id)
+    return summary
+
+
+@app.on_event("startup")
+def start_warmup():
+    # Runs in a daemon thread, so the server starts listening right away
+    if os.getenv("WARMUP_ENABLED", "1") != "0":
+        warmup.start()
+
+
+@app.on_event("shutdown")
+def shutdown_completion_pool():
+    completion_pool.shutdown(wait=False)
 
 
 @app.exception_handler(Exception)
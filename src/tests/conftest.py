@@ -0,0 +1,49 @@
+"""
+Shared fixtures.
+
+Run from src/: ``python -m pytest tests``. Every test session talks to the
+in-process fake OpenAI server of the benchmarks, never to the real API, and
+runs in a temporary working directory so settings.json and the caches of the
+repo stay untouched.
+"""
+
+import os
+import sys
+
+import pytest
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from benchmarks.fake_openai import FakeConfig, FakeOpenAIServer  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_openai(tmp_path_factory):
+    """Fake OpenAI server with fast answers; the environment points all clients at it."""
+    server = FakeOpenAIServer(
+        config=FakeConfig(latency=0.01, tokens_per_second=20000, poll_after_ms=10)
+    ).start()
+    workdir = tmp_path_factory.mktemp("workdir")
+    environ = {
+        "OPENAI_BASE_URL": server.base_url,
+        "OPENAI_API_KEY": "sk-fake",
+        "LLM_CACHE_PATH": "",
+        "TRACING_EXPORTER": "none",
+        "SESSION_DB_PATH": str(workdir / "sessions.sqlite3"),
+    }
+    previous = {key: os.environ.get(key) for key in environ}
+    cwd = os.getcwd()
+    os.environ.update(environ)
+    os.chdir(workdir)
+    try:
+        yield server
+    finally:
+        os.chdir(cwd)
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        server.shutdown()
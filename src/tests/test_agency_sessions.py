@@ -0,0 +1,59 @@
+"""Per-session threads of utils.agency_sessions, including those between agents."""
+
+import pytest
+from agency_swarm import Agency, Agent
+
+from utils.agency_sessions import SessionSendMessage, SessionThreads, drain
+from utils.session_store import SessionStore
+
+
+@pytest.fixture(scope="module")
+def agency():
+    lead = Agent(name="SessionLead", description="Leitet", instructions="Du leitest.")
+    worker = Agent(
+        name="SessionWorker", description="Schreibt Texte", instructions="Du schreibst."
+    )
+    return Agency([lead, [lead, worker]], send_message_tool_class=SessionSendMessage)
+
+
+def send_message(agency, message):
+    """Runs the lead's SendMessage tool the way agency_swarm's execute_tool does."""
+    tool_class = next(t for t in agency.ceo.tools if t.__name__ == "SendMessage")
+    tool = tool_class(
+        recipient="SessionWorker",
+        my_primary_instructions="Weitergeben",
+        message=message,
+    )
+    tool._caller_agent = agency.ceo
+    return drain(tool.run())
+
+
+def user_messages(fake_openai, thread_id):
+    return [
+        message["content"][0]["text"]["value"]
+        for message in fake_openai.state.messages.get(thread_id, [])
+        if message["role"] == "user"
+    ]
+
+
+def test_each_session_delegates_on_its_own_thread(agency, fake_openai):
+    store = SessionStore()
+    threads = SessionThreads(lambda: agency, store)
+
+    for session_id in ("a", "b", "a"):
+        with threads.session(session_id) as thread:
+            drain(thread.get_completion(f"Hallo von {session_id}"))
+            send_message(agency, f"Auftrag von {session_id}")
+
+    ids = {
+        session_id: store.get(session_id)["agent_threads"]["SessionLead"][
+            "SessionWorker"
+        ]
+        for session_id in ("a", "b")
+    }
+    assert ids["a"] != ids["b"]
+    assert (
+        agency.agents_and_threads["SessionLead"]["SessionWorker"].id not in ids.values()
+    )
+    assert user_messages(fake_openai, ids["a"]) == ["Auftrag von a", "Auftrag von a"]
+    assert user_messages(fake_openai, ids["b"]) == ["Auftrag von b"]
@@ -0,0 +1,122 @@
+"""Concurrent API sessions whose runs delegate to another agent via SendMessage."""
+
+import asyncio
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+APP_TOKEN = "test-token"
+SESSIONS = 4
+
+
+@pytest.fixture(scope="module")
+def main():
+    environ = {"APP_TOKEN": APP_TOKEN, "SERVE_MODE": "api", "WARMUP_ENABLED": "0"}
+    previous = {key: os.environ.get(key) for key in environ}
+    os.environ.update(environ)
+    try:
+        import main
+
+        yield main
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+@pytest.fixture
+def delegating(fake_openai):
+    """Every run of the WebdesignAgent first passes the message on to the ContentCreationAgent."""
+    config = fake_openai.state.config
+    config.delegate = True
+    try:
+        yield fake_openai.state
+    finally:
+        config.delegate = False
+
+
+def delegated_thread_id(main, session_id):
+    agent_threads = main.api_threads.store.get(session_id)["agent_threads"]
+    return agent_threads["WebdesignAgent"]["ContentCreationAgent"]
+
+
+def user_messages(state, thread_id):
+    return [
+        message["content"][0]["text"]["value"]
+        for message in state.messages.get(thread_id, [])
+        if message["role"] == "user"
+    ]
+
+
+def parse_frames(body):
+    frames = []
+    for chunk in body.strip().split("\n\n"):
+        event, data = chunk.split("\n", 1)
+        frames.append(
+            (event.removeprefix("event: "), json.loads(data.removeprefix("data: ")))
+        )
+    return frames
+
+
+def test_concurrent_completions_delegate_on_their_own_threads(main, delegating):
+    sessions = [f"api-{uuid.uuid4().hex[:8]}" for _ in range(SESSIONS)]
+    cancelled = delegating.requests["cancel_run"]
+
+    with ThreadPoolExecutor(max_workers=SESSIONS) as executor:
+        responses = list(
+            executor.map(
+                lambda session_id: main.run_completion(
+                    session_id, f"Anfrage von {session_id}", None
+                ),
+                sessions,
+            )
+        )
+
+    assert all("Seitenstruktur" in response for response in responses)
+    assert delegating.requests["cancel_run"] == cancelled
+    thread_ids = [delegated_thread_id(main, session_id) for session_id in sessions]
+    assert len(set(thread_ids)) == SESSIONS
+    for session_id, thread_id in zip(sessions, thread_ids):
+        assert user_messages(delegating, thread_id) == [f"Anfrage von {session_id}"]
+
+
+def test_concurrent_streams_delegate_on_their_own_threads(main, delegating):
+    sessions = [f"stream-{uuid.uuid4().hex[:8]}" for _ in range(SESSIONS)]
+    cancelled = delegating.requests["cancel_run"]
+
+    async def stream(client, session_id):
+        response = await client.post(
+            "/api/agency/stream",
+            json={"message": f"Anfrage von {session_id}", "session_id": session_id},
+            headers={"Authorization": f"Bearer {APP_TOKEN}"},
+        )
+        assert response.status_code == 200
+        return parse_frames(response.text)
+
+    async def stream_all():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://api"
+        ) as client:
+            return await asyncio.gather(*(stream(client, s) for s in sessions))
+
+    results = asyncio.run(stream_all())
+
+    assert delegating.requests["cancel_run"] == cancelled
+    for session_id, frames in zip(sessions, results):
+        assert frames[-1][0] == "done"
+        assert [data for event, data in frames if event == "agent_message"] == [
+            {
+                "sender": "WebdesignAgent",
+                "recipient": "ContentCreationAgent",
+                "message": f"Anfrage von {session_id}",
+            }
+        ]
+        thread_id = delegated_thread_id(main, session_id)
+        assert user_messages(delegating, thread_id) == [f"Anfrage von {session_id}"]
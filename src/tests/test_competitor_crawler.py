@@ -0,0 +1,103 @@
+"""Concurrency limits, deadline and conditional GETs of the competitor crawler."""
+
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+
+from agency_swarm_Webdesign.agents.tools.competitor_crawler import CompetitorCrawler
+from agency_swarm_Webdesign.agents.tools.http_cache import HttpCache
+
+
+class StandInSite:
+    """Async handler for ``httpx.MockTransport`` that records requests in flight."""
+
+    def __init__(self, delay=0.05, slow_delay=5.0):
+        self.delay = delay
+        self.slow_delay = slow_delay
+        self.in_flight = Counter()
+        self.max_in_flight = Counter()
+        self.max_total = 0
+        self.requests = []
+
+    async def __call__(self, request):
+        host = request.url.host
+        self.requests.append(request)
+        self.in_flight[host] += 1
+        self.max_in_flight[host] = max(self.max_in_flight[host], self.in_flight[host])
+        self.max_total = max(self.max_total, sum(self.in_flight.values()))
+        try:
+            slow = request.url.path.startswith("/slow")
+            await asyncio.sleep(self.slow_delay if slow else self.delay)
+        finally:
+            self.in_flight[host] -= 1
+
+        body = f"<html><body><p>Seite {request.url.path}</p></body></html>"
+        etag = f'"{len(body)}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(
+            200,
+            headers={"ETag": etag, "Content-Type": "text/html; charset=utf-8"},
+            text=body,
+        )
+
+
+def test_concurrency_is_capped_globally_and_per_host():
+    site = StandInSite()
+    crawler = CompetitorCrawler(
+        concurrency=3, per_host=2, deadline=10, transport=httpx.MockTransport(site)
+    )
+    urls = [f"https://{host}.example/{i}" for host in "abc" for i in range(4)]
+
+    results = crawler.crawl(urls)
+
+    assert [result.url for result in results] == urls
+    assert all(result.status == 200 for result in results)
+    assert site.max_total == 3
+    assert max(site.max_in_flight.values()) == 2
+
+
+def test_deadline_cuts_off_slow_hosts():
+    site = StandInSite()
+    crawler = CompetitorCrawler(deadline=0.5, transport=httpx.MockTransport(site))
+    urls = [
+        "https://fast.example/a",
+        "https://slow.example/slow",
+        "https://fast.example/b",
+    ]
+
+    started = time.perf_counter()
+    results = crawler.crawl(urls)
+
+    assert time.perf_counter() - started < 2
+    assert [result.status for result in results] == [200, None, 200]
+    assert "Deadline" in results[1].error
+
+
+def test_not_modified_reuses_cached_body_and_data(tmp_path):
+    site = StandInSite()
+    extracted = []
+
+    def extract(url, html):
+        extracted.append(url)
+        return {"length": len(html)}
+
+    crawler = CompetitorCrawler(
+        transport=httpx.MockTransport(site),
+        cache=HttpCache(str(tmp_path / "http_cache.sqlite3")),
+        extract=extract,
+    )
+    url = "https://a.example/leistungen"
+
+    [first] = crawler.crawl([url])
+    [second] = crawler.crawl([url])
+
+    assert first.status == 200 and not first.from_cache
+    assert site.requests[1].headers["If-None-Match"] == first.headers["etag"]
+    assert second.status == 304
+    assert second.from_cache
+    assert second.text == first.text
+    assert second.data == first.data == {"length": len(first.text)}
+    assert extracted == [url]
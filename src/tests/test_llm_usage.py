@@ -0,0 +1,50 @@
+"""Token accounting of chat_completion with the LLM cache."""
+
+import uuid
+
+from agency_swarm_Webdesign.shared.llm import chat_completion
+from agency_swarm_Webdesign.shared.llm_usage import get_usage_tracker
+from agency_swarm_Webdesign.shared.prompts import PromptTemplate, prompt_stats
+
+
+def test_cache_hits_count_zero_tokens():
+    tool = f"UsageTest{uuid.uuid4().hex[:8]}"
+    template = PromptTemplate(
+        tool, "System", "Kontext: {context}", "Anfrage: {request}"
+    )
+    messages = template.render({"context": tool}, request="Seite")
+
+    first = chat_completion(tool, model="gpt-4o", messages=messages)
+    hit = chat_completion(tool, model="gpt-4o", messages=messages)
+
+    assert hit.choices[0].message.content == first.choices[0].message.content
+    assert first.usage.prompt_tokens > 0
+    assert hit.usage.prompt_tokens == 0
+    assert hit.usage.completion_tokens == 0
+    assert hit.usage.total_tokens == 0
+
+    template.record_usage(first)
+    assert template.record_usage(hit)["prompt_tokens"] == 0
+    stats = prompt_stats()[tool]
+    assert stats["calls"] == 2
+    assert stats["prompt_tokens"] == first.usage.prompt_tokens
+
+    totals = get_usage_tracker().summary()["by_tool"][tool]
+    assert totals["calls"] == 2
+    assert totals["cache_hits"] == 1
+    assert totals["prompt_tokens"] == first.usage.prompt_tokens
+    assert totals["completion_tokens"] == first.usage.completion_tokens
+
+
+def test_uncached_calls_count_their_tokens():
+    tool = f"UsageTest{uuid.uuid4().hex[:8]}"
+    messages = [{"role": "user", "content": tool}]
+
+    responses = [
+        chat_completion(tool, cache=False, model="gpt-4o", messages=messages)
+        for _ in range(2)
+    ]
+
+    totals = get_usage_tracker().summary()["by_tool"][tool]
+    assert totals["cache_hits"] == 0
+    assert totals["prompt_tokens"] == sum(r.usage.prompt_tokens for r in responses)
@@ -0,0 +1,147 @@
+"""Paragraph checks and repairs for generated page content."""
+
+import uuid
+
+from agency_swarm_Webdesign.agents.content_creation_agent.agent import (
+    PAGE_CONTENT_PROMPT,
+    ContentGeneratorTool,
+    ContentParams,
+)
+from agency_swarm_Webdesign.agents.content_creation_agent.paragraphs import (
+    MAX_REPAIR_ATTEMPTS,
+    generate_within_tolerance,
+    join_content_blocks,
+    split_content_blocks,
+)
+
+
+def words(count, sentence_length=10, end="."):
+    """``count`` words in sentences of ``sentence_length`` words."""
+    sentences = []
+    for start in range(0, count, sentence_length):
+        length = min(sentence_length, count - start)
+        sentences.append(" ".join(["Wort"] * length) + end)
+    return " ".join(sentences)
+
+
+def template_page(*paragraphs, menu_item="Leistungen"):
+    """A page in the format PAGE_CONTENT_PROMPT asks for: H1 and headline, then one H2 per paragraph."""
+    blocks = [f"# {menu_item}\nMaßgefertigte Küchen aus Freiburg"]
+    for index, paragraph in enumerate(paragraphs, start=1):
+        blocks.append(f"## Zwischenüberschrift {index}\n{paragraph}")
+    return "\n\n".join(blocks)
+
+
+def no_rewrite(paragraph, stats):
+    raise AssertionError(f"unexpected rewrite of: {paragraph}")
+
+
+def test_prompt_asks_for_headline_directly_below_h1():
+    lines = PAGE_CONTENT_PROMPT.request.split("\n")
+    h1 = next(i for i, line in enumerate(lines) if line.startswith("# "))
+    assert lines[h1 + 1] == "[SEO-optimierte Hauptüberschrift]"
+
+
+def test_template_page_splits_into_requested_paragraphs():
+    content = template_page(words(100), words(100), words(100))
+
+    blocks = split_content_blocks(content)
+
+    assert blocks[0] == {
+        "heading": "# Leistungen\nMaßgefertigte Küchen aus Freiburg",
+        "text": None,
+    }
+    assert [len(block["text"].split()) for block in blocks[1:]] == [100, 100, 100]
+    assert join_content_blocks(blocks) == content
+
+
+def test_template_page_within_tolerance_needs_one_generation():
+    content = template_page(words(100), words(97), words(104))
+
+    result, stats = generate_within_tolerance(lambda stats: content, no_rewrite, 3, 100)
+
+    assert result == content
+    assert stats["attempts"] == 1
+    assert stats["full_generations"] == 1
+    assert stats["within_tolerance"]
+
+
+def test_only_the_deviating_paragraph_is_rewritten():
+    run_on = words(140, sentence_length=140, end="")
+    content = template_page(words(100), run_on, words(100))
+    rewritten = []
+
+    def rewrite(paragraph, stats):
+        rewritten.append(paragraph)
+        return words(100)
+
+    result, stats = generate_within_tolerance(lambda stats: content, rewrite, 3, 100)
+
+    assert rewritten == [run_on]
+    assert result == template_page(words(100), words(100), words(100))
+    assert stats["full_generations"] == 1
+    assert stats["repaired_paragraphs"] == 1
+    assert stats["within_tolerance"]
+
+
+def test_too_long_paragraph_is_trimmed_at_a_sentence():
+    content = template_page(words(100), words(100), words(110))
+
+    result, stats = generate_within_tolerance(lambda stats: content, no_rewrite, 3, 100)
+
+    assert result == template_page(words(100), words(100), words(100))
+    assert stats["trimmed_paragraphs"] == 1
+    assert stats["within_tolerance"]
+
+
+def test_lists_keep_their_line_breaks():
+    # Ten items of ten words each, the dash included
+    items = "\n".join(f"- {words(9)}" for _ in range(10))
+    content = template_page(words(100), items, words(100))
+
+    blocks = split_content_blocks(content)
+    result, stats = generate_within_tolerance(lambda stats: content, no_rewrite, 3, 100)
+
+    assert blocks[2]["text"] == items
+    assert result == content
+    assert stats["within_tolerance"]
+
+
+def test_wrong_paragraph_count_regenerates_at_most_max_attempts():
+    content = template_page(words(100), words(100))
+
+    result, stats = generate_within_tolerance(lambda stats: content, no_rewrite, 3, 100)
+
+    assert result == content
+    assert stats["full_generations"] == MAX_REPAIR_ATTEMPTS
+    assert not stats["within_tolerance"]
+
+
+def test_content_tool_caches_the_repaired_page(fake_openai):
+    config = fake_openai.state.config
+    config.paragraph_overshoot = 0.3
+    try:
+        params = ContentParams(
+            menu_item=f"Leistungen {uuid.uuid4().hex[:8]}",
+            num_paragraphs=3,
+            words_per_paragraph=60,
+            briefing="Schreinerei in Freiburg",
+            analysis="Zielgruppe: Privatkunden",
+        )
+        requests = fake_openai.state.requests
+        before = requests["chat_completion"]
+        first = ContentGeneratorTool(params=params).run()
+        # One page and one rewrite of the too long first paragraph
+        assert requests["chat_completion"] - before == 2
+
+        before = requests["chat_completion"]
+        second = ContentGeneratorTool(params=params).run()
+        assert requests["chat_completion"] == before
+    finally:
+        config.paragraph_overshoot = 0.0
+
+    assert second == first
+    paragraphs = [
+        block["text"] for block in split_content_blocks(first) if block["text"]
+    ]
+    assert [len(paragraph.split()) for paragraph in paragraphs] == [60, 60, 60]
@@ -0,0 +1,39 @@
+"""Session locks of SqliteSessionStore shared by several processes."""
+
+import pytest
+
+from utils.session_store import SessionBusyError, SqliteSessionStore
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    """Two stores on one file, like two worker processes, with a short lease."""
+    monkeypatch.setattr(SqliteSessionStore, "LOCK_LEASE", 0.3)
+    monkeypatch.setattr(SqliteSessionStore, "LOCK_RENEW_INTERVAL", 0.1)
+    monkeypatch.setattr(SqliteSessionStore, "LOCK_POLL_INTERVAL", 0.02)
+    path = str(tmp_path / "sessions.sqlite3")
+    return SqliteSessionStore(path, "test"), SqliteSessionStore(path, "test")
+
+
+def test_held_lock_is_renewed_beyond_the_lease(stores):
+    first, second = stores
+
+    with first.lock("s"):
+        with pytest.raises(SessionBusyError):
+            with second.lock("s", timeout=1.0):
+                pass
+
+    with second.lock("s", timeout=0.1):
+        pass
+
+
+def test_lock_of_a_crashed_worker_is_taken_over_after_the_lease(stores):
+    first, second = stores
+    # Taken but never released or renewed, as by a worker that died
+    assert first._try_lock("s", "crashed-worker")
+
+    with pytest.raises(SessionBusyError):
+        with second.lock("s", timeout=0.1):
+            pass
+    with second.lock("s", timeout=1.0):
+        pass
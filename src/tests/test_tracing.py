@@ -0,0 +1,108 @@
+"""Tests for the agency_swarm instrumentation in shared/tracing.py."""
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from agency_swarm import Agency, Agent
+from agency_swarm.threads.thread import Thread
+
+from agency_swarm_Webdesign.shared import tracing
+
+
+class RecordingTracer(tracing.Tracer):
+    """Keeps finished spans in memory instead of exporting them."""
+
+    def __init__(self):
+        super().__init__(exporter=object())
+        self.spans = []
+
+    def on_end(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def tracer():
+    previous = tracing._tracer
+    tracer = RecordingTracer()
+    tracing.set_tracer(tracer)
+    try:
+        yield tracer
+    finally:
+        tracing.set_tracer(previous)
+
+
+def drain(generator):
+    items = []
+    while True:
+        try:
+            items.append(next(generator))
+        except StopIteration as e:
+            return items, e.value
+
+
+def test_patched_completion_yields_and_returns(monkeypatch, tracer):
+    def get_completion(self, message, *args, **kwargs):
+        yield "message"
+        # Like agency_swarm with async tools: the tool runs in a pool thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            tool_span = executor.submit(self.execute_tool, "call").result()
+        yield tool_span
+        return f"Antwort auf {message}"
+
+    def execute_tool(self, tool_call, *args, **kwargs):
+        return tracing.current_span()
+
+    monkeypatch.setattr(Thread, "get_completion", get_completion)
+    monkeypatch.setattr(Thread, "execute_tool", execute_tool)
+    tracing.instrument_agency_swarm()
+    assert Thread.get_completion.__traced__
+
+    thread = Thread(SimpleNamespace(name="Client"), SimpleNamespace(name="Writer"))
+    thread.id = "thread_1"
+    items, result = drain(thread.get_completion("Hallo"))
+
+    assert result == "Antwort auf Hallo"
+    [span] = tracer.spans
+    assert items == ["message", span]
+    assert span.name == "agent Client -> Writer"
+    assert span.attributes["agent.thread_id"] == "thread_1"
+    assert span.attributes["agent.message_bytes"] == len("Hallo")
+    assert span.attributes["agent.response_bytes"] == len(result)
+    assert span.status == "ok"
+    assert thread._trace_span is None
+
+
+def test_patched_completion_records_errors(monkeypatch, tracer):
+    def get_completion(self, message, *args, **kwargs):
+        yield "message"
+        raise RuntimeError("run failed")
+
+    monkeypatch.setattr(Thread, "get_completion", get_completion)
+    tracing.instrument_agency_swarm()
+
+    thread = Thread(SimpleNamespace(name="Client"), SimpleNamespace(name="Writer"))
+    with pytest.raises(RuntimeError):
+        drain(thread.get_completion("Hallo"))
+
+    [span] = tracer.spans
+    assert span.status == "error"
+    assert span.error == "RuntimeError: run failed"
+    assert thread._trace_span is None
+
+
+def test_instrumented_agency_completion_against_fake_server(tracer):
+    tracing.instrument_agency_swarm()
+    writer = Agent(
+        name="TraceWriter",
+        description="Schreibt Texte",
+        instructions="Du schreibst Texte.",
+    )
+    agency = Agency([writer])
+
+    result = agency.get_completion("Schreibe einen Satz.")
+
+    assert "Seitenstruktur" in result
+    [span] = [span for span in tracer.spans if span.name == "agent User -> TraceWriter"]
+    assert span.attributes["agent.thread_id"] == agency.main_thread.id
+    assert span.attributes["agent.response_bytes"] == len(result)
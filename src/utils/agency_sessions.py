@@ -0,0 +1,173 @@
+"""
+Conversations per session on their own agency_swarm thread.
+
+``Agency.main_thread`` is a single conversation shared by every caller. Here
+each session id gets its own thread; only its OpenAI thread id is kept, in a
+session store shared by all worker processes (see ``open_session_store``), so
+any worker can continue a conversation. Runs of one session are serialized by
+the store's session lock, across processes with the SQLite store: OpenAI
+rejects a second run on a thread that still has an active one. A run that
+cannot get the lock within ``lock_timeout`` raises SessionBusyError.
+
+The threads between agents (SendMessage) are per session as well: the agency
+must be created with ``send_message_tool_class=SessionSendMessage``, which
+delegates on the copies of the running session instead of the agency's
+threads. Their ids are stored next to the main thread id.
+"""
+
+import contextlib
+import contextvars
+import os
+
+from agency_swarm.tools.send_message import SendMessage
+
+from utils.session_store import open_session_store
+
+# agents_and_threads of the session whose run is in progress in this context
+_session_agents_and_threads = contextvars.ContextVar("session_agents_and_threads", default=None)
+
+
+class SessionSendMessage(SendMessage):
+    """SendMessage on the threads of the session in progress, outside of sessions on those of the agency."""
+
+    def _agents_and_threads_of_session(self):
+        return _session_agents_and_threads.get() or self._agents_and_threads
+
+    def _get_thread(self):
+        return self._agents_and_threads_of_session()[self._caller_agent.name][self.recipient.value]
+
+    def _get_main_thread(self):
+        return self._agents_and_threads_of_session()["main_thread"]
+
+    def _get_recipient_agent(self):
+        return self._get_thread().recipient_agent
+
+
+def drain(generator):
+    """Runs an agency_swarm completion generator to the end and returns its result."""
+    while True:
+        try:
+            next(generator)
+        except StopIteration as e:
+            return e.value
+
+
+class SessionThreads:
+    """
+    Parameters:
+        get_agency (callable): Returns the agency (may create it on first use).
+        store: Session store for ``{"thread_id": ..., "agent_threads": {...}}``
+            per session id.
+        lock_timeout (float): Seconds a run waits for an earlier run of its session.
+    """
+
+    def __init__(self, get_agency, store, lock_timeout=30):
+        self.get_agency = get_agency
+        self.store = store
+        self.lock_timeout = lock_timeout
+
+    @contextlib.contextmanager
+    def session(self, session_id):
+        """Yields the thread of ``session_id`` and stores the ids of all its threads afterwards."""
+        with self.store.lock(session_id, timeout=self.lock_timeout):
+            agency = self.get_agency()
+            state = self.store.get(session_id)
+            thread = type(agency.main_thread)(agency.user, agency.main_thread.recipient_agent)
+            thread.id = state.get("thread_id")
+            agent_threads = self._agent_threads(agency, state.get("agent_threads") or {})
+            token = _session_agents_and_threads.set({"main_thread": thread, **agent_threads})
+            try:
+                yield thread
+            finally:
+                _session_agents_and_threads.reset(token)
+                # Threads are created on OpenAI by their first run
+                if thread.id:
+                    self.store.set(
+                        session_id,
+                        {
+                            "thread_id": thread.id,
+                            "agent_threads": {
+                                caller: {name: t.id for name, t in recipients.items() if t.id}
+                                for caller, recipients in agent_threads.items()
+                            },
+                        },
+                    )
+
+    @staticmethod
+    def _agent_threads(agency, thread_ids):
+        """Copies of the agency's threads between agents, with the ids stored for the session."""
+        agent_threads = {}
+        for caller, recipients in agency.agents_and_threads.items():
+            if caller == "main_thread":
+                continue
+            agent_threads[caller] = {}
+            for name, shared in recipients.items():
+                thread = type(shared)(shared.agent, shared.recipient_agent)
+                thread.id = thread_ids.get(caller, {}).get(name)
+                agent_threads[caller][name] = thread
+        return agent_threads
+
+    def agency(self, session_id):
+        """Returns an Agency-like object whose completions run on the thread of ``session_id``."""
+        return SessionAgency(self, session_id)
+
+
+class SessionAgency:
+    """The ``get_completion``/``get_completion_stream`` part of Agency, on a session thread."""
+
+    def __init__(self, threads, session_id):
+        self.threads = threads
+        self.session_id = session_id
+
+    def get_completion(self, message, message_files=None, yield_messages=False, recipient_agent=None,
+                       additional_instructions=None, attachments=None, tool_choice=None,
+                       response_format=None):
+        with self.threads.session(self.session_id) as thread:
+            return drain(
+                thread.get_completion(
+                    message=message,
+                    message_files=message_files,
+                    attachments=attachments,
+                    recipient_agent=recipient_agent,
+                    additional_instructions=additional_instructions,
+                    tool_choice=tool_choice,
+                    yield_messages=False,
+                    response_format=response_format,
+                )
+            )
+
+    def get_completion_stream(self, message, event_handler, message_files=None, recipient_agent=None,
+                              additional_instructions=None, attachments=None, tool_choice=None,
+                              response_format=None):
+        with self.threads.session(self.session_id) as thread:
+            result = drain(
+                thread.get_completion_stream(
+                    message=message,
+                    event_handler=event_handler,
+                    message_files=message_files,
+                    attachments=attachments,
+                    recipient_agent=recipient_agent,
+                    additional_instructions=additional_instructions,
+                    tool_choice=tool_choice,
+                    response_format=response_format,
+                )
+            )
+            event_handler.on_all_streams_end()
+            return result
+
+
+def open_session_threads(get_agency, namespace):
+    """
+    SessionThreads whose thread ids live in the session store ``namespace``.
+
+    - ``AGENCY_SESSION_TTL``: seconds after the last message after which a
+      session starts a new conversation (default 7 days)
+    - ``SESSION_LOCK_TIMEOUT``: seconds a message waits for the previous run of
+      its session before SessionBusyError (default 30)
+    """
+    store = open_session_store(
+        namespace,
+        ttl=float(os.getenv("AGENCY_SESSION_TTL", str(7 * 24 * 3600))),
+        max_sessions=int(os.getenv("AGENCY_MAX_SESSIONS", "4096")),
+    )
+    return SessionThreads(get_agency, store, lock_timeout=float(os.getenv("SESSION_LOCK_TIMEOUT", "30")))
@@ -0,0 +1,117 @@
+"""
+Cached, deduplicated tool updates for the agents' OpenAI assistants.
+
+Attachments in the Gradio chat may need FileSearch or CodeInterpreter on the
+recipient agent. The tool set state of every agent (the built-in tool types it
+has and a hash of its full tool set) is cached by agent id, so a message only
+checks a small set. When a tool is missing it is added to the agent and the
+``assistants.update`` call runs in the background; concurrent sessions that need
+the same tool set share that call, and later messages do not wait at all.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from agency_swarm.tools import CodeInterpreter, FileSearch
+
+logger = logging.getLogger(__name__)
+
+# Attachment tool types that need a tool on the assistant
+TOOL_CLASSES = {"file_search": FileSearch, "code_interpreter": CodeInterpreter}
+
+
+def toolset_hash(agent):
+    payload = json.dumps(agent.get_oai_tools(), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _done():
+    future = Future()
+    future.set_result(None)
+    return future
+
+
+class AssistantToolCache:
+    """Tool set state per agent id; updates run one at a time, in the order they were needed."""
+
+    def __init__(self):
+        # A single worker keeps an older tool set from overwriting a newer one
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="assistant-tools")
+        self._lock = threading.Lock()
+        self._types = {}  # agent id -> built-in tool types on the agent
+        self._hashes = {}  # agent id -> hash of the agent's current tool set
+        self._applied = {}  # agent id -> hash of the tool set known to be on the assistant
+        self._updates = {}  # (agent id, hash) -> future of the running update
+
+    def ensure(self, agent, attachments):
+        """
+        Makes sure ``agent`` has the tools that ``attachments`` need.
+
+        Returns a future that is done once the assistant has them; it is
+        already done unless an update for the agent's tool set is in flight.
+        """
+        required = {
+            tool["type"]
+            for attachment in attachments or []
+            for tool in attachment.get("tools", [])
+            if tool["type"] in TOOL_CLASSES
+        }
+
+        with self._lock:
+            if agent.id not in self._types:
+                # agency_swarm syncs the assistant with the agent's tools on startup
+                self._types[agent.id] = {
+                    tool_type
+                    for tool_type, tool_class in TOOL_CLASSES.items()
+                    if any(issubclass(tool, tool_class) for tool in agent.tools)
+                }
+                self._hashes[agent.id] = self._applied[agent.id] = toolset_hash(agent)
+
+            missing = required - self._types[agent.id]
+            if missing:
+                for tool_type in sorted(missing):
+                    agent.tools.append(TOOL_CLASSES[tool_type])
+                    logger.info(f"Added {TOOL_CLASSES[tool_type].__name__} to {agent.name} to analyze the file.")
+                self._types[agent.id] |= missing
+                self._hashes[agent.id] = toolset_hash(agent)
+
+            current = self._hashes[agent.id]
+            if self._applied[agent.id] == current:
+                return _done()
+            key = (agent.id, current)
+            future = self._updates.get(key)
+            if future is None:
+                tools = agent.get_oai_tools()
+                future = self._updates[key] = self._executor.submit(self._update, agent, tools, current)
+            return future
+
+    def _update(self, agent, tools, toolset):
+        try:
+            agent.client.beta.assistants.update(agent.id, tools=tools)
+            with self._lock:
+                # The agent may have gained more tools in the meantime
+                if self._hashes.get(agent.id) == toolset:
+                    self._applied[agent.id] = toolset
+        except Exception as e:
+            logger.warning(f"Could not update the tools of {agent.name}: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._updates.pop((agent.id, toolset), None)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_assistant_tool_cache():
+    """Returns the process-wide assistant tool cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AssistantToolCache()
+    return _cache
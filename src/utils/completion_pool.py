@@ -0,0 +1,182 @@
+"""
+Bounded worker pool for running blocking agency completions off the event loop.
+
+`Agency.get_completion` is synchronous and can take tens of seconds. Calling it
+directly from an ``async`` FastAPI endpoint blocks the whole uvicorn event loop,
+including the mounted Gradio app. This module runs those calls on a fixed-size
+thread pool and rejects new work once a configurable number of calls are waiting,
+so the server sheds load instead of queueing without bound.
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolUnavailableError(Exception):
+    """Raised when the pool cannot accept work, e.g. while shutting down."""
+
+    status_code = 503
+
+    def __init__(self, message, retry_after=5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PoolSaturatedError(PoolUnavailableError):
+    """Raised when the pool has no free worker and the wait queue is full."""
+
+    status_code = 429
+
+    def __init__(self, active, queued, retry_after=5):
+        super().__init__(
+            f"Completion pool saturated ({active} running, {queued} queued)",
+            retry_after=retry_after,
+        )
+        self.active = active
+        self.queued = queued
+
+
+class CompletionPool:
+    """
+    A thread pool with admission control.
+
+    Parameters:
+        max_workers (int): Number of completions that may run at the same time.
+        max_queue (int): Number of completions that may wait for a free worker.
+            Submissions beyond ``max_workers + max_queue`` raise PoolSaturatedError.
+        retry_after (int): Seconds suggested to rejected clients via ``Retry-After``.
+    """
+
+    def __init__(self, max_workers=4, max_queue=16, retry_after=5):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must not be negative")
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="completion"
+        )
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        # Admission tickets; the executor starts work in FIFO order, so a waiting
+        # completion's queue position is its ticket minus the started ones
+        self._tickets = 0
+        self._started = 0
+        self._closed = False
+
+    @property
+    def active(self):
+        """Number of completions currently running on a worker."""
+        return self._active
+
+    @property
+    def queued(self):
+        """Number of admitted completions waiting for a free worker."""
+        return self._queued
+
+    def stats(self):
+        return {
+            "active": self._active,
+            "queued": self._queued,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+        }
+
+    def _admit(self):
+        with self._lock:
+            if self._closed:
+                raise PoolUnavailableError(
+                    "Completion pool is shutting down", retry_after=self.retry_after
+                )
+            if self._active + self._queued >= self.max_workers + self.max_queue:
+                raise PoolSaturatedError(
+                    self._active, self._queued, retry_after=self.retry_after
+                )
+            self._queued += 1
+            self._tickets += 1
+            return self._tickets
+
+    def _leave_queue(self):
+        with self._lock:
+            self._queued -= 1
+            self._started += 1
+
+    def _run(self, fn, args, kwargs):
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._started += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Submits ``fn`` to the pool and returns a concurrent Future.
+
+        The caller's context variables are copied into the worker thread.
+        Raises PoolSaturatedError if the pool cannot accept more work and
+        PoolUnavailableError if it has been shut down.
+        """
+        ticket = self._admit()
+        ctx = contextvars.copy_context()
+        try:
+            future = self._executor.submit(ctx.run, self._run, fn, args, kwargs)
+        except BaseException:
+            self._leave_queue()
+            raise
+        future.ticket = ticket
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future):
+        # A future cancelled while waiting never reaches _run
+        if future.cancelled():
+            self._leave_queue()
+
+    def queue_position(self, future):
+        """1-based position of a submitted future among the waiting ones, 0 once it has started."""
+        with self._lock:
+            return max(0, getattr(future, "ticket", 0) - self._started)
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs ``fn`` on the pool and awaits its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_completion_pool():
+    """
+    Returns the process-wide completion pool, configured from the environment:
+
+    - ``COMPLETION_WORKERS``: concurrent completions (default 4)
+    - ``COMPLETION_QUEUE_DEPTH``: completions allowed to wait (default 16)
+    - ``COMPLETION_RETRY_AFTER``: seconds sent in ``Retry-After`` when saturated (default 5)
+    """
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = CompletionPool(
+                    max_workers=int(os.getenv("COMPLETION_WORKERS", "4")),
+                    max_queue=int(os.getenv("COMPLETION_QUEUE_DEPTH", "16")),
+                    retry_after=int(os.getenv("COMPLETION_RETRY_AFTER", "5")),
+                )
+    return _default_pool
@@ -1,38 +1,189 @@
 """
 This module redefines the Agency.demo_gradio method to return a Gradio Blocks object.
+
+Every browser session (Gradio ``session_hash``) has its own chat state: the
+selected recipient agent, pending uploads and its own agency_swarm thread, so
+concurrent users neither share a conversation nor see each other's tokens.
+The thread ids live in the shared session store (``utils.agency_sessions``);
+the rest of the chat state stays in the worker, as Gradio's queue already
+requires a session to stay on one process (sticky routing).
+Runs execute on the shared, bounded completion pool (see
+``utils.completion_pool``); while it is busy, users see their queue position.
+Each run gets its own event handler class that forwards chunks to an
+``asyncio.Queue``; ``bot`` is an async generator awaiting that queue, so a
+waiting user does not hold a Gradio worker thread.
 """
 
-import queue
-import threading
-
-from agency_swarm.util.files import get_tools, get_file_purpose
-from openai.types.beta.threads.runs.tool_call import (
-    CodeInterpreterToolCall,
-    FileSearchToolCall,
-    FunctionToolCall,
-    ToolCall,
-)
-from agency_swarm.tools import CodeInterpreter, FileSearch
+import asyncio
+import json
+import logging
+import os
+
+from agency_swarm.util import get_openai_client
+from agency_swarm.util.files import get_tools
+from openai.types.beta.threads.runs.tool_call import ToolCall
 from agency_swarm.messages import MessageOutput
 from agency_swarm.util.streaming import AgencyEventHandler
 from openai.types.beta.threads import Message
 from openai.types.beta.threads.runs import RunStep
 from typing_extensions import override
 
+from utils.agency_sessions import open_session_threads
+from utils.assistant_tools import get_assistant_tool_cache
+from utils.completion_pool import PoolUnavailableError, get_completion_pool
+from utils.file_uploads import FileUploader
+from utils.session_store import SessionStore
+from utils.streaming import _as_tool_call
+
+logger = logging.getLogger(__name__)
+
+NEW_MESSAGE = "[new_message]"
+END = "[end]"
+# Seconds between queue position updates while a message waits for a worker
+QUEUE_STATUS_INTERVAL = 1.0
+
+
+def make_gradio_event_handler(put):
+    """
+    Returns a new AgencyEventHandler subclass that passes chat chunks to ``put``.
+
+    ``NEW_MESSAGE`` starts a new chat bubble and ``END`` marks the end of the
+    run. agency_swarm keeps run state on the handler class, so every run needs
+    its own subclass.
+    """
+
+    class GradioEventHandler(AgencyEventHandler):
+        message_output = None
+
+        @override
+        def on_message_created(self, message: Message) -> None:
+            if message.role == "user":
+                full_content = ""
+                for content in message.content:
+                    if content.type == "image_file":
+                        full_content += f"🖼️ Image File: {content.image_file.file_id}\n"
+                        continue
+
+                    if content.type == "image_url":
+                        full_content += f"\n{content.image_url.url}\n"
+                        continue
+
+                    if content.type == "text":
+                        full_content += content.text.value + "\n"
+
+                self.message_output = MessageOutput(
+                    "text",
+                    self.agent_name,
+                    self.recipient_agent_name,
+                    full_content,
+                )
+
+            else:
+                self.message_output = MessageOutput(
+                    "text", self.recipient_agent_name, self.agent_name, ""
+                )
+
+            put(NEW_MESSAGE)
+            put(self.message_output.get_formatted_content())
+
+        @override
+        def on_text_delta(self, delta, snapshot):
+            put(delta.value)
+
+        @override
+        def on_tool_call_created(self, tool_call: ToolCall):
+            tool_call = _as_tool_call(tool_call)
+
+            # TODO: add support for code interpreter and retrieval tools
+            if tool_call.type == "function":
+                put(NEW_MESSAGE)
+                self.message_output = MessageOutput(
+                    "function",
+                    self.recipient_agent_name,
+                    self.agent_name,
+                    str(tool_call.function),
+                )
+                put(self.message_output.get_formatted_header() + "\n")
+
+        @override
+        def on_tool_call_done(self, snapshot: ToolCall):
+            snapshot = _as_tool_call(snapshot)
+            self.message_output = None
+
+            # TODO: add support for code interpreter and retrieval tools
+            if snapshot.type != "function":
+                return
+
+            put(str(snapshot.function))
+
+            if snapshot.function.name == "SendMessage":
+                try:
+                    args = json.loads(snapshot.function.arguments)
+                    recipient = args["recipient"]
+                    self.message_output = MessageOutput(
+                        "text",
+                        self.recipient_agent_name,
+                        recipient,
+                        args["message"],
+                    )
+
+                    put(NEW_MESSAGE)
+                    put(self.message_output.get_formatted_content())
+                except Exception:
+                    pass
+
+            self.message_output = None
+
+        @override
+        def on_run_step_done(self, run_step: RunStep) -> None:
+            if run_step.type == "tool_calls":
+                for tool_call in run_step.step_details.tool_calls:
+                    if tool_call.type != "function":
+                        continue
+
+                    if tool_call.function.name == "SendMessage":
+                        continue
+
+                    self.message_output = None
+                    put(NEW_MESSAGE)
+
+                    self.message_output = MessageOutput(
+                        "function_output",
+                        tool_call.function.name,
+                        self.recipient_agent_name,
+                        tool_call.function.output,
+                    )
+
+                    put(self.message_output.get_formatted_header() + "\n")
+                    put(tool_call.function.output)
+
+        @override
+        @classmethod
+        def on_all_streams_end(cls):
+            cls.message_output = None
 
-def demo_gradio_override(self, height=450, dark_mode=True, **kwargs):
+    return GradioEventHandler
+
+
+def demo_gradio_override(self, height=450, dark_mode=True, pool=None, recipient_agents=None, **kwargs):
     """
     Sets up a Gradio-based demo interface for the agency chatbot.
 
     Parameters:
         height (int, optional): The height of the chatbot widget in the Gradio interface. Default is 450.
         dark_mode (bool, optional): Flag to determine if the interface should be displayed in dark mode. Default is True.
+        pool (CompletionPool, optional): Pool that runs the completions. Default is the process-wide completion pool.
+        recipient_agents (list, optional): Agent names for the recipient dropdown. Default is the agency's main recipients.
         **kwargs: Additional keyword arguments to be passed to the Gradio interface.
 
     Returns:
         gr.Blocks: A Gradio Blocks object representing the demo interface.
 
     This method sets up a Gradio interface, allowing users to interact with the agency's chatbot. It includes a text input for the user's messages and a chatbot interface for displaying the conversation. The method handles user input and chatbot responses, updating the interface dynamically.
+
+    ``self`` may also be a function that returns the agency. It is then called on
+    the first message, so the interface can be built before the agency exists
+    (pass ``recipient_agents`` in that case).
     """
 
     try:
@@ -52,122 +203,118 @@ def demo_gradio_override(self, height=450, dark_mode=True, **kwargs):
     else:
         js = js.replace("{theme}", "light")
 
-    attachments = []
-    images = []
-    message_file_names = None
-    uploading_files = False
-    recipient_agents = [agent.name for agent in self.main_recipients]
-    recipient_agent = self.main_recipients[0]
+    pool = pool or get_completion_pool()
+    tool_cache = get_assistant_tool_cache()
+    uploader = FileUploader(
+        get_openai_client(),
+        max_workers=int(os.getenv("FILE_UPLOAD_WORKERS", "4")),
+    )
+
+    def get_agency():
+        return self() if callable(self) else self
+
+    if recipient_agents is None:
+        recipient_agents = [agent.name for agent in get_agency().main_recipients]
+
+    # Chat state per browser session; evicted sessions start a new conversation
+    chat_sessions = SessionStore(
+        max_sessions=int(os.getenv("CHAT_MAX_SESSIONS", "256")),
+        ttl=float(os.getenv("CHAT_SESSION_TTL", "3600")),
+        factory=lambda: {
+            "recipient_agent": recipient_agents[0],
+            "attachments": [],
+            "images": [],
+            "message_file_names": [],
+            "uploading_files": False,
+        },
+    )
+    chat_threads = open_session_threads(get_agency, "chat_threads")
+
+    def session_id(request):
+        return getattr(request, "session_hash", None) or "default"
+
+    def session_state(request):
+        return chat_sessions.get(session_id(request))
 
     with gr.Blocks(js=js) as demo:
-        chatbot_queue = queue.Queue()
         chatbot = gr.Chatbot(height=height)
         with gr.Row():
             with gr.Column(scale=9):
                 dropdown = gr.Dropdown(
                     label="Recipient Agent",
                     choices=recipient_agents,
-                    value=recipient_agent.name,
+                    value=recipient_agents[0],
                 )
                 msg = gr.Textbox(label="Your Message", lines=4)
             with gr.Column(scale=1):
                 file_upload = gr.Files(label="OpenAI Files", type="filepath")
+                upload_status = gr.Markdown()
         button = gr.Button(value="Send", variant="primary")
 
-        def handle_dropdown_change(selected_option):
-            nonlocal recipient_agent
-            recipient_agent = self._get_agent_by_name(selected_option)
-
-        def handle_file_upload(file_list):
-            nonlocal attachments
-            nonlocal message_file_names
-            nonlocal uploading_files
-            nonlocal images
-            uploading_files = True
-            attachments = []
-            message_file_names = []
-            if file_list:
-                try:
-                    for file_obj in file_list:
-                        purpose = get_file_purpose(file_obj.name)
-
-                        with open(file_obj.name, "rb") as f:
-                            # Upload the file to OpenAI
-                            file = self.main_thread.client.files.create(
-                                file=f, purpose=purpose
-                            )
-
-                        if purpose == "vision":
-                            images.append(
-                                {
-                                    "type": "image_file",
-                                    "image_file": {"file_id": file.id},
-                                }
-                            )
-                        else:
-                            attachments.append(
-                                {
-                                    "file_id": file.id,
-                                    "tools": get_tools(file.filename),
-                                }
-                            )
-
-                        message_file_names.append(file.filename)
-                        print(f"Uploaded file ID: {file.id}")
-                    return attachments
-                except Exception as e:
-                    print(f"Error: {e}")
-                    return str(e)
-                finally:
-                    uploading_files = False
+        def handle_dropdown_change(selected_option, request: gr.Request):
+            session_state(request)["recipient_agent"] = selected_option
+
+        def handle_file_upload(file_list, request: gr.Request):
+            state = session_state(request)
+            state["uploading_files"] = True
+            state["attachments"] = []
+            state["message_file_names"] = []
+            state["images"] = []
+            if not file_list:
+                state["uploading_files"] = False
+                yield ""
+                return
+
+            # Upload concurrently and show the status of every file as it finishes
+            paths = [file_obj.name for file_obj in file_list]
+            statuses = [f"⏳ {os.path.basename(path)}" for path in paths]
+            yield "\n".join(statuses)
+            try:
+                futures = uploader.submit(paths)
+                for index, future in enumerate(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Upload of {os.path.basename(paths[index])} failed: {e}")
+                        statuses[index] = f"❌ {os.path.basename(paths[index])}: {e}"
+                        yield "\n".join(statuses)
+                        continue
 
-            uploading_files = False
-            return "No files uploaded"
+                    if result.purpose == "vision":
+                        state["images"].append(
+                            {
+                                "type": "image_file",
+                                "image_file": {"file_id": result.file_id},
+                            }
+                        )
+                    else:
+                        state["attachments"].append(
+                            {
+                                "file_id": result.file_id,
+                                "tools": get_tools(result.filename),
+                            }
+                        )
 
-        def user(user_message, history):
+                    state["message_file_names"].append(result.filename)
+                    statuses[index] = (
+                        f"♻️ {result.filename} (already uploaded)" if result.cached else f"✅ {result.filename}"
+                    )
+                    logger.info(f"Uploaded file ID: {result.file_id}")
+                    yield "\n".join(statuses)
+            finally:
+                state["uploading_files"] = False
+
+        def user(user_message, history, request: gr.Request):
             if not user_message.strip():
                 return user_message, history
 
-            nonlocal message_file_names
-            nonlocal uploading_files
-            nonlocal images
-            nonlocal attachments
-            nonlocal recipient_agent
-
-            # Check if attachments contain file search or code interpreter types
-            def check_and_add_tools_in_attachments(attachments, recipient_agent):
-                for attachment in attachments:
-                    for tool in attachment.get("tools", []):
-                        if tool["type"] == "file_search":
-                            if not any(
-                                isinstance(t, FileSearch) for t in recipient_agent.tools
-                            ):
-                                # Add FileSearch tool if it does not exist
-                                recipient_agent.tools.append(FileSearch)
-                                recipient_agent.client.beta.assistants.update(
-                                    recipient_agent.id,
-                                    tools=recipient_agent.get_oai_tools(),
-                                )
-                                print(
-                                    "Added FileSearch tool to recipient agent to analyze the file."
-                                )
-                        elif tool["type"] == "code_interpreter":
-                            if not any(
-                                isinstance(t, CodeInterpreter)
-                                for t in recipient_agent.tools
-                            ):
-                                # Add CodeInterpreter tool if it does not exist
-                                recipient_agent.tools.append(CodeInterpreter)
-                                recipient_agent.client.beta.assistants.update(
-                                    recipient_agent.id,
-                                    tools=recipient_agent.get_oai_tools(),
-                                )
-                                print(
-                                    "Added CodeInterpreter tool to recipient agent to analyze the file."
-                                )
-                return None
-
-            check_and_add_tools_in_attachments(attachments, recipient_agent)
+            state = session_state(request)
+            recipient_agent = get_agency()._get_agent_by_name(state["recipient_agent"])
+
+            # Add FileSearch / CodeInterpreter for the attachments; the assistant
+            # update runs in the background and bot() waits for it if needed
+            if recipient_agent:
+                tool_cache.ensure(recipient_agent, state["attachments"])
 
             if history is None:
                 history = []
@@ -182,170 +329,29 @@ def demo_gradio_override(self, height=450, dark_mode=True, **kwargs):
             else:
                 user_message = "👤 User:" + user_message.strip()
 
-            nonlocal message_file_names
-            if message_file_names:
-                user_message += "\n\n📎 Files:\n" + "\n".join(message_file_names)
+            if state["message_file_names"]:
+                user_message += "\n\n📎 Files:\n" + "\n".join(state["message_file_names"])
 
             return original_user_message, history + [[user_message, None]]
 
-        class GradioEventHandler(AgencyEventHandler):
-            message_output = None
-
-            @override
-            def on_message_created(self, message: Message) -> None:
-                if message.role == "user":
-                    full_content = ""
-                    for content in message.content:
-                        if content.type == "image_file":
-                            full_content += (
-                                f"🖼️ Image File: {content.image_file.file_id}\n"
-                            )
-                            continue
-
-                        if content.type == "image_url":
-                            full_content += f"\n{content.image_url.url}\n"
-                            continue
-
-                        if content.type == "text":
-                            full_content += content.text.value + "\n"
-
-                    self.message_output = MessageOutput(
-                        "text",
-                        self.agent_name,
-                        self.recipient_agent_name,
-                        full_content,
-                    )
-
-                else:
-                    self.message_output = MessageOutput(
-                        "text", self.recipient_agent_name, self.agent_name, ""
-                    )
-
-                chatbot_queue.put("[new_message]")
-                chatbot_queue.put(self.message_output.get_formatted_content())
-
-            @override
-            def on_text_delta(self, delta, snapshot):
-                chatbot_queue.put(delta.value)
-
-            @override
-            def on_tool_call_created(self, tool_call: ToolCall):
-                if isinstance(tool_call, dict):
-                    if "type" not in tool_call:
-                        tool_call["type"] = "function"
-
-                    if tool_call["type"] == "function":
-                        tool_call = FunctionToolCall(**tool_call)
-                    elif tool_call["type"] == "code_interpreter":
-                        tool_call = CodeInterpreterToolCall(**tool_call)
-                    elif (
-                        tool_call["type"] == "file_search"
-                        or tool_call["type"] == "retrieval"
-                    ):
-                        tool_call = FileSearchToolCall(**tool_call)
-                    else:
-                        raise ValueError("Invalid tool call type: " + tool_call["type"])
-
-                # TODO: add support for code interpreter and retrieval tools
-                if tool_call.type == "function":
-                    chatbot_queue.put("[new_message]")
-                    self.message_output = MessageOutput(
-                        "function",
-                        self.recipient_agent_name,
-                        self.agent_name,
-                        str(tool_call.function),
-                    )
-                    chatbot_queue.put(self.message_output.get_formatted_header() + "\n")
-
-            @override
-            def on_tool_call_done(self, snapshot: ToolCall):
-                if isinstance(snapshot, dict):
-                    if "type" not in snapshot:
-                        snapshot["type"] = "function"
-
-                    if snapshot["type"] == "function":
-                        snapshot = FunctionToolCall(**snapshot)
-                    elif snapshot["type"] == "code_interpreter":
-                        snapshot = CodeInterpreterToolCall(**snapshot)
-                    elif snapshot["type"] == "file_search":
-                        snapshot = FileSearchToolCall(**snapshot)
-                    else:
-                        raise ValueError("Invalid tool call type: " + snapshot["type"])
-
-                self.message_output = None
-
-                # TODO: add support for code interpreter and retrieval tools
-                if snapshot.type != "function":
-                    return
-
-                chatbot_queue.put(str(snapshot.function))
-
-                if snapshot.function.name == "SendMessage":
-                    try:
-                        args = eval(snapshot.function.arguments)
-                        recipient = args["recipient"]
-                        self.message_output = MessageOutput(
-                            "text",
-                            self.recipient_agent_name,
-                            recipient,
-                            args["message"],
-                        )
-
-                        chatbot_queue.put("[new_message]")
-                        chatbot_queue.put(self.message_output.get_formatted_content())
-                    except Exception:
-                        pass
-
-                self.message_output = None
-
-            @override
-            def on_run_step_done(self, run_step: RunStep) -> None:
-                if run_step.type == "tool_calls":
-                    for tool_call in run_step.step_details.tool_calls:
-                        if tool_call.type != "function":
-                            continue
-
-                        if tool_call.function.name == "SendMessage":
-                            continue
-
-                        self.message_output = None
-                        chatbot_queue.put("[new_message]")
-
-                        self.message_output = MessageOutput(
-                            "function_output",
-                            tool_call.function.name,
-                            self.recipient_agent_name,
-                            tool_call.function.output,
-                        )
-
-                        chatbot_queue.put(
-                            self.message_output.get_formatted_header() + "\n"
-                        )
-                        chatbot_queue.put(tool_call.function.output)
-
-            @override
-            @classmethod
-            def on_all_streams_end(cls):
-                cls.message_output = None
-                chatbot_queue.put("[end]")
-
-        def bot(original_message, history):
+        async def bot(original_message, history, request: gr.Request):
             if not original_message:
-                return "", history
-
-            nonlocal attachments
-            nonlocal message_file_names
-            nonlocal recipient_agent
-            nonlocal images
-            nonlocal uploading_files
+                yield "", history
+                return
 
-            if uploading_files:
+            state = session_state(request)
+            if state["uploading_files"]:
                 history.append([None, "Uploading files... Please wait."])
                 yield "", history
-                return "", history
+                return
 
-            print("Message files: ", attachments)
-            print("Images: ", images)
+            # Off the event loop: the first message may still have to create the agency
+            agency = await asyncio.to_thread(get_agency)
+            recipient_agent = agency._get_agent_by_name(state["recipient_agent"])
+            attachments = state["attachments"]
+            images = state["images"]
+            logger.debug(f"Message files: {attachments}")
+            logger.debug(f"Images: {images}")
 
             if images and len(images) > 0:
                 original_message = [
@@ -356,35 +362,78 @@ def demo_gradio_override(self, height=450, dark_mode=True, **kwargs):
                     *images,
                 ]
 
-            completion_thread = threading.Thread(
-                target=self.get_completion_stream,
-                args=(
-                    original_message,
-                    GradioEventHandler,
-                    [],
-                    recipient_agent,
-                    "",
-                    attachments,
-                    None,
-                ),
-            )
-            completion_thread.start()
-
-            attachments = []
-            message_file_names = []
-            images = []
-            uploading_files = False
+            state["attachments"] = []
+            state["message_file_names"] = []
+            state["images"] = []
+            state["uploading_files"] = False
 
-            new_message = True
-            while True:
+            if recipient_agent and attachments:
                 try:
-                    bot_message = chatbot_queue.get(block=True)
+                    await asyncio.wrap_future(tool_cache.ensure(recipient_agent, attachments))
+                except Exception as e:
+                    logger.error(f"Could not add the attachment tools to {recipient_agent.name}: {e}")
+
+            # Bridge from the pool worker to this coroutine
+            loop = asyncio.get_running_loop()
+            chunks = asyncio.Queue()
+
+            def put(chunk):
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+
+            def run():
+                try:
+                    chat_threads.agency(session_id(request)).get_completion_stream(
+                        original_message,
+                        make_gradio_event_handler(put),
+                        recipient_agent=recipient_agent,
+                        additional_instructions="",
+                        attachments=attachments,
+                    )
+                except Exception as e:
+                    put(NEW_MESSAGE)
+                    put(f"Error: {e}")
+                finally:
+                    put(END)
+
+            try:
+                future = pool.submit(run)
+            except PoolUnavailableError as e:
+                history.append(
+                    [None, f"⏳ The server is busy. Please try again in {e.retry_after} seconds."]
+                )
+                yield "", history
+                return
+
+            status_index = None
+            new_message = True
+            try:
+                while True:
+                    # While all workers are busy, show the queue position instead of blocking
+                    position = pool.queue_position(future)
+                    if position:
+                        status = f"⏳ All agents are busy, you are number {position} in the queue."
+                        if status_index is None:
+                            history.append([None, status])
+                            status_index = len(history) - 1
+                            yield "", history
+                        elif history[status_index][1] != status:
+                            history[status_index][1] = status
+                            yield "", history
+                        try:
+                            bot_message = await asyncio.wait_for(chunks.get(), QUEUE_STATUS_INTERVAL)
+                        except asyncio.TimeoutError:
+                            continue
+                    else:
+                        bot_message = await chunks.get()
+
+                    if status_index is not None:
+                        del history[status_index]
+                        status_index = None
 
-                    if bot_message == "[end]":
-                        completion_thread.join()
+                    if bot_message == END:
                         break
 
-                    if bot_message == "[new_message]":
+                    if bot_message == NEW_MESSAGE:
                         new_message = True
                         continue
 
@@ -395,20 +444,22 @@ def demo_gradio_override(self, height=450, dark_mode=True, **kwargs):
                         history[-1][1] += bot_message
 
                     yield "", history
-                except queue.Empty:
-                    break
+            finally:
+                # Closed browser tab: give up the place in the queue (no effect once running)
+                future.cancel()
 
         button.click(user, inputs=[msg, chatbot], outputs=[msg, chatbot]).then(
             bot, [msg, chatbot], [msg, chatbot]
         )
         dropdown.change(handle_dropdown_change, dropdown)
-        file_upload.change(handle_file_upload, file_upload)
+        file_upload.change(handle_file_upload, file_upload, upload_status)
         msg.submit(user, [msg, chatbot], [msg, chatbot], queue=False).then(
             bot, [msg, chatbot], [msg, chatbot]
         )
 
-        # Enable queuing for streaming intermediate outputs
-        demo.queue(default_concurrency_limit=10)
+        # Enable queuing for streaming intermediate outputs. Waiting bots only
+        # await their queue, so the limit can be well above the pool size
+        demo.queue(default_concurrency_limit=int(os.getenv("CHAT_CONCURRENCY_LIMIT", "64")))
 
     # Do not launch the demo here
     return demo
@@ -0,0 +1,185 @@
+"""
+Parallel, content-deduplicated uploads of chat attachments to OpenAI.
+
+Files are hashed (SHA-256) and looked up in a persistent ``hash -> file_id``
+index before uploading, so a file that was already sent is attached again
+without any network request. The remaining files are uploaded concurrently on a
+small thread pool; callers receive one future per file and can report progress
+as the futures complete.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from agency_swarm.util.files import get_file_purpose
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class UploadResult:
+    path: str
+    filename: str
+    file_id: str
+    purpose: str
+    size: int
+    cached: bool
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileUploadIndex:
+    """
+    Thread-safe ``(scope, sha256, purpose) -> file_id`` index in SQLite.
+
+    ``scope`` separates OpenAI endpoints (file ids of one API base URL are
+    meaningless for another). Without ``path`` the index lives in memory only.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False, timeout=30)
+        if path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS uploads (
+                scope TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                purpose TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (scope, sha256, purpose)
+            )"""
+        )
+        self._db.commit()
+
+    def get(self, scope, sha256, purpose):
+        """Returns the file id of an earlier upload or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT file_id FROM uploads WHERE scope = ? AND sha256 = ? AND purpose = ?",
+                (scope, sha256, purpose),
+            ).fetchone()
+            return row[0] if row else None
+
+    def put(self, scope, sha256, purpose, file_id, size):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO uploads (scope, sha256, purpose, file_id, size, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, sha256, purpose, file_id, size, time.time()),
+            )
+            self._db.commit()
+
+    def forget(self, file_id):
+        """Removes a file id, e.g. after the file was deleted on OpenAI."""
+        with self._lock:
+            self._db.execute("DELETE FROM uploads WHERE file_id = ?", (file_id,))
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM uploads").fetchone()[0]
+
+
+class FileUploader:
+    """
+    Parameters:
+        client: OpenAI client used for ``files.create``.
+        index (FileUploadIndex, optional): Index of earlier uploads. Default is
+            the process-wide index from ``get_file_upload_index``.
+        max_workers (int): Number of concurrent uploads.
+    """
+
+    def __init__(self, client, index=None, max_workers=4):
+        self.client = client
+        self.index = index if index is not None else get_file_upload_index()
+        self.scope = str(getattr(client, "base_url", ""))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="file-upload")
+        # Identical files submitted at the same time share one upload
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, paths):
+        """Starts uploading ``paths`` and returns one future per path, in order."""
+        return [self._executor.submit(self.upload, path) for path in paths]
+
+    def upload(self, path):
+        """Uploads one file unless the index already has it; returns an UploadResult."""
+        filename = os.path.basename(path)
+        purpose = get_file_purpose(path)
+        sha256 = file_sha256(path)
+        size = os.path.getsize(path)
+
+        key = (sha256, purpose)
+        with self._lock:
+            file_id = self.index.get(self.scope, sha256, purpose)
+            if file_id:
+                return UploadResult(path, filename, file_id, purpose, size, cached=True)
+            event = self._in_flight.get(key)
+            owner = event is None
+            if owner:
+                event = self._in_flight[key] = threading.Event()
+
+        if not owner:
+            event.wait()
+            file_id = self.index.get(self.scope, sha256, purpose)
+            if file_id:
+                return UploadResult(path, filename, file_id, purpose, size, cached=True)
+            # The other upload failed; try on our own
+            return self.upload(path)
+
+        try:
+            with open(path, "rb") as f:
+                file = self.client.files.create(file=f, purpose=purpose)
+            self.index.put(self.scope, sha256, purpose, file.id, size)
+            logger.info(f"Uploaded {filename} as {file.id}")
+            return UploadResult(path, filename, file.id, purpose, size, cached=False)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            event.set()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_file_upload_index():
+    """
+    Returns the process-wide upload index, configured from the environment:
+
+    - ``FILE_UPLOAD_INDEX_PATH``: SQLite file (default ``.cache/file_uploads.sqlite3``),
+      empty for an in-memory index
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FileUploadIndex(
+                    os.getenv("FILE_UPLOAD_INDEX_PATH", os.path.join(".cache", "file_uploads.sqlite3")) or None
+                )
+    return _index
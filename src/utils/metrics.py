@@ -0,0 +1,283 @@
+"""Prometheus metrics for the FastAPI app.
+
+Exposes request latency per route, completion pool load, OpenAI call latency and
+errors (fed by the LLM usage tracker), Gradio queue depth and process RSS/threads.
+
+With several uvicorn/gunicorn workers set ``PROMETHEUS_MULTIPROC_DIR`` to an
+empty, writable directory before the workers start (and clear it on restart).
+Every worker then writes its samples there and ``/metrics`` aggregates them,
+whichever worker serves the scrape.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120, 300)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the response body is complete",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route and status code",
+    ["method", "route", "status"],
+)
+COMPLETIONS_ACTIVE = Gauge(
+    "completion_pool_active",
+    "Agency completions currently running",
+    multiprocess_mode="livesum",
+)
+COMPLETIONS_QUEUED = Gauge(
+    "completion_pool_queued",
+    "Agency completions waiting for a worker",
+    multiprocess_mode="livesum",
+)
+GRADIO_QUEUE_DEPTH = Gauge(
+    "gradio_queue_depth",
+    "Events waiting in the Gradio queue",
+    multiprocess_mode="livesum",
+)
+OPENAI_LATENCY = Histogram(
+    "openai_call_duration_seconds",
+    "OpenAI chat completion latency including retries",
+    ["model", "tool"],
+    buckets=LATENCY_BUCKETS,
+)
+OPENAI_CALLS = Counter(
+    "openai_calls_total",
+    "OpenAI chat completion calls by outcome (ok, error, cache_hit)",
+    ["model", "tool", "outcome"],
+)
+OPENAI_ERRORS = Counter(
+    "openai_errors_total",
+    "Failed OpenAI chat completion calls",
+    ["model", "tool"],
+)
+OPENAI_RETRIES = Counter(
+    "openai_retries_total",
+    "Retried OpenAI chat completion attempts",
+    ["model", "tool"],
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "OpenAI tokens by kind (prompt, completion, cached)",
+    ["model", "tool", "kind"],
+)
+PROCESS_RSS = Gauge(
+    "app_process_resident_memory_bytes",
+    "Resident set size of the worker process",
+    multiprocess_mode="liveall",
+)
+PROCESS_THREADS = Gauge(
+    "app_process_threads",
+    "OS threads of the worker process",
+    multiprocess_mode="liveall",
+)
+
+
+def _read_proc_status():
+    values = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                values[name] = value.strip()
+    except OSError:
+        pass
+    return values
+
+
+def sample_process():
+    status = _read_proc_status()
+    if "VmRSS" in status:
+        PROCESS_RSS.set(int(status["VmRSS"].split()[0]) * 1024)
+    else:
+        import resource
+
+        # Fallback without /proc (macOS): peak RSS
+        PROCESS_RSS.set(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    PROCESS_THREADS.set(int(status.get("Threads", threading.active_count())))
+
+
+def gradio_queue_depth(blocks):
+    """Number of queued events of a Gradio Blocks app (Gradio 3 and 4)."""
+    queue = getattr(blocks, "_queue", None)
+    if queue is None:
+        return 0
+    per_concurrency_id = getattr(queue, "event_queue_per_concurrency_id", None)
+    if per_concurrency_id is not None:
+        return sum(
+            len(event_queue.queue) for event_queue in list(per_concurrency_id.values())
+        )
+    event_queue = getattr(queue, "event_queue", None)
+    return len(event_queue) if event_queue is not None else 0
+
+
+def record_llm_usage(record):
+    """UsageTracker listener: one LLM call from the agency tools."""
+    outcome = "error" if record.error else "cache_hit" if record.cache_hit else "ok"
+    OPENAI_CALLS.labels(record.model, record.tool, outcome).inc()
+    if record.retries:
+        OPENAI_RETRIES.labels(record.model, record.tool).inc(record.retries)
+    if record.error:
+        OPENAI_ERRORS.labels(record.model, record.tool).inc()
+    if not record.cache_hit:
+        OPENAI_LATENCY.labels(record.model, record.tool).observe(record.latency)
+    for kind, tokens in (
+        ("prompt", record.prompt_tokens),
+        ("completion", record.completion_tokens),
+        ("cached", record.cached_tokens),
+    ):
+        if tokens:
+            OPENAI_TOKENS.labels(record.model, record.tool, kind).inc(tokens)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request until its last body chunk.
+
+    The label is the route template (``/api/agency``) or the mount path
+    (``/demo-gradio``), never the raw URL, to keep label cardinality bounded.
+    """
+
+    def __init__(self, app, mounts=()):
+        self.app = app
+        self.mounts = tuple(mounts)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route(scope)
+            REQUEST_LATENCY.labels(scope["method"], route).observe(
+                time.perf_counter() - started
+            )
+            REQUESTS.labels(scope["method"], route, str(status["code"])).inc()
+
+    def _route(self, scope):
+        # Mounted apps set their own inner route, so check the mounts first
+        path = scope.get("path", "")
+        for mount in self.mounts:
+            if path == mount or path.startswith(mount.rstrip("/") + "/"):
+                return mount
+        route = scope.get("route")
+        if route is not None and getattr(route, "path", None):
+            return route.path
+        return "unmatched"
+
+
+class Metrics:
+    """Wires the collectors into the app and samples gauges in the background."""
+
+    def __init__(self, interval=None):
+        self.interval = interval or float(os.getenv("METRICS_SAMPLE_INTERVAL", "5"))
+        self._pools = []
+        self._gradio_apps = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def track_pool(self, pool):
+        self._pools.append(pool)
+
+    def track_gradio(self, blocks):
+        self._gradio_apps.append(blocks)
+
+    def sample(self):
+        try:
+            active = queued = 0
+            for pool in self._pools:
+                stats = pool.stats()
+                active += stats["active"]
+                queued += stats["queued"]
+            COMPLETIONS_ACTIVE.set(active)
+            COMPLETIONS_QUEUED.set(queued)
+            GRADIO_QUEUE_DEPTH.set(
+                sum(gradio_queue_depth(blocks) for blocks in self._gradio_apps)
+            )
+            sample_process()
+        except Exception as e:
+            logger.warning(f"Metrics sampling failed: {e}")
+
+    def _run(self):
+        # In multiprocess mode the scraping worker cannot read the other workers'
+        # pools, so every worker writes its gauges periodically
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        if self._thread is None:
+            self.sample()
+            self._thread = threading.Thread(
+                target=self._run, name="metrics-sampler", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if MULTIPROCESS:
+            multiprocess.mark_process_dead(os.getpid())
+
+    def render(self):
+        self.sample()
+        if MULTIPROCESS:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            from prometheus_client import REGISTRY as registry
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def setup_metrics(app, path="/metrics", mounts=(), usage_tracker=None, token=None):
+    """Adds the middleware and the metrics route to a FastAPI app.
+
+    ``usage_tracker`` feeds the OpenAI metrics; ``token`` (default
+    ``METRICS_TOKEN``) protects the route with a bearer token.
+    """
+    from fastapi import HTTPException, Request
+
+    metrics = Metrics()
+    token = token if token is not None else os.getenv("METRICS_TOKEN")
+    app.add_middleware(MetricsMiddleware, mounts=mounts)
+    if usage_tracker is not None:
+        usage_tracker.add_listener(record_llm_usage)
+
+    @app.get(path, include_in_schema=False)
+    def metrics_endpoint(request: Request):
+        if token and request.headers.get("authorization") != f"Bearer {token}":
+            raise HTTPException(status_code=401, detail="Unauthorized")
+        return metrics.render()
+
+    app.on_event("startup")(metrics.start)
+    app.on_event("shutdown")(metrics.stop)
+    return metrics
@@ -0,0 +1,373 @@
+"""
+Thread-safe, bounded store for per-session state.
+
+Each session (a Gradio ``session_hash`` or an API session id) gets its own state
+dict. Memory is bounded by an LRU limit and an idle TTL. Sessions that leave
+memory can optionally be spilled to disk as JSON and are transparently loaded
+again on the next access.
+
+SqliteSessionStore keeps JSON state in a SQLite file instead, so several worker
+processes share it; ``open_session_store`` picks one from the environment.
+
+``lock(session_id)`` serializes the work on one session: read-modify-write of
+its state, or a run on its conversation. SessionStore locks within the process,
+SqliteSessionStore across all processes with a lease row in the same file. A
+heartbeat renews the lease while the lock is held, so work may take longer
+than the lease, and the lock of a crashed worker is free again soon.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class SessionBusyError(Exception):
+    """Raised when a session stays locked by other work for longer than the timeout."""
+
+    def __init__(self, session_id, timeout):
+        super().__init__(f"Session is busy (still locked after {timeout:g}s)")
+        self.session_id = session_id
+        self.timeout = timeout
+
+
+class SessionStore:
+    """
+    Parameters:
+        max_sessions (int): Maximum number of sessions kept in memory.
+        ttl (float): Seconds of inactivity after which a session leaves memory.
+        spill_dir (str, optional): Directory for sessions evicted from memory.
+            Without it, evicted sessions are dropped.
+        spill_ttl (float): Seconds after which spilled sessions are discarded.
+        factory (callable): Creates the initial state for a new session.
+    """
+
+    def __init__(
+        self,
+        max_sessions=256,
+        ttl=3600,
+        spill_dir=None,
+        spill_ttl=7 * 24 * 3600,
+        factory=dict,
+    ):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.spill_dir = spill_dir
+        self.spill_ttl = spill_ttl
+        self.factory = factory
+        self._sessions = OrderedDict()  # session_id -> (last_access, state)
+        self._lock = threading.RLock()
+        self._session_locks = {}  # session_id -> (lock, number of holders and waiters)
+
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def __contains__(self, session_id):
+        with self._lock:
+            return session_id in self._sessions or os.path.exists(
+                self._spill_path(session_id) or ""
+            )
+
+    def get(self, session_id):
+        """Returns the state of ``session_id``, creating it if necessary."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+
+            entry = self._sessions.pop(session_id, None)
+            state = entry[1] if entry else self._load_spilled(session_id)
+            if state is None:
+                state = self.factory()
+
+            self._sessions[session_id] = (now, state)
+            self._evict_overflow()
+            return state
+
+    def set(self, session_id, state):
+        """Replaces the state of ``session_id``."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._sessions[session_id] = (time.monotonic(), state)
+            self._evict_overflow()
+
+    def pop(self, session_id):
+        """Removes ``session_id`` from memory and disk and returns its state."""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            spilled = self._load_spilled(session_id)
+            return entry[1] if entry else spilled
+
+    @contextlib.contextmanager
+    def lock(self, session_id, timeout=30):
+        """Holds the lock of ``session_id``; raises SessionBusyError after ``timeout`` seconds."""
+        with self._lock:
+            lock, users = self._session_locks.get(session_id, (None, 0))
+            lock = lock or threading.Lock()
+            self._session_locks[session_id] = (lock, users + 1)
+        try:
+            if not lock.acquire(timeout=timeout):
+                raise SessionBusyError(session_id, timeout)
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            with self._lock:
+                lock, users = self._session_locks[session_id]
+                if users == 1:
+                    del self._session_locks[session_id]
+                else:
+                    self._session_locks[session_id] = (lock, users - 1)
+
+    def _expire(self, now):
+        # The OrderedDict is ordered by last access, so expired sessions are at the front
+        while self._sessions:
+            session_id, (last_access, state) = next(iter(self._sessions.items()))
+            if now - last_access < self.ttl:
+                break
+            del self._sessions[session_id]
+            self._spill(session_id, state)
+
+    def _evict_overflow(self):
+        while len(self._sessions) > self.max_sessions:
+            session_id, (_, state) = self._sessions.popitem(last=False)
+            self._spill(session_id, state)
+
+    def _spill_path(self, session_id):
+        if not self.spill_dir:
+            return None
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, digest + ".json")
+
+    def _spill(self, session_id, state):
+        path = self._spill_path(session_id)
+        if not path:
+            return
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not spill session to disk: {e}")
+
+    def _load_spilled(self, session_id):
+        """Loads and removes a spilled session; returns None if there is none."""
+        path = self._spill_path(session_id)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            expired = time.time() - os.path.getmtime(path) > self.spill_ttl
+            state = None
+            if not expired:
+                with open(path, encoding="utf-8") as f:
+                    state = json.load(f)
+            os.remove(path)
+            return state
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load spilled session: {e}")
+            return None
+
+
+class SqliteSessionStore:
+    """
+    Session store in a SQLite file shared by all worker processes.
+
+    Same interface as SessionStore, but ``get`` returns a copy of the stored
+    JSON state: changes must be written back with ``set``.
+
+    Parameters:
+        path (str): SQLite file.
+        namespace (str): Separates the stores that share one file.
+        ttl (float): Seconds after the last ``set`` after which a session expires.
+        factory (callable): Creates the initial state for a new session.
+    """
+
+    # Seconds between deletions of expired sessions
+    PURGE_INTERVAL = 60
+    # Seconds after which the lock of a crashed worker is taken over
+    LOCK_LEASE = 30
+    # Seconds between renewals of the lease while the lock is held
+    LOCK_RENEW_INTERVAL = 10
+    # Seconds between attempts to take a held lock
+    LOCK_POLL_INTERVAL = 0.1
+
+    def __init__(self, path, namespace="default", ttl=3600, factory=dict):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.factory = factory
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                namespace TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                state TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (namespace, session_id)
+            )"""
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS session_locks (
+                namespace TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                expires REAL NOT NULL,
+                PRIMARY KEY (namespace, session_id)
+            )"""
+        )
+        self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM sessions WHERE namespace = ? AND updated >= ?",
+                (self.namespace, time.time() - self.ttl),
+            ).fetchone()[0]
+
+    def __contains__(self, session_id):
+        return self._load(session_id) is not None
+
+    def get(self, session_id):
+        """Returns a copy of the state of ``session_id``, or a new state if there is none."""
+        state = self._load(session_id)
+        return self.factory() if state is None else state
+
+    def set(self, session_id, state):
+        """Stores ``state`` for ``session_id``."""
+        value = json.dumps(state, ensure_ascii=False)
+        with self._lock:
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (namespace, session_id, state, updated) VALUES (?, ?, ?, ?)",
+                (self.namespace, session_id, value, now),
+            )
+            if now - self._last_purge > self.PURGE_INTERVAL:
+                self._last_purge = now
+                self._db.execute(
+                    "DELETE FROM sessions WHERE namespace = ? AND updated < ?",
+                    (self.namespace, now - self.ttl),
+                )
+            self._db.commit()
+
+    def pop(self, session_id):
+        """Removes ``session_id`` and returns its state."""
+        state = self._load(session_id)
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM sessions WHERE namespace = ? AND session_id = ?",
+                (self.namespace, session_id),
+            )
+            self._db.commit()
+        return state
+
+    @contextlib.contextmanager
+    def lock(self, session_id, timeout=30):
+        """Holds the lock of ``session_id`` in all processes; raises SessionBusyError after ``timeout`` seconds."""
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        while not self._try_lock(session_id, owner):
+            if time.monotonic() >= deadline:
+                raise SessionBusyError(session_id, timeout)
+            time.sleep(self.LOCK_POLL_INTERVAL)
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._renew_lock,
+            args=(session_id, owner, stop),
+            name="session-lock-heartbeat",
+            daemon=True,
+        )
+        heartbeat.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            heartbeat.join()
+            with self._lock:
+                self._db.execute(
+                    "DELETE FROM session_locks WHERE namespace = ? AND session_id = ? AND owner = ?",
+                    (self.namespace, session_id, owner),
+                )
+                self._db.commit()
+
+    def _try_lock(self, session_id, owner):
+        # One statement, so taking a free or expired lease is atomic across processes
+        with self._lock:
+            now = time.time()
+            cursor = self._db.execute(
+                """INSERT INTO session_locks (namespace, session_id, owner, expires) VALUES (?, ?, ?, ?)
+                ON CONFLICT (namespace, session_id) DO UPDATE
+                SET owner = excluded.owner, expires = excluded.expires
+                WHERE session_locks.expires <= ?""",
+                (self.namespace, session_id, owner, now + self.LOCK_LEASE, now),
+            )
+            self._db.commit()
+            return cursor.rowcount == 1
+
+    def _renew_lock(self, session_id, owner, stop):
+        while not stop.wait(self.LOCK_RENEW_INTERVAL):
+            try:
+                with self._lock:
+                    cursor = self._db.execute(
+                        "UPDATE session_locks SET expires = ? WHERE namespace = ? AND session_id = ? AND owner = ?",
+                        (
+                            time.time() + self.LOCK_LEASE,
+                            self.namespace,
+                            session_id,
+                            owner,
+                        ),
+                    )
+                    self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not renew session lock: {e}")
+                continue
+            if cursor.rowcount == 0:
+                logger.warning("Session lock expired before it was renewed")
+                return
+
+    def _load(self, session_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state FROM sessions WHERE namespace = ? AND session_id = ? AND updated >= ?",
+                (self.namespace, session_id, time.time() - self.ttl),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError as e:
+            logger.warning(f"Could not load session: {e}")
+            return None
+
+
+def open_session_store(namespace, ttl=3600, factory=dict, **memory_options):
+    """
+    Returns the store for ``namespace``, configured from the environment:
+
+    - ``SESSION_DB_PATH``: SQLite file shared by all workers (default
+      ``.cache/sessions.sqlite3``); empty keeps sessions in process memory
+      (SessionStore with ``memory_options``), which only works with one worker
+    """
+    path = os.getenv("SESSION_DB_PATH", os.path.join(".cache", "sessions.sqlite3"))
+    if path:
+        return SqliteSessionStore(path, namespace=namespace, ttl=ttl, factory=factory)
+    return SessionStore(ttl=ttl, factory=factory, **memory_options)
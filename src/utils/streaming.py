@@ -0,0 +1,223 @@
+"""
+Streams agency runs to HTTP clients as Server-Sent Events.
+
+The event handler mirrors the one used by the Gradio demo, but instead of
+formatting chat bubbles it emits typed events that API clients can consume:
+
+- ``message``: a new message between two agents (or the user and an agent)
+- ``text_delta``: a chunk of assistant text
+- ``tool_call``: a finished function call with its arguments
+- ``agent_message``: a SendMessage call from one agent to another
+- ``tool_output``: the output of a function call
+- ``error``: the run failed
+- ``done``: final summary frame with the full response and timings
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+from agency_swarm.util.streaming import AgencyEventHandler
+from openai.types.beta.threads import Message
+from openai.types.beta.threads.runs import RunStep
+from openai.types.beta.threads.runs.tool_call import (
+    CodeInterpreterToolCall,
+    FileSearchToolCall,
+    FunctionToolCall,
+    ToolCall,
+)
+from typing_extensions import override
+
+logger = logging.getLogger(__name__)
+
+
+def _as_tool_call(tool_call):
+    """Converts the dict form of a tool call that agency_swarm sometimes emits."""
+    if not isinstance(tool_call, dict):
+        return tool_call
+
+    tool_type = tool_call.setdefault("type", "function")
+    if tool_type == "function":
+        return FunctionToolCall(**tool_call)
+    if tool_type == "code_interpreter":
+        return CodeInterpreterToolCall(**tool_call)
+    if tool_type in ("file_search", "retrieval"):
+        return FileSearchToolCall(**tool_call)
+    raise ValueError("Invalid tool call type: " + tool_type)
+
+
+def make_stream_event_handler(emit):
+    """
+    Returns a new AgencyEventHandler subclass that passes typed events to ``emit``.
+
+    agency_swarm keeps run state on the handler class, so every run needs its
+    own subclass.
+    """
+
+    class StreamEventHandler(AgencyEventHandler):
+        @override
+        def on_message_created(self, message: Message) -> None:
+            if message.role == "user":
+                content = ""
+                for part in message.content:
+                    if part.type == "text":
+                        content += part.text.value
+                emit(
+                    "message",
+                    {
+                        "sender": self.agent_name,
+                        "recipient": self.recipient_agent_name,
+                        "content": content,
+                    },
+                )
+            else:
+                emit(
+                    "message",
+                    {
+                        "sender": self.recipient_agent_name,
+                        "recipient": self.agent_name,
+                        "content": "",
+                    },
+                )
+
+        @override
+        def on_text_delta(self, delta, snapshot):
+            emit(
+                "text_delta",
+                {"agent": self.recipient_agent_name, "delta": delta.value},
+            )
+
+        @override
+        def on_tool_call_done(self, snapshot: ToolCall):
+            snapshot = _as_tool_call(snapshot)
+            if snapshot.type != "function":
+                return
+
+            emit(
+                "tool_call",
+                {
+                    "agent": self.recipient_agent_name,
+                    "name": snapshot.function.name,
+                    "arguments": snapshot.function.arguments,
+                },
+            )
+
+            if snapshot.function.name == "SendMessage":
+                try:
+                    args = json.loads(snapshot.function.arguments)
+                    emit(
+                        "agent_message",
+                        {
+                            "sender": self.recipient_agent_name,
+                            "recipient": args["recipient"],
+                            "message": args["message"],
+                        },
+                    )
+                except (json.JSONDecodeError, KeyError, TypeError) as e:
+                    logger.debug(f"SendMessage arguments not parsed: {e!r}")
+
+        @override
+        def on_run_step_done(self, run_step: RunStep) -> None:
+            if run_step.type != "tool_calls":
+                return
+
+            for tool_call in run_step.step_details.tool_calls:
+                if tool_call.type != "function":
+                    continue
+                if tool_call.function.name == "SendMessage":
+                    continue
+
+                emit(
+                    "tool_output",
+                    {
+                        "agent": self.recipient_agent_name,
+                        "name": tool_call.function.name,
+                        "output": tool_call.function.output,
+                    },
+                )
+
+        @override
+        @classmethod
+        def on_all_streams_end(cls):
+            pass
+
+    return StreamEventHandler
+
+
+def format_sse(event, data):
+    """Formats one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_completion(agency, pool, message, attachments=None, recipient_agent=None):
+    """
+    Submits ``agency.get_completion_stream`` to ``pool`` and returns an async
+    generator of SSE frames. The last frame is always ``done`` or ``error``.
+    ``agency`` is the Agency or a function returning it.
+
+    Must be called from the event loop. The run is submitted before the
+    generator is returned, so PoolUnavailableError surfaces to the caller
+    before any response headers are sent.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    started = time.perf_counter()
+
+    def emit(event, data):
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    handler = make_stream_event_handler(emit)
+
+    def run():
+        # ``agency`` may be a function creating it on first use; call it on the worker
+        target = agency() if callable(agency) else agency
+        return target.get_completion_stream(
+            message,
+            handler,
+            [],
+            recipient_agent,
+            "",
+            attachments,
+            None,
+        )
+
+    future = pool.submit(run)
+    future.add_done_callback(
+        lambda f: loop.call_soon_threadsafe(events.put_nowait, (None, f))
+    )
+    return _iter_frames(events, started)
+
+
+async def _iter_frames(events, started):
+    first_event_at = None
+    counts = {}
+
+    while True:
+        event, data = await events.get()
+        if event is None:
+            break
+
+        if first_event_at is None:
+            first_event_at = time.perf_counter()
+        counts[event] = counts.get(event, 0) + 1
+        yield format_sse(event, data)
+
+    duration_ms = round((time.perf_counter() - started) * 1000)
+    try:
+        response = data.result()
+    except Exception as e:
+        yield format_sse("error", {"message": str(e), "duration_ms": duration_ms})
+        return
+
+    yield format_sse(
+        "done",
+        {
+            "response": response,
+            "events": counts,
+            "duration_ms": duration_ms,
+            "first_event_ms": (
+                round((first_event_at - started) * 1000) if first_event_at else None
+            ),
+        },
+    )
@@ -0,0 +1,61 @@
+"""
+Background warm-up after the server has started.
+
+Expensive initialisation, such as creating the agency (which syncs the
+assistants with OpenAI), runs as named steps in a daemon thread. The server
+accepts connections and answers health checks meanwhile; requests that need a
+step before it is done simply perform it themselves on first use.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    def __init__(self):
+        self._steps = []
+        self._state = {}  # step name -> {"status", "duration_s", "error"}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, name, fn):
+        """Registers ``fn`` (no arguments) to run as step ``name``."""
+        self._steps.append((name, fn))
+        self._state[name] = {"status": "pending"}
+
+    def start(self):
+        """Runs the steps in order in a daemon thread; later calls do nothing."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for name, fn in self._steps:
+            with self._lock:
+                self._state[name] = {"status": "running"}
+            started = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                logger.exception(f"Warm-up step {name} failed")
+                state = {"status": "failed", "error": str(e)}
+            else:
+                state = {"status": "done"}
+            state["duration_s"] = round(time.perf_counter() - started, 3)
+            logger.info(f"Warm-up step {name}: {state['status']} in {state['duration_s']}s")
+            with self._lock:
+                self._state[name] = state
+
+    @property
+    def ready(self):
+        with self._lock:
+            return all(step["status"] == "done" for step in self._state.values())
+
+    def state(self):
+        with self._lock:
+            return {name: dict(step) for name, step in self._state.items()}